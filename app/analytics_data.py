@@ -0,0 +1,128 @@
+import threading
+import time
+from datetime import timedelta
+import pandas as pd
+import streamlit as st
+from sqlalchemy import text, bindparam, DateTime
+from app.database import engine
+from app.data_version import data_version, db_fingerprint
+from app.summary import QC_PSD_COLUMNS
+
+# Unified experiment dataset used by the Analytics page, read from the
+# materialized experiment_summary table (one indexed table, no joins)
+ANALYTICS_COLUMNS = [
+    "test_id", "recipe_name", "ca_si_ratio", "molarity_ca_no3", "molarity_na2sio3", "total_solid_content",
+    "pce_content_wt", "target_ph", "ca_addition_rate", "si_addition_rate", "measurement_id", "execution_date",
+    "cube_code", "cast_date", "fresh_density", "flow", "air_content", "temperature",
+    "compressive_strength_12h", "compressive_strength_16h", "compressive_strength_1d",
+    "compressive_strength_2d", "compressive_strength_7d", "compressive_strength_28d",
+    # QC values per batch: the reading closest to 24h ageing (as used for mix design)
+    "qc_ageing_time", "qc_ph", "qc_solid_content", "qc_settling_height",
+] + [f"qc_{c}" for c in QC_PSD_COLUMNS]
+
+# Only tests linked to a batch and recipe are analysed
+ANALYTICS_FILTER = "batch_id IS NOT NULL AND recipe_id IS NOT NULL"
+ANALYTICS_QUERY = f"SELECT {', '.join(ANALYTICS_COLUMNS)} FROM experiment_summary WHERE {ANALYTICS_FILTER}"
+
+SOURCE_TABLES = {"experiment_summary": True}
+JOINED_COUNT_QUERY = f"SELECT COUNT(*) FROM experiment_summary WHERE {ANALYTICS_FILTER}"
+
+# How often the database itself is checked for writes made by other processes
+VERIFY_INTERVAL_S = 60
+# Re-read rows this far behind the watermark to cover commits that carry an older timestamp
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+class AnalyticsDataset:
+    """
+    Process-wide cache of the analytics dataset.
+
+    `get()` returns the cached frame while the data version is unchanged, so
+    widget reruns never hit the database. After a write, only summary rows whose
+    `updated_at` is past the watermark are re-read and merged in by test id.
+    Deletions (the summary row count going down) trigger a full reload.
+    `version` increases whenever the frame changes. The returned frame is
+    shared between sessions and must not be modified in place.
+    """
+
+    def __init__(self):
+        self.df = None
+        self.watermark = None
+        self.local_version = None
+        self.fingerprint = None
+        self.verified_at = 0.0
+        self.version = 0
+        self.lock = threading.Lock()
+
+    def get(self):
+        with self.lock:
+            local_version = data_version(*SOURCE_TABLES)
+            stale_local = local_version != self.local_version
+            due_check = time.monotonic() - self.verified_at > VERIFY_INTERVAL_S
+            if self.df is not None and not stale_local and not due_check:
+                return self.df
+
+            with engine.connect() as conn:
+                fingerprint = db_fingerprint(conn, SOURCE_TABLES)
+                if self.df is None or self._rows_removed(fingerprint):
+                    self._full_load(conn)
+                    self.version += 1
+                elif fingerprint != self.fingerprint:
+                    self._incremental_load(conn)
+                    self.version += 1
+            self.fingerprint = fingerprint
+            self.local_version = local_version
+            self.verified_at = time.monotonic()
+            return self.df
+
+    def _rows_removed(self, fingerprint):
+        # Fingerprint is (count, max_ts) per table; counts sit at even positions
+        if self.fingerprint is None:
+            return False
+        return any(int(new) < int(old) for new, old in zip(fingerprint[::2], self.fingerprint[::2]))
+
+    def _full_load(self, conn):
+        df = pd.read_sql(text(ANALYTICS_QUERY), conn)
+        self.df = self._normalise(df)
+        self.watermark = self._current_watermark(conn)
+
+    def _incremental_load(self, conn):
+        watermark = self._current_watermark(conn)
+        since = self.watermark - WATERMARK_OVERLAP if self.watermark is not None else None
+        if since is None:
+            return self._full_load(conn)
+
+        delta_query = ANALYTICS_QUERY + " AND updated_at > :since"
+        stmt = text(delta_query).bindparams(bindparam("since", value=since, type_=DateTime))
+        delta = self._normalise(pd.read_sql(stmt, conn))
+        merged = pd.concat([self.df[~self.df["test_id"].isin(delta["test_id"])], delta], ignore_index=True)
+
+        # Rows that vanished (deletes, or re-linked batches) cannot be seen through the watermark
+        expected = conn.execute(text(JOINED_COUNT_QUERY)).scalar()
+        if len(merged) != expected:
+            return self._full_load(conn)
+        self.df = merged
+        self.watermark = watermark
+
+    @staticmethod
+    def _current_watermark(conn):
+        value = conn.execute(text("SELECT MAX(updated_at) FROM experiment_summary")).scalar()
+        return pd.Timestamp(value).to_pydatetime() if value is not None else None
+
+    @staticmethod
+    def _normalise(df):
+        df["test_id"] = df["test_id"].astype(str)
+        for col in ("execution_date", "cast_date"):
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+        return df
+
+@st.cache_resource
+def get_analytics_dataset():
+    return AnalyticsDataset()
+
+def load_analytics_data():
+    """Cached analytics frame (read-only)."""
+    return get_analytics_dataset().get()
+
+def analytics_data_version():
+    """Changes whenever the cached analytics frame changes (use as a cache key)."""
+    return get_analytics_dataset().version
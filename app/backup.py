@@ -0,0 +1,99 @@
+import os
+import gzip
+import shutil
+import sqlite3
+import datetime
+import tempfile
+import threading
+from app.database import engine, Base
+from app.data_version import data_version
+from app.journal import journal_position
+
+BACKUP_DIR = "backups"
+# Pages copied per step of the SQLite online backup (writers can proceed between steps)
+BACKUP_PAGES = 1024
+# Bytes per read / compress step
+COPY_CHUNK = 1024 * 1024
+# Bookkeeping tables that do not invalidate a built backup
+KEY_EXCLUDED_TABLES = {"system_logs", "change_journal"}
+
+_lock = threading.Lock()
+_artifact = {"key": None, "path": None}
+
+def _sqlite_path():
+    return engine.url.database
+
+def backup_key():
+    """
+    Cache key of the current database state: in-process write counters of the
+    data tables, plus the change journal position, which every write path of
+    every process advances. system_logs and change_journal are left out, as
+    every download writes a log entry. One indexed MAX(seq) query, so the
+    Admin page can check it on every render.
+    """
+    tables = [name for name in Base.metadata.tables if name not in KEY_EXCLUDED_TABLES]
+    key = (engine.dialect.name,) + data_version(*tables)
+    with engine.connect() as conn:
+        key += (journal_position(conn),)
+    return key
+
+def sqlite_snapshot(dest):
+    """Consistent copy of the live SQLite database via the online backup API."""
+    raw = engine.raw_connection()
+    try:
+        target = sqlite3.connect(dest)
+        try:
+            raw.driver_connection.backup(target, pages=BACKUP_PAGES)
+        finally:
+            target.close()
+    finally:
+        raw.close()
+
+def _gzip_file(src, dest):
+    """Compress `src` into `dest` in COPY_CHUNK steps (constant memory)."""
+    with open(src, "rb") as fin, gzip.open(dest, "wb", compresslevel=6) as fout:
+        shutil.copyfileobj(fin, fout, COPY_CHUNK)
+
+def backup_file_name(timestamp=None):
+    ts = (timestamp or datetime.datetime.now()).strftime("%Y%m%d_%H%M%S")
+    return f"nanogence_backup_{ts}" + (".tar" if engine.dialect.name == "postgresql" else ".db.gz")
+
+def build_backup(backup_dir=BACKUP_DIR):
+    """
+    Path of a compressed backup of the current database, built on demand:
+    SQLite via the online backup API (safe while the app is writing) then
+    gzip in chunks; Postgres via the COPY-based logical dump (no pg_dump
+    binary needed). The artifact is reused while
+    backup_key() is unchanged and the previous one is removed when replaced.
+    """
+    key = backup_key()
+    with _lock:
+        if _artifact["key"] == key and _artifact["path"] and os.path.exists(_artifact["path"]):
+            return _artifact["path"]
+        os.makedirs(backup_dir, exist_ok=True)
+        dest = os.path.join(backup_dir, backup_file_name())
+        if engine.dialect.name == "sqlite":
+            fd, snapshot = tempfile.mkstemp(suffix=".db", dir=backup_dir)
+            os.close(fd)
+            try:
+                sqlite_snapshot(snapshot)
+                _gzip_file(snapshot, dest + ".part")
+            finally:
+                os.remove(snapshot)
+        else:
+            from app.logical_backup import dump_database
+            dump_database(dest + ".part")
+        os.replace(dest + ".part", dest)
+        previous = _artifact["path"]
+        if previous and previous != dest and os.path.exists(previous):
+            os.remove(previous)
+        _artifact.update(key=key, path=dest)
+        return dest
+
+def backup_mime():
+    return "application/x-tar" if engine.dialect.name == "postgresql" else "application/gzip"
+
+def latest_backup():
+    """Path of the cached artifact if it still matches the database, else None."""
+    path = _artifact["path"]
+    return path if path and _artifact["key"] == backup_key() and os.path.exists(path) else None
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+# Identifier / bookkeeping columns that are numeric but not process variables
+EXCLUDED_COLUMNS = {"qc_ageing_time"}
+MIN_PAIRS = 5
+
+def numeric_columns(df):
+    """Numeric process, QC and performance variables with at least two distinct values."""
+    cols = []
+    for col in df.select_dtypes(include="number").columns:
+        if col in EXCLUDED_COLUMNS:
+            continue
+        if df[col].nunique(dropna=True) > 1:
+            cols.append(col)
+    return cols
+
+def pairwise_pearson(X):
+    """
+    Pearson correlation with pairwise-complete observations for every column pair,
+    computed with a handful of matrix products instead of k² separate passes.
+    Returns (r, n) as k x k arrays.
+    """
+    X = np.asarray(X, dtype=float)
+    M = (~np.isnan(X)).astype(float)
+    Xz = np.where(M > 0, X, 0.0)
+
+    n = M.T @ M                  # pairs available for (i, j)
+    sx = Xz.T @ M                # sum of x_i over rows where x_j is present
+    sxx = (Xz * Xz).T @ M        # sum of x_i² over the same rows
+    sxy = Xz.T @ Xz
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sxy - sx * sx.T / n
+        var_i = sxx - sx * sx / n
+        var_j = var_i.T
+        r = cov / np.sqrt(var_i * var_j)
+    r = np.clip(r, -1.0, 1.0)
+    r[n < 2] = np.nan
+    return r, n
+
+def correlation_matrix(df, columns, method="pearson", min_pairs=MIN_PAIRS):
+    """
+    Correlation matrix over `columns` in one vectorized pass.
+    method: "pearson", "spearman" (Pearson on column ranks) or "partial"
+    (each pair controlled for all other variables, from the inverse Pearson matrix).
+    Returns (corr DataFrame, pair-count DataFrame).
+    """
+    data = df[columns].apply(pd.to_numeric, errors="coerce")
+    if method == "spearman":
+        data = data.rank(method="average")
+
+    r, n = pairwise_pearson(data.to_numpy())
+    r[n < min_pairs] = np.nan
+
+    if method == "partial":
+        r = partial_from_correlation(r)
+
+    corr = pd.DataFrame(r, index=columns, columns=columns)
+    counts = pd.DataFrame(n.astype(int), index=columns, columns=columns)
+    return corr, counts
+
+def partial_from_correlation(r):
+    """Partial correlations from a correlation matrix via its (pseudo-)inverse."""
+    k = r.shape[0]
+    usable = ~np.isnan(r).all(axis=0)
+    out = np.full_like(r, np.nan)
+    if usable.sum() < 3:
+        return out
+    sub = np.nan_to_num(r[np.ix_(usable, usable)], nan=0.0)
+    np.fill_diagonal(sub, 1.0)
+    precision = np.linalg.pinv(sub)
+    d = np.sqrt(np.abs(np.diag(precision)))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pcor = -precision / np.outer(d, d)
+    np.fill_diagonal(pcor, 1.0)
+    out[np.ix_(usable, usable)] = np.clip(pcor, -1.0, 1.0)
+    return out
+
+def cluster_order(corr):
+    """Variable order that groups strongly correlated variables (hierarchical clustering on 1 - |r|)."""
+    cols = list(corr.columns)
+    if len(cols) < 3:
+        return cols
+    try:
+        from scipy.cluster.hierarchy import linkage, leaves_list
+        from scipy.spatial.distance import squareform
+    except ImportError:
+        return cols
+    dist = 1.0 - np.abs(np.nan_to_num(corr.to_numpy(), nan=0.0))
+    dist = (dist + dist.T) / 2.0
+    np.fill_diagonal(dist, 0.0)
+    order = leaves_list(linkage(squareform(np.clip(dist, 0.0, None), checks=False), method="average"))
+    return [cols[i] for i in order]
+
+def top_pairs(corr, counts, limit=25):
+    """Strongest off-diagonal pairs, sorted by |r|."""
+    cols = corr.columns
+    iu = np.triu_indices(len(cols), k=1)
+    values = corr.to_numpy()[iu]
+    pairs = pd.DataFrame({
+        "x": cols[iu[0]],
+        "y": cols[iu[1]],
+        "r": values,
+        "n": counts.to_numpy()[iu],
+    }).dropna(subset=["r"])
+    pairs["abs_r"] = pairs["r"].abs()
+    return pairs.sort_values("abs_r", ascending=False).head(limit).drop(columns="abs_r").reset_index(drop=True)
@@ -0,0 +1,55 @@
+import threading
+from collections import defaultdict
+from sqlalchemy import event, text
+from app.database import engine
+
+# In-process write counters per table. Every committed INSERT/UPDATE/DELETE that
+# goes through `engine` bumps the counter of its table, so caches can tell whether
+# their data is stale without querying the database.
+_versions = defaultdict(int)
+_lock = threading.Lock()
+
+def _statement_table(context):
+    compiled = getattr(context, "compiled", None)
+    table = getattr(getattr(compiled, "statement", None), "table", None)
+    return getattr(table, "name", None) or "*"
+
+@event.listens_for(engine, "after_cursor_execute")
+def _track_write(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and (context.isinsert or context.isupdate or context.isdelete):
+        conn.info.setdefault("changed_tables", set()).add(_statement_table(context))
+    elif statement.lstrip()[:6].upper() in ("INSERT", "UPDATE", "DELETE"):
+        # Raw text() writes: table unknown, invalidate everything
+        conn.info.setdefault("changed_tables", set()).add("*")
+
+@event.listens_for(engine, "commit")
+def _on_commit(conn):
+    bump(*conn.info.pop("changed_tables", ()))
+
+@event.listens_for(engine, "rollback")
+def _on_rollback(conn):
+    conn.info.pop("changed_tables", None)
+
+def bump(*tables):
+    """Mark tables as changed (also used for writes made outside this engine)."""
+    with _lock:
+        for t in tables:
+            _versions[t] += 1
+
+def data_version(*tables):
+    """Current in-process version of the given tables (hashable, cheap)."""
+    with _lock:
+        return tuple(_versions[t] for t in tables) + (_versions["*"],)
+
+def db_fingerprint(conn, tables, timestamp_col="updated_at"):
+    """
+    (row count, newest timestamp) per table in one round-trip. Used to detect
+    writes made by other processes, which the in-process counters cannot see.
+    Tables without the timestamp column are fingerprinted by row count only.
+    """
+    parts = []
+    for t, has_ts in tables.items():
+        parts.append(f"(SELECT COUNT(*) FROM {t})")
+        parts.append(f"(SELECT MAX({timestamp_col}) FROM {t})" if has_ts else "NULL")
+    row = conn.execute(text("SELECT " + ", ".join(parts))).one()
+    return tuple(str(v) for v in row)
@@ -1,5 +1,6 @@
 import streamlit as st
 import os
+import json
 from sqlalchemy import create_engine, text, inspect
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -13,6 +14,12 @@ if "DATABASE_URL" in st.secrets:
 else:
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./nanogence.db")
 
+# requirements.txt ships psycopg2, whose COPY API the logical backup uses;
+# SQLAlchemy 2.1 would otherwise pick psycopg 3 for a bare postgresql:// URL
+for scheme in ("postgresql://", "postgres://"):
+    if DATABASE_URL.startswith(scheme):
+        DATABASE_URL = "postgresql+psycopg2://" + DATABASE_URL[len(scheme):]
+
 # Postgres requires different args than SQLite
 if "postgresql" in DATABASE_URL:
     engine = create_engine(DATABASE_URL)
@@ -31,8 +38,18 @@ def get_db():
     finally:
         db.close()
 
-def init_db():
+# init_db runs its migrations once per process; later page runs return immediately
+_initialized = False
+
+def init_db(force=False):
+    global _initialized
+    if _initialized and not force:
+        return
     import app.models # Register models
+    import app.data_version # Register write tracking for caches
+    import app.summary # Register experiment_summary maintenance
+    import app.journal # Register the change journal
+    existing_tables = set(inspect(engine).get_table_names())
     Base.metadata.create_all(bind=engine)
     
     # Soft Migrations (for SQLite existing tables)
@@ -44,6 +61,15 @@ def init_db():
             with engine.begin() as conn: # engine.begin() handles commits automatically
                 conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {col_name} {col_type}"))
                 print(f"Added column {col_name} to {table_name}")
+            return True
+        return False
+
+    def add_index_if_missing(table_name, index_name, columns):
+        indexes = [i["name"] for i in inspector.get_indexes(table_name)]
+        if index_name not in indexes:
+            with engine.begin() as conn:
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({', '.join(columns)})"))
+                print(f"Added index {index_name} to {table_name}")
 
     if "recipes" in inspector.get_table_names():
         add_column_if_missing("recipes", "recipe_date", "DATETIME")
@@ -55,13 +81,20 @@ def init_db():
         add_column_if_missing("recipes", "material_sources", "JSON")
         add_column_if_missing("recipes", "target_ph", "FLOAT")
         add_column_if_missing("recipes", "code", "VARCHAR")
+        if add_column_if_missing("recipes", "updated_at", "DATETIME"):
+            backfill_updated_at("recipes", "created_at")
+        add_index_if_missing("recipes", "ix_recipes_updated_at", ["updated_at"])
+        add_index_if_missing("recipes", "ix_recipes_ca_stock_batch_id", ["ca_stock_batch_id"])
+        add_index_if_missing("recipes", "ix_recipes_si_stock_batch_id", ["si_stock_batch_id"])
 
     if "stock_solution_batches" in inspector.get_table_names():
         add_column_if_missing("stock_solution_batches", "preparation_date", "DATETIME")
         add_column_if_missing("stock_solution_batches", "raw_material_id", "VARCHAR")
+        add_index_if_missing("stock_solution_batches", "ix_stock_solution_batches_raw_material_id", ["raw_material_id"])
 
     if "raw_materials" in inspector.get_table_names():
         add_column_if_missing("raw_materials", "molecular_weight", "FLOAT")
+        add_index_if_missing("raw_materials", "ix_raw_materials_lot_number", ["lot_number"])
 
     if "qc_measurements" in inspector.get_table_names():
         new_cols = [
@@ -76,3 +109,62 @@ def init_db():
         ]
         for col, dtype in new_cols:
             add_column_if_missing("qc_measurements", col, dtype)
+        add_index_if_missing("qc_measurements", "ix_qc_measurements_batch_ageing", ["batch_id", "ageing_time"])
+        if add_column_if_missing("qc_measurements", "updated_at", "DATETIME"):
+            backfill_updated_at("qc_measurements", "measured_at")
+        add_index_if_missing("qc_measurements", "ix_qc_measurements_updated_at", ["updated_at"])
+
+    if "synthesis_batches" in inspector.get_table_names():
+        add_index_if_missing("synthesis_batches", "ix_synthesis_batches_execution_date", ["execution_date"])
+        add_index_if_missing("synthesis_batches", "ix_synthesis_batches_recipe_id", ["recipe_id"])
+        if add_column_if_missing("synthesis_batches", "updated_at", "DATETIME"):
+            backfill_updated_at("synthesis_batches", "execution_date")
+        add_index_if_missing("synthesis_batches", "ix_synthesis_batches_updated_at", ["updated_at"])
+
+    if "performance_tests" in inspector.get_table_names():
+        if add_column_if_missing("performance_tests", "cube_code", "VARCHAR"):
+            backfill_cube_codes()
+        add_index_if_missing("performance_tests", "ix_performance_tests_cube_code", ["cube_code"])
+        add_index_if_missing("performance_tests", "ix_performance_tests_cast_date", ["cast_date"])
+        add_index_if_missing("performance_tests", "ix_performance_tests_batch_id", ["batch_id"])
+        if add_column_if_missing("performance_tests", "updated_at", "DATETIME"):
+            backfill_updated_at("performance_tests", "cast_date")
+        add_index_if_missing("performance_tests", "ix_performance_tests_updated_at", ["updated_at"])
+
+    if "system_logs" in inspector.get_table_names():
+        add_index_if_missing("system_logs", "ix_system_logs_timestamp", ["timestamp"])
+        add_index_if_missing("system_logs", "ix_system_logs_event_type_timestamp", ["event_type", "timestamp"])
+
+    # Materialized read model: build it once for existing data, repair it if rows drifted
+    with engine.connect() as conn:
+        needs_rebuild = "experiment_summary" not in existing_tables or app.summary.summary_out_of_sync(conn)
+    if needs_rebuild:
+        print(f"Rebuilt experiment_summary ({app.summary.rebuild_summary()} rows)")
+    _initialized = True
+
+    # First page run in a server process: load heavy modules and caches in the background
+    if st.runtime.exists():
+        from app.warmup import start_warmup
+        start_warmup()
+
+def backfill_updated_at(table_name, fallback_col):
+    """Give existing rows an updated_at so incremental readers have a watermark."""
+    with engine.begin() as conn:
+        conn.execute(text(f"UPDATE {table_name} SET updated_at = COALESCE({fallback_col}, CURRENT_TIMESTAMP) WHERE updated_at IS NULL"))
+
+def backfill_cube_codes():
+    """Copy raw_data["cube_code"] into the searchable cube_code column (journaled, so replays get it too)."""
+    from app.journal import record, row_ops
+    with engine.begin() as conn:
+        rows = conn.execute(text("SELECT id, raw_data FROM performance_tests WHERE cube_code IS NULL")).all()
+        updates = []
+        for row_id, raw in rows:
+            if isinstance(raw, str):
+                raw = json.loads(raw) if raw else {}
+            code = (raw or {}).get("cube_code")
+            if code:
+                updates.append({"id": row_id, "code": code})
+        if updates:
+            conn.execute(text("UPDATE performance_tests SET cube_code = :code WHERE id = :id"), updates)
+            record(conn, {"performance_tests": row_ops("performance_tests", "U", [{"id": u["id"], "cube_code": u["code"]} for u in updates])})
+            print(f"Backfilled {len(updates)} cube codes")
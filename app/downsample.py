@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+# Upper bound on points sent to the browser per chart
+MAX_POINTS = 2000
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: indices of `n_out` points that preserve the
+    visual shape of the (x sorted) series. First and last points are always kept.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (n_out - 2)
+    edges = (np.floor(np.arange(n_out - 1) * every) + 1).astype(int)
+    edges[-1] = n - 1
+
+    idx = np.empty(n_out, dtype=int)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        nxt_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:nxt_end].mean()
+        avg_y = y[end:nxt_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        idx[i + 1] = a
+    return idx
+
+def downsample_line(df, x, y, max_points=MAX_POINTS):
+    """Sort by x, drop missing y and reduce to at most `max_points` rows with LTTB."""
+    data = df.dropna(subset=[x, y]).sort_values(x)
+    if len(data) <= max_points:
+        return data
+    xs = data[x]
+    if pd.api.types.is_datetime64_any_dtype(xs):
+        xs = xs.astype("int64")
+    keep = lttb_indices(xs.to_numpy(dtype=float), data[y].to_numpy(dtype=float), max_points)
+    return data.iloc[keep]
+
+def density_bin(df, x, y, color=None, max_points=MAX_POINTS, bins=60):
+    """
+    Reduce a scatter to one representative row per occupied (x-bin, y-bin[, color]) cell.
+    Adds `n_points` with the number of raw rows behind each representative.
+    Never returns more than `max_points` rows; with many colours the sparsest
+    cells are dropped.
+    """
+    data = df.dropna(subset=[x, y])
+    if len(data) <= max_points:
+        return data.assign(n_points=1)
+
+    keys = []
+    for col in (x, y):
+        values = data[col]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            values = values.astype("int64")
+        values = pd.to_numeric(values, errors="coerce").to_numpy(dtype=float)
+        lo, hi = np.nanmin(values), np.nanmax(values)
+        span = hi - lo if hi > lo else 1.0
+        keys.append(np.minimum(((values - lo) / span * bins).astype(int), bins - 1))
+    group_keys = [pd.Series(k, index=data.index) for k in keys]
+    if color:
+        group_keys.append(data[color].astype(str))
+
+    grouped = data.groupby(group_keys, sort=False)
+    reps = grouped.head(1).copy()
+    reps["n_points"] = grouped[x].transform("size").loc[reps.index]
+    # Coarser grid if there are still too many occupied cells
+    if len(reps) > max_points and bins > 10:
+        return density_bin(df, x, y, color, max_points, bins // 2)
+    if len(reps) > max_points:
+        # Still over the cap (many colours): take the densest cell of every
+        # colour first, then the next densest of each, and so on
+        reps = reps.sort_values("n_points", ascending=False, kind="stable")
+        rank = reps.groupby(reps[color].astype(str), sort=False).cumcount() if color else pd.Series(0, index=reps.index)
+        keep = rank.sort_values(kind="stable").index[:max_points]
+        reps = reps.loc[reps.index.isin(keep)].sort_index()
+    return reps
+
+def histogram_bins(values, nbins=10):
+    """Pre-binned histogram: frame of bin left/right edges, centres and counts."""
+    values = pd.to_numeric(pd.Series(values), errors="coerce").dropna().to_numpy(dtype=float)
+    if values.size == 0:
+        return pd.DataFrame(columns=["left", "right", "center", "count"])
+    counts, edges = np.histogram(values, bins=nbins)
+    return pd.DataFrame({
+        "left": edges[:-1],
+        "right": edges[1:],
+        "center": (edges[:-1] + edges[1:]) / 2.0,
+        "count": counts,
+    })
+
+def box_stats(values):
+    """Quartiles, Tukey fences and outliers so a box plot can be drawn without the raw data."""
+    v = pd.to_numeric(pd.Series(values), errors="coerce").dropna().to_numpy(dtype=float)
+    if v.size == 0:
+        return None
+    q1, median, q3 = np.percentile(v, [25, 50, 75])
+    iqr = q3 - q1
+    inside = v[(v >= q1 - 1.5 * iqr) & (v <= q3 + 1.5 * iqr)]
+    lower, upper = inside.min(), inside.max()
+    outliers = v[(v < lower) | (v > upper)]
+    return {"q1": q1, "median": median, "q3": q3, "lowerfence": lower, "upperfence": upper, "mean": v.mean(), "n": v.size, "outliers": outliers}
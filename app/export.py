@@ -0,0 +1,277 @@
+import os
+import json
+import uuid
+from datetime import datetime, timedelta
+import pandas as pd
+from sqlalchemy import select, bindparam, or_, DateTime, JSON
+from sqlalchemy.orm import aliased
+from app.database import engine
+from app.models import RawMaterial, StockSolutionBatch, Recipe, SynthesisBatch, QCMeasurement, PerformanceTest, ExperimentSummary
+
+EXPORT_DIR = "exports"
+CHUNK_SIZE = 10000
+MANIFEST = "manifest.json"
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+# Re-read rows this far behind the watermark to cover commits that carry an older timestamp
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+CaStock = aliased(StockSolutionBatch)
+SiStock = aliased(StockSolutionBatch)
+CaMaterial = aliased(RawMaterial)
+SiMaterial = aliased(RawMaterial)
+
+def _columns(model, prefix, skip=()):
+    return [c.label(f"{prefix}{c.key}") for c in model.__table__.columns if c.key not in skip]
+
+def _experiments_query():
+    """One row per PerformanceTest with its batch, recipe and stock-solution lots."""
+    return select(
+        *_columns(PerformanceTest, "test_"),
+        SynthesisBatch.lab_notebook_ref.label("batch_ref"),
+        SynthesisBatch.execution_date.label("batch_execution_date"),
+        SynthesisBatch.operator.label("batch_operator"),
+        SynthesisBatch.status.label("batch_status"),
+        SynthesisBatch.updated_at.label("batch_updated_at"),
+        *_columns(Recipe, "recipe_", skip=("material_sources", "process_config", "created_at", "updated_at")),
+        Recipe.updated_at.label("recipe_updated_at"),
+        CaStock.code.label("ca_stock_code"),
+        CaStock.molarity.label("ca_stock_molarity"),
+        CaMaterial.lot_number.label("ca_material_lot"),
+        SiStock.code.label("si_stock_code"),
+        SiStock.molarity.label("si_stock_molarity"),
+        SiMaterial.lot_number.label("si_material_lot"),
+    ).outerjoin(SynthesisBatch, PerformanceTest.batch_id == SynthesisBatch.id) \
+     .outerjoin(Recipe, SynthesisBatch.recipe_id == Recipe.id) \
+     .outerjoin(CaStock, Recipe.ca_stock_batch_id == CaStock.id) \
+     .outerjoin(CaMaterial, CaStock.raw_material_id == CaMaterial.id) \
+     .outerjoin(SiStock, Recipe.si_stock_batch_id == SiStock.id) \
+     .outerjoin(SiMaterial, SiStock.raw_material_id == SiMaterial.id), \
+        (PerformanceTest.updated_at, SynthesisBatch.updated_at, Recipe.updated_at), ("test_updated_at", "batch_updated_at", "recipe_updated_at"), "test_cast_date"
+
+def _qc_query():
+    """One row per QC measurement with its batch and recipe."""
+    return select(
+        *_columns(QCMeasurement, "qc_"),
+        SynthesisBatch.lab_notebook_ref.label("batch_ref"),
+        SynthesisBatch.updated_at.label("batch_updated_at"),
+        Recipe.id.label("recipe_id"),
+        Recipe.name.label("recipe_name"),
+        Recipe.updated_at.label("recipe_updated_at"),
+    ).outerjoin(SynthesisBatch, QCMeasurement.batch_id == SynthesisBatch.id) \
+     .outerjoin(Recipe, SynthesisBatch.recipe_id == Recipe.id), \
+        (QCMeasurement.updated_at, SynthesisBatch.updated_at, Recipe.updated_at), ("qc_updated_at", "batch_updated_at", "recipe_updated_at"), "qc_measured_at"
+
+def _summary_query():
+    """The materialized experiment_summary table as is (flat, no JSON)."""
+    return select(*_columns(ExperimentSummary, "")), (ExperimentSummary.updated_at,), ("updated_at",), "cast_date"
+
+def _dimension_query(model):
+    return select(*_columns(model, "")), (), (), None
+
+# Fact datasets are partitioned by month and exported incrementally (a row is
+# re-exported when its own updated_at or that of a joined batch / recipe
+# passes the watermark); dimension tables are small and rewritten on every export.
+DATASETS = {
+    "experiments": _experiments_query,
+    "qc_measurements": _qc_query,
+    "experiment_summary": _summary_query,
+    "recipes": lambda: _dimension_query(Recipe),
+    "stock_solutions": lambda: _dimension_query(StockSolutionBatch),
+    "raw_materials": lambda: _dimension_query(RawMaterial),
+}
+
+# (id, updated_at) columns used to collapse re-exported rows of fact datasets
+LATEST_KEYS = {
+    "experiments": ("test_id", "test_updated_at"),
+    "qc_measurements": ("qc_id", "qc_updated_at"),
+    "experiment_summary": ("test_id", "updated_at"),
+}
+
+def _flatten(df, json_cols):
+    """Expand JSON columns (mix_design, raw_data, psd_data, ...) into prefixed scalar columns."""
+    for col in json_cols:
+        values = df[col].map(lambda v: v if isinstance(v, dict) else {})
+        flat = pd.json_normalize(values.tolist(), sep="_").add_prefix(f"{col}_")
+        flat.index = df.index
+        df = pd.concat([df.drop(columns=[col]), flat], axis=1)
+    return df
+
+def _sql_dtypes(stmt):
+    """pandas dtype per selected column, taken from the SQL column types so every part has the same schema."""
+    dtypes = {}
+    for c in stmt.selected_columns:
+        try:
+            py = c.type.python_type
+        except NotImplementedError:
+            continue
+        if py is bool:
+            dtypes[c.name] = "boolean"
+        elif py is int:
+            dtypes[c.name] = "Int64"
+        elif py is float:
+            dtypes[c.name] = "float64"
+        elif py is datetime:
+            dtypes[c.name] = "datetime64[ns]"
+        elif py in (str, uuid.UUID):
+            dtypes[c.name] = "string"
+    return dtypes
+
+def _coerce(df, dtypes):
+    """Make every column Arrow-friendly: typed SQL columns by schema, flattened JSON values to numbers or text."""
+    for col in df.columns:
+        s = df[col]
+        if col in dtypes:
+            if dtypes[col] == "string":
+                df[col] = s.map(lambda v: None if v is None or (isinstance(v, float) and pd.isna(v)) else str(v)).astype("string")
+            elif dtypes[col] == "datetime64[ns]":
+                df[col] = pd.to_datetime(s, errors="coerce")
+            else:
+                df[col] = s.astype(dtypes[col])
+            continue
+        if s.dtype != object:
+            continue
+        sample = s.dropna()
+        if sample.empty:
+            continue # All-null: Arrow null type, merges with any later type
+        if sample.map(lambda v: isinstance(v, bool)).all():
+            df[col] = s.astype("boolean")
+            continue
+        numeric = pd.to_numeric(s, errors="coerce")
+        if numeric.notna().sum() == sample.size:
+            df[col] = numeric.astype(float)
+        else:
+            df[col] = s.map(lambda v: None if v is None or (isinstance(v, float) and pd.isna(v)) else (json.dumps(v) if isinstance(v, (dict, list)) else str(v))).astype("string")
+    return df
+
+def _write(df, path, fmt):
+    import pyarrow as pa
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, tmp, compression="zstd")
+    else:
+        # Uncompressed Arrow IPC so notebooks can memory-map it
+        import pyarrow.feather as feather
+        feather.write_feather(table, tmp, compression="uncompressed")
+    os.replace(tmp, path)
+
+def load_manifest(root=EXPORT_DIR):
+    path = os.path.join(root, MANIFEST)
+    if not os.path.exists(path):
+        return {"datasets": {}, "exports": []}
+    with open(path) as f:
+        return json.load(f)
+
+def _save_manifest(root, manifest):
+    tmp = os.path.join(root, MANIFEST + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, default=str)
+    os.replace(tmp, os.path.join(root, MANIFEST))
+
+def export_dataset(root=EXPORT_DIR, fmt="parquet", full=False, chunk_size=CHUNK_SIZE, datasets=None, progress=None):
+    """
+    Stream the unified experiment dataset to partitioned Parquet / Arrow IPC files.
+
+    Fact datasets (experiments, qc_measurements, experiment_summary) are read in chunks and written
+    as new part files under `<dataset>/month=YYYY-MM/`. Incremental runs only
+    read rows whose updated_at, or that of their batch or recipe, is past the
+    dataset's watermark (less WATERMARK_OVERLAP) and append new parts; a row
+    that changed appears again in a newer part, so readers should keep the last
+    version per id. Deletes and edits to stock batches / raw materials (no
+    updated_at) are not seen incrementally: run a periodic `full=True`, which
+    rewrites everything. Returns the manifest entry of this export.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    os.makedirs(root, exist_ok=True)
+    manifest = load_manifest(root)
+    if manifest.get("format") not in (None, fmt):
+        full = True # Never mix formats within one export directory
+    if full:
+        for name, state in manifest["datasets"].items():
+            _clear_dataset(root, name, state)
+        manifest = {"datasets": {}, "exports": manifest.get("exports", [])}
+    manifest["format"] = fmt
+
+    export_id = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+    summary = {"id": export_id, "at": datetime.utcnow().isoformat(), "mode": "full" if full else "incremental", "rows": {}}
+
+    for name in (datasets or DATASETS):
+        stmt, updated_cols, updated_labels, partition_col = DATASETS[name]()
+        json_cols = [c.name for c in stmt.selected_columns if isinstance(c.type, JSON)]
+        dtypes = _sql_dtypes(stmt)
+        state = manifest["datasets"].get(name, {"files": [], "rows": 0})
+        is_fact = bool(updated_cols)
+
+        if full or not is_fact:
+            _clear_dataset(root, name, state)
+            state = {"files": [], "rows": 0}
+
+        watermark = state.get("watermark")
+        if is_fact and watermark:
+            since = bindparam("since", value=datetime.fromisoformat(watermark) - WATERMARK_OVERLAP, type_=DateTime)
+            stmt = stmt.where(or_(*(col > since for col in updated_cols)))
+
+        rows = 0
+        with engine.connect().execution_options(stream_results=True) as conn:
+            for i, chunk in enumerate(pd.read_sql(stmt, conn, chunksize=chunk_size)):
+                chunk = _coerce(_flatten(chunk, json_cols), dtypes)
+                if is_fact:
+                    new_wm = chunk[list(updated_labels)].max().max()
+                    if pd.notna(new_wm):
+                        watermark = max(watermark or "", pd.Timestamp(new_wm).isoformat())
+                    months = pd.to_datetime(chunk[partition_col]).dt.strftime("%Y-%m").fillna("unknown")
+                    for month, part in chunk.groupby(months):
+                        rel = os.path.join(name, f"month={month}", f"part-{export_id}-{i:05d}{FORMATS[fmt]}")
+                        _write(part, os.path.join(root, rel), fmt)
+                        state["files"].append(rel)
+                else:
+                    rel = os.path.join(name, f"part-{export_id}-{i:05d}{FORMATS[fmt]}")
+                    _write(chunk, os.path.join(root, rel), fmt)
+                    state["files"].append(rel)
+                rows += len(chunk)
+                if progress:
+                    progress(name, rows)
+
+        state["rows"] = state.get("rows", 0) + rows
+        if is_fact:
+            state["watermark"] = watermark
+        manifest["datasets"][name] = state
+        summary["rows"][name] = rows
+
+    manifest["exports"].append(summary)
+    _save_manifest(root, manifest)
+    return summary
+
+def _clear_dataset(root, name, state):
+    for rel in state.get("files", []):
+        path = os.path.join(root, rel)
+        if os.path.exists(path):
+            os.remove(path)
+
+def read_export(name, root=EXPORT_DIR, latest_only=True):
+    """
+    Load an exported dataset (memory-mapped for Arrow IPC). With `latest_only`,
+    rows re-exported by later incremental runs are collapsed to their newest version.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    manifest = load_manifest(root)
+    fmt = "ipc" if manifest.get("format") == "arrow" else "parquet"
+    files = [os.path.join(root, f) for f in manifest["datasets"].get(name, {}).get("files", [])]
+    if not files:
+        return pd.DataFrame()
+    # Later parts may carry extra flattened JSON keys, so unify all part schemas
+    schemas = [ds.dataset(f, format=fmt).schema for f in files]
+    try:
+        schema = pa.unify_schemas(schemas, promote_options="permissive")
+    except TypeError: # pyarrow < 14
+        schema = pa.unify_schemas(schemas)
+    df = ds.dataset(files, format=fmt, schema=schema).to_table().to_pandas()
+    if latest_only and name in LATEST_KEYS:
+        id_col, ts_col = LATEST_KEYS[name]
+        # Stable sort: a row re-exported for a parent change keeps its updated_at, the later part wins
+        df = df.sort_values(ts_col, kind="stable").drop_duplicates(id_col, keep="last").reset_index(drop=True)
+    return df
@@ -0,0 +1,723 @@
+import time
+import uuid
+import hashlib
+import datetime
+import io
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, or_, tuple_
+from app.database import engine
+from app.models import Recipe, SynthesisBatch, PerformanceTest, RawMaterial, StockSolutionBatch, QCMeasurement, ImportJob
+from app.summary import refresh_summary, tests_for
+from app.validation import RULES, validate_frame
+from app.journal import record, row_ops
+
+# Rows per executemany batch
+CHUNK_SIZE = 1000
+# Keys per IN (...) lookup (stays under SQLite's bound-parameter limit)
+LOOKUP_CHUNK = 500
+
+# Import types and their expected columns (headers)
+IMPORT_TYPES = {
+    "Raw Materials": ["material_name", "chemical_type", "brand", "lot_number", "molecular_weight", "purity_percent", "initial_quantity_kg", "received_date"],
+    "Stock Solutions": ["code", "chemical_type", "molarity", "target_volume_ml", "actual_mass_g", "preparation_date", "operator", "source_lot_number"],
+    "Recipes": ["name", "ca_si_ratio", "molarity_ca", "molarity_si", "solids_percent", "pce_dosage", "target_ph"],
+    "Synthesis Results": ["recipe_name", "batch_ref", "execution_date", "operator", "ph", "solids_measured", "strength_1d", "strength_28d", "flow"]
+}
+
+# --- Typed column arrays -----------------------------------------------------
+
+def _text(df, col, default=None):
+    """Column as stripped strings (None for empty cells); `default` if the column is missing."""
+    if col not in df.columns:
+        return pd.Series(default, index=df.index, dtype=object)
+    s = df[col]
+    return s.astype(object).where(s.notna(), None).map(lambda v: None if v is None else str(v).strip() or None)
+
+def _number(df, col, errors):
+    """Column as floats (NULL if the column is missing); unparseable cells are reported in `errors`."""
+    if col not in df.columns:
+        return pd.Series(np.nan, index=df.index, dtype=float)
+    raw = df[col]
+    num = pd.to_numeric(raw, errors="coerce")
+    _report(errors, raw, num.isna() & raw.notna(), col, "not a number")
+    return num
+
+def _date(df, col, errors):
+    """Column as timestamps (today if the column is missing); unparseable cells are reported."""
+    if col not in df.columns:
+        return pd.Series(pd.Timestamp(datetime.date.today()), index=df.index)
+    raw = df[col]
+    parsed = pd.to_datetime(raw, errors="coerce")
+    _report(errors, raw, parsed.isna() & raw.notna(), col, "not a date")
+    return parsed
+
+def _report(errors, raw, mask, col, message):
+    for i in raw.index[mask]:
+        errors.append({"row": i, "column": col, "value": raw.at[i], "error": message})
+
+def _new_ids(n):
+    return [uuid.uuid4() for _ in range(n)]
+
+def _records(frame):
+    """Row dicts ready for executemany: NaN/NaT become NULL."""
+    return frame.astype(object).where(frame.notna(), None).to_dict("records")
+
+def _valid(frame, errors):
+    """Drop rows that had a coercion error (they are reported, not imported)."""
+    bad = {e["row"] for e in errors}
+    return frame[~frame.index.isin(bad)] if bad else frame
+
+# --- Bulk SQL ----------------------------------------------------------------
+
+def _insert(conn, model, records, chunk_size=CHUNK_SIZE, progress=None):
+    """Chunked executemany INSERT. Python-side column defaults still apply."""
+    table = model.__table__
+    for start in range(0, len(records), chunk_size):
+        chunk = records[start:start + chunk_size]
+        conn.execute(table.insert(), chunk)
+        if progress:
+            progress(model.__tablename__, start + len(chunk), len(records))
+    return len(records)
+
+# Parent entities referenced by natural key in import files: (key column, id column, preferred-first order)
+LOOKUP_ENTITIES = {
+    "raw_material": (RawMaterial.lot_number, RawMaterial.id, RawMaterial.received_date.desc()),
+    "stock_solution": (StockSolutionBatch.code, StockSolutionBatch.id, None),
+    "recipe": (Recipe.name, Recipe.id, Recipe.created_at.desc()),
+    "batch": (SynthesisBatch.lab_notebook_ref, SynthesisBatch.id, None),
+}
+
+class LookupResolver:
+    """
+    Natural key -> id maps for the parents referenced by an import.
+
+    `prefetch` collects the distinct keys of a whole column and fetches the
+    ones not cached yet with one IN query per LOOKUP_CHUNK keys; `plan_missing`
+    also builds the missing parents so they can be inserted in one batch. Lookups are then served from
+    dicts, so an import costs O(entities) queries instead of O(rows).
+    Parents inserted earlier in the same transaction can be `register`ed.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.maps = {entity: {} for entity in LOOKUP_ENTITIES}
+        self.misses = {entity: set() for entity in LOOKUP_ENTITIES}
+        self.queries = 0
+
+    def prefetch(self, entity, keys):
+        key_col, id_col, order = LOOKUP_ENTITIES[entity]
+        known, misses = self.maps[entity], self.misses[entity]
+        todo = [k for k in dict.fromkeys(keys) if k is not None and k not in known and k not in misses]
+        for start in range(0, len(todo), LOOKUP_CHUNK):
+            chunk = todo[start:start + LOOKUP_CHUNK]
+            stmt = select(key_col, id_col).where(key_col.in_(chunk))
+            if order is not None:
+                stmt = stmt.order_by(order)
+            for key, row_id in self.conn.execute(stmt):
+                known.setdefault(key, row_id) # Duplicate keys: first in preferred order wins
+            self.queries += 1
+            misses.update(k for k in chunk if k not in known)
+        return known
+
+    def plan_missing(self, entity, keys, make_row):
+        """
+        Resolve keys; for each missing one build a parent row (`make_row(key)`
+        plus a new id) and register it. The caller inserts the returned rows
+        ahead of their children.
+        """
+        self.prefetch(entity, keys)
+        missing = [k for k in dict.fromkeys(keys) if k is not None and k not in self.maps[entity]]
+        rows = [dict(make_row(k), id=uuid.uuid4()) for k in missing]
+        self.register(entity, {k: r["id"] for k, r in zip(missing, rows)})
+        return rows
+
+    def register(self, entity, key_to_id):
+        self.maps[entity].update(key_to_id)
+        self.misses[entity].difference_update(key_to_id)
+
+    def map(self, entity, keys):
+        """Series of ids for a Series of keys (None where unresolved)."""
+        ids = keys.map(self.maps[entity])
+        return ids.astype(object).where(ids.notna(), None)
+
+# --- Import types ------------------------------------------------------------
+# Each prepare function turns one sheet into a write plan: (model, frame, key
+# columns) in dependency order. Key columns are None for rows that are always
+# inserted (e.g. auto-created parents).
+
+# Natural keys of each import type's main table (upsert conflict target / diff key)
+NATURAL_KEYS = {
+    "Raw Materials": ["material_name", "lot_number"],
+    "Stock Solutions": ["code"],
+    "Recipes": ["name"],
+    "Synthesis Results": ["lab_notebook_ref"],
+}
+# Columns that may be chosen as natural keys
+KEY_CANDIDATES = {
+    "Raw Materials": ["material_name", "lot_number", "brand", "chemical_type"],
+    "Stock Solutions": ["code"],
+    "Recipes": ["name"],
+    "Synthesis Results": ["lab_notebook_ref"],
+}
+# File headers of key columns whose model name differs
+KEY_HEADERS = {"lab_notebook_ref": "batch_ref"}
+# File headers of the other columns whose model name differs
+COLUMN_HEADERS = {
+    "raw_material_id": "source_lot_number",
+    "molarity_ca_no3": "molarity_ca", "molarity_na2sio3": "molarity_si",
+    "total_solid_content": "solids_percent", "pce_content_wt": "pce_dosage",
+    "recipe_id": "recipe_name", "solid_content_measured": "solids_measured",
+    "compressive_strength_1d": "strength_1d", "compressive_strength_28d": "strength_28d",
+}
+# Set when a row is created, never overwritten by an upsert
+INSERT_ONLY_COLUMNS = {"id", "remaining_quantity_kg", "created_at", "created_by", "status"}
+
+def _insert_only(frame, absent=()):
+    """INSERT_ONLY_COLUMNS plus the frame columns filled from `absent` file headers."""
+    return INSERT_ONLY_COLUMNS | {c for c in frame.columns if COLUMN_HEADERS.get(c, c) in absent}
+
+def _child_id(table, key):
+    """Stable id for rows derived from a natural key, so re-imports hit the same row."""
+    return uuid.uuid5(uuid.NAMESPACE_URL, f"nanogence-import/{table}/{key}")
+
+def _require_keys(frame, keys, errors):
+    """Upsert mode: rows without a complete natural key cannot be matched and are reported."""
+    for col in keys or ():
+        _report(errors, frame[col], frame[col].isna(), col, "missing natural key")
+    return _valid(frame, errors)
+
+def _prepare_raw_materials(df, errors, resolver, keys):
+    qty = _number(df, "initial_quantity_kg", errors)
+    frame = pd.DataFrame({
+        "material_name": _text(df, "material_name", ""),
+        "chemical_type": _text(df, "chemical_type", "Other"),
+        "brand": _text(df, "brand", "Unknown"),
+        "lot_number": _text(df, "lot_number", ""),
+        "molecular_weight": _number(df, "molecular_weight", errors),
+        "purity_percent": _number(df, "purity_percent", errors),
+        "initial_quantity_kg": qty,
+        "remaining_quantity_kg": qty,
+        "received_date": _date(df, "received_date", errors),
+    })
+    frame = _require_keys(_valid(frame, errors), keys, errors)
+    frame.insert(0, "id", _new_ids(len(frame)))
+    return [(RawMaterial, frame, keys)]
+
+def _prepare_stock_solutions(df, errors, resolver, keys):
+    lots = _text(df, "source_lot_number")
+    frame = pd.DataFrame({
+        "code": _text(df, "code", ""),
+        "chemical_type": _text(df, "chemical_type", ""),
+        "molarity": _number(df, "molarity", errors),
+        "target_volume_ml": _number(df, "target_volume_ml", errors),
+        "actual_mass_g": _number(df, "actual_mass_g", errors),
+        "preparation_date": _date(df, "preparation_date", errors),
+        "operator": _text(df, "operator", "Import"),
+    })
+    frame = _require_keys(_valid(frame, errors), keys, errors)
+    resolver.prefetch("raw_material", lots.loc[frame.index])
+    frame["raw_material_id"] = resolver.map("raw_material", lots.loc[frame.index])
+    frame.insert(0, "id", _new_ids(len(frame)))
+    return [(StockSolutionBatch, frame, keys)]
+
+def _prepare_recipes(df, errors, resolver, keys):
+    frame = pd.DataFrame({
+        "name": _text(df, "name", ""),
+        "ca_si_ratio": _number(df, "ca_si_ratio", errors),
+        "molarity_ca_no3": _number(df, "molarity_ca", errors),
+        "molarity_na2sio3": _number(df, "molarity_si", errors),
+        "total_solid_content": _number(df, "solids_percent", errors),
+        "pce_content_wt": _number(df, "pce_dosage", errors),
+        "target_ph": _number(df, "target_ph", errors),
+    })
+    frame = _require_keys(_valid(frame, errors), keys, errors)
+    frame["created_by"] = "Import"
+    frame.insert(0, "id", _new_ids(len(frame)))
+    return [(Recipe, frame, keys)]
+
+def _prepare_synthesis_results(df, errors, resolver, keys):
+    recipe_names = _text(df, "recipe_name", "")
+    frame = pd.DataFrame({
+        "lab_notebook_ref": _text(df, "batch_ref"),
+        "execution_date": _date(df, "execution_date", errors),
+        "operator": _text(df, "operator", "Import"),
+        "ph": _number(df, "ph", errors),
+        "solid_content_measured": _number(df, "solids_measured", errors),
+        "compressive_strength_1d": _number(df, "strength_1d", errors),
+        "compressive_strength_28d": _number(df, "strength_28d", errors),
+        "flow": _number(df, "flow", errors),
+    })
+    frame = _require_keys(_valid(frame, errors), keys, errors)
+    names = recipe_names.loc[frame.index]
+
+    # Recipes by name; unknown names are created in one batch
+    new_recipes = resolver.plan_missing("recipe", names, lambda n: {"name": n, "created_by": "Auto-Import"})
+
+    refs = frame["lab_notebook_ref"]
+    refs = refs.where(refs.notna(), pd.Series([f"IMP-{uuid.uuid4().hex[:6]}" for _ in refs], index=refs.index))
+    # Existing batches keep their id, so QC and test rows attach to them
+    resolver.prefetch("batch", refs)
+    batch_ids = [resolver.maps["batch"].get(r) or uuid.uuid4() for r in refs]
+    batches = pd.DataFrame({
+        "id": batch_ids,
+        "recipe_id": resolver.map("recipe", names).to_numpy(),
+        "lab_notebook_ref": refs.to_numpy(),
+        "execution_date": frame["execution_date"].to_numpy(),
+        "operator": frame["operator"].to_numpy(),
+        "status": "Completed",
+    })
+    qc = pd.DataFrame({
+        "id": [_child_id("qc_measurements", r) for r in refs],
+        "batch_id": batch_ids,
+        "ph": frame["ph"].to_numpy(),
+        "solid_content_measured": frame["solid_content_measured"].to_numpy(),
+    })
+    perf = pd.DataFrame({
+        "id": [_child_id("performance_tests", r) for r in refs],
+        "batch_id": batch_ids,
+        "test_type": "Mortar",
+        "compressive_strength_1d": frame["compressive_strength_1d"].to_numpy(),
+        "compressive_strength_28d": frame["compressive_strength_28d"].to_numpy(),
+        "flow": frame["flow"].to_numpy(),
+    })
+    return [
+        (Recipe, pd.DataFrame(new_recipes, columns=["id", "name", "created_by"]), None),
+        (SynthesisBatch, batches, keys),
+        (QCMeasurement, qc, ["id"]),
+        (PerformanceTest, perf, ["id"]),
+    ]
+
+PREPARERS = {
+    "Raw Materials": _prepare_raw_materials,
+    "Stock Solutions": _prepare_stock_solutions,
+    "Recipes": _prepare_recipes,
+    "Synthesis Results": _prepare_synthesis_results,
+}
+
+# --- Upsert and diff ---------------------------------------------------------
+
+def _fetch_existing(conn, model, frame, key_cols, columns=()):
+    """Existing rows matching the frame's natural keys (id, keys and `columns`), one IN query per chunk."""
+    table = model.__table__
+    cols = [table.c[c] for c in dict.fromkeys(["id", *key_cols, *columns])]
+    names = [c.name for c in cols]
+    keys = frame[key_cols].drop_duplicates()
+    parts = []
+    for start in range(0, len(keys), LOOKUP_CHUNK):
+        chunk = keys.iloc[start:start + LOOKUP_CHUNK]
+        if len(key_cols) == 1:
+            cond = table.c[key_cols[0]].in_(chunk[key_cols[0]].tolist())
+        else:
+            cond = tuple_(*[table.c[k] for k in key_cols]).in_([tuple(r) for r in chunk.itertuples(index=False)])
+        parts.append(pd.DataFrame(conn.execute(select(*cols).where(cond)).all(), columns=names))
+    existing = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=names)
+    return existing.drop_duplicates(key_cols)
+
+def _align_ids(conn, model, frame, key_cols):
+    """Give rows that already exist (by natural key) their stored id."""
+    if key_cols == ["id"] or frame.empty:
+        return frame
+    existing = _fetch_existing(conn, model, frame, key_cols)
+    found = frame[key_cols].merge(existing, on=key_cols, how="left")["id"].to_numpy()
+    frame = frame.copy()
+    frame["id"] = [f if isinstance(f, uuid.UUID) else own for f, own in zip(found, frame["id"])]
+    return frame
+
+def _upsert(conn, model, records, key_cols, chunk_size=CHUNK_SIZE, progress=None, insert_only=INSERT_ONLY_COLUMNS):
+    """
+    Chunked INSERT ... ON CONFLICT (id) DO UPDATE, skipping rows whose values
+    are unchanged. Ids are aligned by natural key beforehand (_align_ids), so
+    the primary key is the conflict target and no unique index on the natural
+    key is needed.
+    """
+    if not records:
+        return 0
+    table = model.__table__
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif conn.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise NotImplementedError(f"Upsert is not supported on {conn.dialect.name}")
+    stmt = dialect_insert(table)
+    value_cols = [c for c in records[0] if c not in key_cols and c not in insert_only]
+    if value_cols:
+        updates = {c: stmt.excluded[c] for c in value_cols}
+        if "updated_at" in table.c:
+            updates["updated_at"] = datetime.datetime.utcnow()
+        changed = or_(*[table.c[c].is_distinct_from(stmt.excluded[c]) for c in value_cols])
+        stmt = stmt.on_conflict_do_update(index_elements=[table.c.id], set_=updates, where=changed)
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[table.c.id])
+    for start in range(0, len(records), chunk_size):
+        chunk = records[start:start + chunk_size]
+        conn.execute(stmt, chunk)
+        if progress:
+            progress(model.__tablename__, start + len(chunk), len(records))
+    return len(records)
+
+def _differs(model, col, new, old):
+    """Vectorized "value changed" test using the column's SQL type."""
+    try:
+        py = model.__table__.c[col].type.python_type
+    except (KeyError, NotImplementedError):
+        py = str
+    if py is float or py is int:
+        a, b = pd.to_numeric(new, errors="coerce"), pd.to_numeric(old, errors="coerce")
+        same = (a.isna() & b.isna()) | np.isclose(a.fillna(0), b.fillna(0), rtol=1e-9, atol=1e-12) & (a.notna() == b.notna())
+        return ~same
+    if py is datetime.datetime:
+        a, b = pd.to_datetime(new, errors="coerce"), pd.to_datetime(old, errors="coerce")
+        return ~((a.isna() & b.isna()) | (a == b))
+    a = new.astype(object).where(new.notna(), None).map(lambda v: None if v is None else str(v))
+    b = old.astype(object).where(old.notna(), None).map(lambda v: None if v is None else str(v))
+    return ~((a.isna() & b.isna()) | (a == b))
+
+def diff_plan(conn, plan, absent=()):
+    """
+    Dry run: classify every planned row as new / changed / unchanged against
+    the database with one keyed lookup per table. Nothing is written.
+    Returns {table: DataFrame(keys..., status, changed_columns)}.
+    """
+    diffs = {}
+    for model, frame, key_cols in plan:
+        if frame.empty:
+            continue
+        table = model.__tablename__
+        if not key_cols:
+            diffs[table] = frame.assign(status="new", changed_columns="")[["status", "changed_columns"] + [c for c in frame.columns if c != "id"]]
+            continue
+        frame = frame.drop_duplicates(key_cols, keep="last")
+        insert_only = _insert_only(frame, absent)
+        compare = [c for c in frame.columns if c not in key_cols and c not in insert_only]
+        existing = _fetch_existing(conn, model, frame, key_cols, compare)
+        if "id" not in key_cols:
+            existing = existing.drop(columns="id")
+        merged = frame.merge(existing, on=key_cols, how="left", suffixes=("", "__db"), indicator=True)
+        is_new = (merged["_merge"] == "left_only").to_numpy()
+        changed = pd.DataFrame({c: _differs(model, c, merged[c], merged[f"{c}__db"]).to_numpy() for c in compare}, index=merged.index)
+        changed.loc[is_new] = False
+        names = np.array(compare, dtype=object)
+        changed_cols = [", ".join(names[row]) for row in changed.to_numpy()] if compare else [""] * len(merged)
+        status = np.where(is_new, "new", np.where(changed.any(axis=1).to_numpy() if compare else False, "changed", "unchanged"))
+        shown = [c for c in key_cols if c != "id"] or ["id"]
+        diffs[table] = pd.DataFrame({**{k: merged[k] for k in shown}, "status": status, "changed_columns": changed_cols})
+    return diffs
+
+# --- Execution -----------------------------------------------------------------
+
+def _execute(conn, plan, mode, chunk_size, progress, absent=()):
+    """Write a plan with plain inserts or upserts and refresh the affected summary rows."""
+    counts, written, journal = {}, {}, {}
+    for model, frame, key_cols in plan:
+        if frame.empty:
+            continue
+        table = model.__tablename__
+        if mode == "upsert" and key_cols:
+            frame = _align_ids(conn, model, frame.drop_duplicates(key_cols, keep="last"), key_cols)
+            records = _records(frame)
+            insert_only = _insert_only(frame, absent)
+            n = _upsert(conn, model, records, key_cols, chunk_size, progress, insert_only)
+            ops = row_ops(table, "S", records)
+            for op in ops:
+                op["insert_only"] = sorted(insert_only)
+        else:
+            records = _records(frame)
+            n = _insert(conn, model, records, chunk_size, progress)
+            ops = row_ops(table, "I", records)
+        journal.setdefault(table, []).extend(ops)
+        counts[table] = counts.get(table, 0) + n
+        written.setdefault(table, []).extend(frame["id"])
+    # Core writes skip the ORM flush hooks that maintain experiment_summary and the change journal
+    record(conn, journal)
+    test_ids = set(written.get("performance_tests", ()))
+    test_ids.update(tests_for(
+        conn,
+        material_ids=written.get("raw_materials"), stock_ids=written.get("stock_solution_batches"),
+        recipe_ids=written.get("recipes"), batch_ids=written.get("synthesis_batches"),
+    ))
+    if test_ids:
+        refresh_summary(conn, test_ids)
+    return counts
+
+def key_headers(import_type, keys=None):
+    """File headers of the natural key columns (model names in `keys`, default NATURAL_KEYS)."""
+    return [KEY_HEADERS.get(k, k) for k in (keys or NATURAL_KEYS[import_type])]
+
+def _import_frame(conn, import_type, df, errors, resolver, mode="insert", keys=None, chunk_size=CHUNK_SIZE, progress=None):
+    keys = list(keys or NATURAL_KEYS[import_type]) if mode != "insert" else None
+    # Whole-sheet validation before any DB work; failing rows are reported and dropped
+    found, _ = validate_frame(import_type, df, key_headers(import_type, keys))
+    errors.extend(found)
+    df = _valid(df, errors)
+    plan = PREPARERS[import_type](df, errors, resolver, keys)
+    # Columns the file does not have keep their stored values when a row is updated
+    absent = set(IMPORT_TYPES[import_type]) - set(df.columns)
+    if mode == "dry_run":
+        return diff_plan(conn, plan, absent)
+    return _execute(conn, plan, mode, chunk_size, progress, absent)
+
+IMPORT_MODES = {"insert": "Insert new rows", "upsert": "Upsert by natural key", "dry_run": "Dry run (diff only)"}
+
+def run_import(import_type, df, mode="insert", keys=None, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Set-based import of one sheet: columns are coerced as whole arrays, foreign
+    keys resolved up front by a LookupResolver and rows written with chunked
+    executemany, all in a single transaction (nothing is written if any
+    statement fails). Rows failing validate_frame (types, ranges, dates,
+    duplicate keys) are skipped and listed in `errors`.
+
+    mode: "insert" (plain INSERT), "upsert" (update rows matched on the natural
+    `keys`, default NATURAL_KEYS, insert the rest) or "dry_run" (returns the
+    new / changed / unchanged diff in `diff` and writes nothing). Numeric
+    columns missing from the file are inserted as NULL; rows updated by an
+    upsert keep the stored value of any column the file does not have.
+    `progress(table, done, total)` is called after each chunk.
+    """
+    errors = []
+    started = time.perf_counter()
+    df = df.reset_index(drop=True)
+    with engine.begin() as conn:
+        resolver = LookupResolver(conn)
+        out = _import_frame(conn, import_type, df, errors, resolver, mode, keys, chunk_size, progress)
+    if mode == "dry_run":
+        result = _result(import_type, len(df), {}, errors, resolver, time.perf_counter() - started)
+        result["diff"] = out
+        result["diff_counts"] = {t: d["status"].value_counts().to_dict() for t, d in out.items()}
+        return result
+    return _result(import_type, len(df), out, errors, resolver, time.perf_counter() - started)
+
+def _result(import_type, rows, inserted, errors, resolver, elapsed):
+    skipped = len({e["row"] for e in errors})
+    imported = rows - skipped
+    return {
+        "type": import_type,
+        "rows": rows,
+        "imported": imported,
+        "skipped": skipped,
+        "inserted": inserted,
+        "errors": errors,
+        "lookup_queries": resolver.queries,
+        "seconds": round(elapsed, 3),
+        "rows_per_s": round(imported / elapsed, 1) if elapsed > 0 else None,
+    }
+
+# --- Streaming import with checkpoints ---------------------------------------
+
+# Data rows per committed chunk in streaming mode
+STREAM_CHUNK_ROWS = 5000
+HASH_BLOCK = 1024 * 1024
+
+def file_sha256(fileobj):
+    """SHA-256 of a file-like object, read in blocks; the position is reset afterwards."""
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for block in iter(lambda: fileobj.read(HASH_BLOCK), b""):
+        digest.update(block)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+def iter_file_chunks(fileobj, file_name, chunk_rows=STREAM_CHUNK_ROWS, sheet_name=None):
+    """
+    Yield DataFrames of at most `chunk_rows` data rows, without loading the whole
+    file: CSV through pandas' chunked reader, XLSX through openpyxl read-only
+    row iteration. Fully empty rows are skipped in both formats.
+    """
+    if file_name.lower().endswith(".csv"):
+        yield from pd.read_csv(fileobj, chunksize=chunk_rows)
+        return
+    from openpyxl import load_workbook
+    wb = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name] if sheet_name else wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else f"column_{i}" for i, h in enumerate(next(rows, ()))]
+        buffer = []
+        for values in rows:
+            if all(v is None for v in values):
+                continue
+            buffer.append(values[:len(header)])
+            if len(buffer) == chunk_rows:
+                yield pd.DataFrame(buffer, columns=header)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=header)
+    finally:
+        wb.close()
+
+def find_import_job(conn, file_hash, import_type, sheet_name=""):
+    """Latest checkpoint row for this file / import type / sheet, if any."""
+    jobs = ImportJob.__table__
+    return conn.execute(
+        select(jobs).where(
+            jobs.c.file_hash == file_hash,
+            jobs.c.import_type == import_type,
+            jobs.c.sheet_name == (sheet_name or "")
+        ).order_by(jobs.c.started_at.desc()).limit(1)
+    ).first()
+
+def run_streaming_import(import_type, fileobj, file_name, sheet_name=None, chunk_rows=STREAM_CHUNK_ROWS, restart=False, mode="insert", keys=None, progress=None):
+    """
+    Import a file of any size chunk by chunk. Each chunk is imported with the
+    set-based engine and committed together with its checkpoint (rows done)
+    in the import_jobs table, so a failure loses at most the current chunk.
+    Re-running with the same file (same SHA-256) resumes after the last
+    committed row; a completed job is not imported again unless `restart`.
+    `progress(rows_done)` is called after each committed chunk.
+    """
+    if mode == "dry_run":
+        raise ValueError("Streaming imports write as they go; run the dry-run diff on a regular import instead.")
+    started = time.perf_counter()
+    file_hash = file_sha256(fileobj)
+    sheet = sheet_name or ""
+    jobs = ImportJob.__table__
+
+    with engine.begin() as conn:
+        job = find_import_job(conn, file_hash, import_type, sheet)
+        if job is not None and job.status == "completed" and not restart:
+            return {"type": import_type, "job_id": job.id, "status": "already_imported", "resumed_from": job.rows_committed,
+                    "rows": 0, "imported": 0, "skipped": 0, "inserted": {}, "errors": [], "lookup_queries": 0, "seconds": 0.0, "rows_per_s": None}
+        if job is None or restart:
+            job_id, done, skipped_before = uuid.uuid4(), 0, 0
+            conn.execute(jobs.insert().values(
+                id=job_id, file_hash=file_hash, file_name=file_name, import_type=import_type,
+                sheet_name=sheet, status="running", rows_committed=0, rows_skipped=0
+            ))
+        else:
+            job_id, done, skipped_before = job.id, job.rows_committed or 0, job.rows_skipped or 0
+    resumed_from = done
+
+    errors, inserted, rows_seen = [], {}, 0
+    resolver = LookupResolver(None)
+    try:
+        for chunk in iter_file_chunks(fileobj, file_name, chunk_rows, sheet_name):
+            start_row = rows_seen
+            rows_seen += len(chunk)
+            if rows_seen <= done:
+                continue # Committed in an earlier run
+            if start_row < done:
+                chunk = chunk.iloc[done - start_row:]
+                start_row = done
+            # Global row numbers, so errors point at the file row
+            chunk.index = pd.RangeIndex(start_row, start_row + len(chunk))
+            chunk_errors = []
+            with engine.begin() as conn:
+                resolver.conn = conn
+                counts = _import_frame(conn, import_type, chunk, chunk_errors, resolver, mode, keys)
+                done = start_row + len(chunk)
+                skipped_before += len({e["row"] for e in chunk_errors})
+                conn.execute(jobs.update().where(jobs.c.id == job_id).values(
+                    rows_committed=done, rows_skipped=skipped_before, updated_at=datetime.datetime.utcnow()
+                ))
+            errors.extend(chunk_errors)
+            for table, n in counts.items():
+                inserted[table] = inserted.get(table, 0) + n
+            if progress:
+                progress(done)
+    except Exception as e:
+        with engine.begin() as conn:
+            conn.execute(jobs.update().where(jobs.c.id == job_id).values(
+                status="failed", error=str(e)[:1000], updated_at=datetime.datetime.utcnow()
+            ))
+        raise
+
+    with engine.begin() as conn:
+        conn.execute(jobs.update().where(jobs.c.id == job_id).values(
+            status="completed", error=None, updated_at=datetime.datetime.utcnow()
+        ))
+    result = _result(import_type, done - resumed_from, inserted, errors, resolver, time.perf_counter() - started)
+    result.update({"job_id": job_id, "status": "completed", "resumed_from": resumed_from})
+    return result
+
+# --- Workbook import ---------------------------------------------------------
+
+# Dependency order: parents before the sheets that reference them
+IMPORT_ORDER = ["Raw Materials", "Stock Solutions", "Recipes", "Synthesis Results"]
+# Expected headers (required ones included) a sheet must carry to be mapped to a type
+SIGNATURE_MIN_MATCHES = 2
+# Sheets parsed in parallel
+PARSE_WORKERS = 4
+
+def detect_import_type(columns):
+    """
+    Import type whose header signature best matches `columns`: all required
+    headers present, at least SIGNATURE_MIN_MATCHES expected headers and the
+    largest share of them (None if no type qualifies).
+    """
+    headers = {str(c).strip() for c in columns}
+    best, best_share = None, 0.0
+    for import_type, expected in IMPORT_TYPES.items():
+        required = {c for c, rule in RULES[import_type].items() if rule.get("required")}
+        if not required <= headers:
+            continue
+        matches = len(headers & set(expected))
+        if matches >= SIGNATURE_MIN_MATCHES and matches / len(expected) > best_share:
+            best, best_share = import_type, matches / len(expected)
+    return best
+
+def _read_sheet(data, sheet_name):
+    """One sheet of an in-memory XLSX as a DataFrame (own read-only workbook, so sheets can be read concurrently)."""
+    chunks = list(iter_file_chunks(io.BytesIO(data), "workbook.xlsx", STREAM_CHUNK_ROWS, sheet_name))
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+def read_workbook(fileobj, max_workers=PARSE_WORKERS):
+    """
+    All sheets of an XLSX upload as {sheet name: DataFrame}, in workbook order.
+    The file is read once; sheets are parsed concurrently.
+    """
+    from openpyxl import load_workbook
+    fileobj.seek(0)
+    data = fileobj.read()
+    wb = load_workbook(io.BytesIO(data), read_only=True)
+    names = wb.sheetnames
+    wb.close()
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(names)) or 1) as pool:
+        frames = pool.map(lambda name: _read_sheet(data, name), names)
+        return dict(zip(names, frames))
+
+def workbook_plan(sheets, types=None):
+    """
+    [(sheet name, import type)] for the sheets to import, in IMPORT_ORDER.
+    `types` overrides the detected type per sheet (None skips the sheet).
+    """
+    types = types or {}
+    plan = []
+    for name, df in sheets.items():
+        import_type = types[name] if name in types else detect_import_type(df.columns)
+        if import_type is not None and not df.empty:
+            plan.append((name, import_type))
+    return sorted(plan, key=lambda item: IMPORT_ORDER.index(item[1]))
+
+def run_workbook_import(sheets, types=None, mode="insert", keys=None, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Import every recognised sheet of a workbook (see workbook_plan) in
+    dependency order within one transaction: a failing sheet rolls back the
+    whole workbook. `keys` optionally maps import type -> natural key columns.
+    Returns {"order", "sheets": {sheet: per-sheet result}, "seconds"}.
+
+    A dry run diffs each sheet against the database as it is, so references
+    to parents that only exist in an earlier sheet show up as unresolved.
+    """
+    keys = keys or {}
+    plan = workbook_plan(sheets, types)
+    results = {}
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        for name, import_type in plan:
+            sheet_started = time.perf_counter()
+            df = sheets[name].reset_index(drop=True)
+            errors = []
+            # Fresh maps per sheet: parents inserted by earlier sheets are found in this transaction
+            resolver = LookupResolver(conn)
+            out = _import_frame(conn, import_type, df, errors, resolver, mode, keys.get(import_type), chunk_size, progress)
+            elapsed = time.perf_counter() - sheet_started
+            if mode == "dry_run":
+                result = _result(import_type, len(df), {}, errors, resolver, elapsed)
+                result["diff"] = out
+                result["diff_counts"] = {t: d["status"].value_counts().to_dict() for t, d in out.items()}
+            else:
+                result = _result(import_type, len(df), out, errors, resolver, elapsed)
+            results[name] = result
+    return {"order": plan, "sheets": results, "seconds": round(time.perf_counter() - started, 3)}
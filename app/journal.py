@@ -0,0 +1,269 @@
+import uuid
+import datetime
+from itertools import groupby
+from sqlalchemy import event, select, func, create_engine, DateTime, Date, inspect as sa_inspect
+from sqlalchemy.dialects.postgresql import UUID
+from app.database import engine, Base, SessionLocal
+from app.models import ChangeJournal
+from app.summary import refresh_summary, tests_for
+
+# Derived or bookkeeping tables are not journaled (experiment_summary is rebuilt after a replay;
+# import_jobs only holds checkpoints of streaming imports, whose rows are journaled)
+EXCLUDED_TABLES = {"experiment_summary", "change_journal", "system_logs", "import_jobs"}
+# Tables whose changes move experiment_summary rows, and the tests_for() argument they feed
+SUMMARY_KEYS = {
+    "raw_materials": "material_ids", "stock_solution_batches": "stock_ids", "recipes": "recipe_ids",
+    "synthesis_batches": "batch_ids", "performance_tests": "test_ids",
+}
+READ_BATCH = 500
+# Ops per journal record for bulk writes
+JOURNAL_CHUNK = 1000
+
+def _tables():
+    return {t.name: t for t in Base.metadata.sorted_tables if t.name not in EXCLUDED_TABLES}
+
+def _encode(value):
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+def _decode(column, value):
+    if value is None:
+        return None
+    if isinstance(column.type, UUID):
+        return uuid.UUID(value)
+    if isinstance(column.type, DateTime):
+        return datetime.datetime.fromisoformat(value)
+    if isinstance(column.type, Date):
+        return datetime.date.fromisoformat(value)
+    return value
+
+def _decode_row(table, row):
+    return {k: _decode(table.c[k], v) for k, v in (row or {}).items() if k in table.c}
+
+def _pk(table):
+    return list(table.primary_key.columns)[0]
+
+# --- Capture -----------------------------------------------------------------
+
+def row_ops(table_name, op, records):
+    """Journal ops for plain row dicts (bulk / core writes that bypass the flush hooks)."""
+    pk = _pk(_tables()[table_name]).name
+    return [{"op": op, "id": _encode(r[pk]), "row": {k: _encode(v) for k, v in r.items()}} for r in records]
+
+def record(conn, ops_by_table, flush_id=None):
+    """Write one journal record per table (ops in order) on `conn`, inside the caller's transaction."""
+    flush_id = flush_id or uuid.uuid4()
+    now = datetime.datetime.utcnow()
+    rows = [
+        {"flush_id": flush_id, "changed_at": now, "table_name": name, "changes": ops[i:i + JOURNAL_CHUNK]}
+        for name in _tables() if (ops := ops_by_table.get(name)) # Parents first
+        for i in range(0, len(ops), JOURNAL_CHUNK)
+    ]
+    if rows:
+        conn.execute(ChangeJournal.__table__.insert(), rows)
+    return flush_id
+
+def _column_attrs(state):
+    table = state.mapper.local_table
+    return table, [(a.key, a.columns[0]) for a in state.mapper.column_attrs if a.columns[0].table is table]
+
+def _object_op(session, obj):
+    state = sa_inspect(obj)
+    table, attrs = _column_attrs(state)
+    if table.name in EXCLUDED_TABLES:
+        return None, None
+    pk = _encode(state.dict.get(state.mapper.get_property_by_column(_pk(table)).key))
+    if obj in session.new:
+        row = {col.name: _encode(state.dict[key]) for key, col in attrs if key in state.dict}
+        return table.name, {"op": "I", "id": pk, "row": row}
+    if obj in session.deleted:
+        row = {col.name: _encode(state.dict[key]) for key, col in attrs if key in state.dict}
+        return table.name, {"op": "D", "id": pk, "row": row}
+    row, old = {}, {}
+    for key, col in attrs:
+        hist = state.attrs[key].history
+        if hist.has_changes():
+            row[col.name] = _encode(hist.added[0] if hist.added else None)
+            old[col.name] = _encode(hist.deleted[0] if hist.deleted else None)
+    if not row:
+        return None, None
+    return table.name, {"op": "U", "id": pk, "row": row, "old": old}
+
+@event.listens_for(SessionLocal, "before_flush")
+def _load_deleted(session, flush_context, instances):
+    # Full before-image of deleted rows, so a delete can be undone or replayed
+    for obj in session.deleted:
+        state = sa_inspect(obj)
+        for key in state.unloaded & {a.key for a in state.mapper.column_attrs}:
+            getattr(obj, key)
+
+@event.listens_for(SessionLocal, "after_flush")
+def _journal_flush(session, flush_context):
+    ops = {}
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        name, op = _object_op(session, obj)
+        if op:
+            ops.setdefault(name, []).append(op)
+    if ops:
+        record(session.connection(), ops)
+
+# --- Read / replay -----------------------------------------------------------
+
+def journal_position(conn):
+    """Highest journal sequence number (0 if the journal is empty)."""
+    return conn.execute(select(func.coalesce(func.max(ChangeJournal.seq), 0))).scalar()
+
+def position_at(conn, until):
+    """Last sequence number written at or before `until` (UTC, like all timestamps)."""
+    return conn.execute(select(func.coalesce(func.max(ChangeJournal.seq), 0)).where(ChangeJournal.changed_at <= until)).scalar()
+
+def read_changes(conn, after=0, upto=None, tables=None):
+    """
+    Journal records with after < seq <= upto, oldest first, as dicts. Feed for
+    incremental consumers: keep the last `seq` seen and pass it as `after`.
+    """
+    j = ChangeJournal.__table__
+    stmt = select(j).where(j.c.seq > after).order_by(j.c.seq)
+    if upto is not None:
+        stmt = stmt.where(j.c.seq <= upto)
+    if tables:
+        stmt = stmt.where(j.c.table_name.in_(list(tables)))
+    for row in conn.execution_options(yield_per=READ_BATCH).execute(stmt).mappings():
+        yield dict(row)
+
+def _apply_op(conn, table, op):
+    pk = _pk(table)
+    row_id = _decode(pk, op["id"])
+    values = _decode_row(table, op.get("row"))
+    if op["op"] == "I":
+        conn.execute(table.insert().values(**values))
+    elif op["op"] == "U":
+        conn.execute(table.update().where(pk == row_id).values(**values))
+    elif op["op"] == "D":
+        conn.execute(table.delete().where(pk == row_id))
+    elif op["op"] == "S":
+        keep = set(op.get("insert_only") or ())
+        if conn.execute(select(pk).where(pk == row_id)).first() is None:
+            conn.execute(table.insert().values(**values))
+        else:
+            conn.execute(table.update().where(pk == row_id).values(**{k: v for k, v in values.items() if k not in keep}))
+
+def apply_changes(conn, entries):
+    """
+    Apply journal records to `conn`. Records of one flush are applied parents
+    first for inserts / updates and children first for deletes.
+    """
+    tables = _tables()
+    applied = 0
+    for _, group in groupby(entries, key=lambda e: e["flush_id"]):
+        group = [e for e in group if e["table_name"] in tables]
+        for entry in group:
+            for op in entry["changes"]:
+                if op["op"] != "D":
+                    _apply_op(conn, tables[entry["table_name"]], op)
+                    applied += 1
+        for entry in reversed(group):
+            for op in entry["changes"]:
+                if op["op"] == "D":
+                    _apply_op(conn, tables[entry["table_name"]], op)
+                    applied += 1
+    return applied
+
+def replay(target_conn, source_conn, upto=None):
+    """
+    Bring a restored copy (`target_conn`) forward to journal position `upto`
+    (default: everything) using the live journal on `source_conn`. The copy's
+    own journal tells where it stopped. The journal records are copied too.
+    """
+    base = journal_position(target_conn)
+    entries = list(read_changes(source_conn, after=base, upto=upto))
+    applied = apply_changes(target_conn, entries)
+    if entries:
+        target_conn.execute(ChangeJournal.__table__.insert(), entries)
+        refresh_summary(target_conn)
+    return {"from_seq": base, "to_seq": entries[-1]["seq"] if entries else base, "records": len(entries), "changes": applied}
+
+def recover_to(until, dest, root=None):
+    """
+    Point-in-time recovery into a new SQLite file `dest`: restore the newest
+    snapshot taken before `until` (UTC) and replay the journal up to it.
+    """
+    from app.snapshots import STORE_DIR, list_snapshots, restore_snapshot
+    root = root or STORE_DIR
+    with engine.connect() as live:
+        target = position_at(live, until)
+        candidates = [m for m in list_snapshots(root) if m.get("journal_seq") is not None and m["journal_seq"] <= target]
+        if not candidates:
+            raise ValueError(f"No snapshot in {root} is older than {until}")
+        snapshot = max(candidates, key=lambda m: m["journal_seq"])
+        restore_snapshot(snapshot["id"], dest, root)
+        copy = create_engine(f"sqlite:///{dest}")
+        try:
+            with copy.begin() as conn:
+                result = replay(conn, live, upto=target)
+        finally:
+            copy.dispose()
+    result["snapshot"] = snapshot["id"]
+    return result
+
+def prune_journal(conn, upto):
+    """Drop records up to `upto` (e.g. the journal position of the oldest retained snapshot)."""
+    j = ChangeJournal.__table__
+    return conn.execute(j.delete().where(j.c.seq <= upto)).rowcount
+
+# --- Undo --------------------------------------------------------------------
+
+_INVERSE = {"I": "D", "D": "I", "U": "U"}
+
+def recent_deletes(conn, table_name, limit=20):
+    """[(flush_id, changed_at, before-image)] of the latest deletes in a table that are still deleted, newest first."""
+    j = ChangeJournal.__table__
+    stmt = select(j).where(j.c.table_name == table_name).order_by(j.c.seq.desc()).limit(limit * 5)
+    out = []
+    for entry in conn.execute(stmt).mappings():
+        for op in entry["changes"]:
+            if op["op"] == "D":
+                out.append((entry["flush_id"], entry["changed_at"], op["row"]))
+    # Rows restored since (or re-created with the same id) are no longer deleted
+    table = _tables()[table_name]
+    pk = _pk(table)
+    ids = [_decode(pk, row.get(pk.name)) for _, _, row in out]
+    existing = set(conn.execute(select(pk).where(pk.in_(ids))).scalars()) if ids else set()
+    return [d for d, row_id in zip(out, ids) if row_id not in existing][:limit]
+
+def undo_flush(conn, flush_id):
+    """
+    Revert every change of one flush (e.g. a recipe delete together with the
+    batches it detached): inserts are deleted, deletes re-inserted, updates
+    set back. The reverting changes are journaled as a new flush.
+    """
+    j = ChangeJournal.__table__
+    entries = [dict(e) for e in conn.execute(select(j).where(j.c.flush_id == flush_id).order_by(j.c.seq)).mappings()]
+    if not entries:
+        raise ValueError("Nothing to undo")
+    inverse = {}
+    for entry in entries:
+        ops = inverse.setdefault(entry["table_name"], [])
+        for op in entry["changes"]:
+            if op["op"] not in _INVERSE or (op["op"] == "U" and op.get("old") is None):
+                raise ValueError("Bulk writes without a before-image cannot be undone")
+            row = op.get("old") if op["op"] == "U" else op["row"]
+            ops.append({"op": _INVERSE[op["op"]], "id": op["id"], "row": row, "old": op["row"] if op["op"] == "U" else None})
+    undo_id = uuid.uuid4()
+    apply_changes(conn, [{"flush_id": undo_id, "table_name": name, "changes": inverse[name]} for name in _tables() if name in inverse])
+    record(conn, inverse, undo_id)
+
+    ids = {key: set() for key in SUMMARY_KEYS.values()}
+    for name, ops in inverse.items():
+        for op in ops:
+            if name in SUMMARY_KEYS:
+                ids[SUMMARY_KEYS[name]].add(uuid.UUID(op["id"]))
+            elif name == "qc_measurements":
+                ids["batch_ids"].update(uuid.UUID(r["batch_id"]) for r in (op["row"], op.get("old")) if r and r.get("batch_id"))
+    test_ids = tests_for(conn, **ids)
+    if test_ids:
+        refresh_summary(conn, test_ids)
+    return undo_id
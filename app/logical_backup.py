@@ -0,0 +1,250 @@
+import os
+import io
+import csv
+import gzip
+import json
+import uuid
+import shutil
+import hashlib
+import tarfile
+import datetime
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine, select, text, JSON, Boolean, DateTime, Date
+from app.database import engine, Base
+from app.backup import sqlite_snapshot
+import app.models # Registers every table on Base.metadata
+
+# Logical dump: one CSV per table (COPY text conventions: header row, \N for
+# NULL, t/f booleans, ISO timestamps), gzip-compressed, in a tar archive with
+# manifest.json. The same archive restores into Postgres or SQLite.
+NULL = r"\N"
+DUMP_WORKERS = 4
+STREAM_ROWS = 5000
+COPY_OPTIONS = f"FORMAT csv, HEADER true, NULL '{NULL}'"
+MANIFEST = "manifest.json"
+
+def dump_tables():
+    """Tables of app/models.py, parents first."""
+    return list(Base.metadata.sorted_tables)
+
+def _member(table_name):
+    return f"tables/{table_name}.csv.gz"
+
+# --- Postgres: COPY ... TO STDOUT / FROM STDIN --------------------------------
+
+def _pg_begin_snapshot(raw, snapshot=None):
+    """Repeatable-read, read-only transaction; joins an exported snapshot if given."""
+    cur = raw.cursor()
+    cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+    if snapshot:
+        cur.execute("SET TRANSACTION SNAPSHOT %s", (snapshot,))
+    return cur
+
+def _pg_dump_table(table, dest, snapshot):
+    raw = engine.raw_connection()
+    try:
+        cur = _pg_begin_snapshot(raw.driver_connection, snapshot)
+        cols = ", ".join(f'"{c.name}"' for c in table.columns)
+        with gzip.open(dest, "wb") as out:
+            cur.copy_expert(f'COPY "{table.name}" ({cols}) TO STDOUT WITH ({COPY_OPTIONS})', out)
+        rows = cur.rowcount
+        raw.driver_connection.rollback()
+        return rows
+    finally:
+        raw.close()
+
+def _pg_reset_sequences(conn, tables):
+    """Move the sequences of integer autoincrement keys past the restored rows (COPY does not advance them)."""
+    for table in tables:
+        col = table.autoincrement_column
+        if col is None:
+            continue
+        conn.execute(text(
+            f'SELECT setval(pg_get_serial_sequence(:table, :col), COALESCE(MAX("{col.name}"), 0) + 1, false) FROM "{table.name}"'
+        ), {"table": table.name, "col": col.name})
+
+def _pg_restore_table(raw, table, stream):
+    cur = raw.cursor()
+    header = stream.readline().decode("utf-8").rstrip("\r\n")
+    cols = ", ".join(f'"{c}"' for c in next(csv.reader([header])))
+    # Header already consumed: copy the data rows only
+    cur.copy_expert(f'COPY "{table.name}" ({cols}) FROM STDIN WITH (FORMAT csv, NULL \'{NULL}\')', stream)
+    return cur.rowcount
+
+# --- SQLite stand-in: same files through SQLAlchemy ---------------------------
+
+def _to_text(value):
+    if value is None:
+        return NULL
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+def _from_text(column, value):
+    if value == NULL:
+        return None
+    t = column.type
+    if isinstance(t, JSON):
+        return json.loads(value)
+    if isinstance(t, Boolean):
+        return value in ("t", "true", "1")
+    if isinstance(t, DateTime):
+        return datetime.datetime.fromisoformat(value)
+    if isinstance(t, Date):
+        return datetime.date.fromisoformat(value)
+    try:
+        py = t.python_type
+    except NotImplementedError:
+        return value
+    if py is uuid.UUID:
+        return uuid.UUID(value)
+    if py in (int, float):
+        return py(value)
+    return value
+
+def _sqlite_dump_table(source, table, dest):
+    rows = 0
+    with source.connect() as conn, gzip.open(dest, "wt", encoding="utf-8", newline="") as out:
+        writer = csv.writer(out)
+        writer.writerow([c.name for c in table.columns])
+        result = conn.execution_options(stream_results=True, yield_per=STREAM_ROWS).execute(select(table))
+        for part in result.partitions():
+            writer.writerows([_to_text(v) for v in row] for row in part)
+            rows += len(part)
+    return rows
+
+def _sqlite_restore_table(conn, table, stream):
+    reader = csv.reader(io.TextIOWrapper(stream, encoding="utf-8", newline=""))
+    columns = [table.c[name] for name in next(reader)]
+    rows, batch = 0, []
+    for values in reader:
+        batch.append({c.name: _from_text(c, v) for c, v in zip(columns, values)})
+        if len(batch) == STREAM_ROWS:
+            conn.execute(table.insert(), batch)
+            rows += len(batch)
+            batch = []
+    if batch:
+        conn.execute(table.insert(), batch)
+        rows += len(batch)
+    return rows
+
+# --- Dump / restore -----------------------------------------------------------
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def dump_database(dest, workers=DUMP_WORKERS):
+    """
+    Write every table to a tar archive at `dest`, several tables in parallel.
+    Postgres: COPY ... TO STDOUT per table, all workers sharing one exported
+    snapshot so the archive is consistent. SQLite: the same CSV files read
+    from an online-backup copy. Returns the manifest.
+    """
+    started = datetime.datetime.now()
+    tables = dump_tables()
+    workdir = tempfile.mkdtemp(prefix="dump_")
+    source = holder = None
+    try:
+        if engine.dialect.name == "postgresql":
+            # The holder transaction keeps the exported snapshot alive until all workers have joined it
+            holder = engine.raw_connection()
+            cur = _pg_begin_snapshot(holder.driver_connection)
+            cur.execute("SELECT pg_export_snapshot()")
+            snapshot = cur.fetchone()[0]
+            dump_one = lambda t, path: _pg_dump_table(t, path, snapshot)
+        else:
+            snapshot_path = os.path.join(workdir, "snapshot.db")
+            sqlite_snapshot(snapshot_path)
+            source = create_engine(f"sqlite:///{snapshot_path}")
+            dump_one = lambda t, path: _sqlite_dump_table(source, t, path)
+
+        paths = {t.name: os.path.join(workdir, f"{t.name}.csv.gz") for t in tables}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            counts = dict(zip(paths, pool.map(lambda t: dump_one(t, paths[t.name]), tables)))
+
+        manifest = {
+            "created_at": started.isoformat(timespec="seconds"),
+            "dialect": engine.dialect.name,
+            "format": "csv",
+            "null": NULL,
+            "tables": [
+                {"name": t.name, "rows": counts[t.name], "columns": [c.name for c in t.columns],
+                 "file": _member(t.name), "bytes": os.path.getsize(paths[t.name]), "sha256": _sha256(paths[t.name])}
+                for t in tables
+            ],
+            "seconds": round((datetime.datetime.now() - started).total_seconds(), 3),
+        }
+        with tarfile.open(dest + ".part", "w") as tar:
+            data = json.dumps(manifest, indent=2).encode("utf-8")
+            info = tarfile.TarInfo(MANIFEST)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+            for t in tables:
+                tar.add(paths[t.name], arcname=_member(t.name))
+        os.replace(dest + ".part", dest)
+        return manifest
+    finally:
+        if holder is not None:
+            holder.driver_connection.rollback()
+            holder.close()
+        if source is not None:
+            source.dispose()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def read_manifest(path):
+    with tarfile.open(path, "r") as tar:
+        return json.load(tar.extractfile(MANIFEST))
+
+def restore_database(path, replace=False):
+    """
+    Load an archive written by dump_database into the configured database in
+    one transaction, parents first (Postgres: COPY ... FROM STDIN). Member
+    checksums are verified before anything is loaded. With `replace` existing
+    rows are deleted first; otherwise the tables must be empty. On Postgres the
+    sequences of integer keys (change_journal.seq) are moved past the restored
+    rows. Returns {table: rows restored}.
+    """
+    manifest = read_manifest(path)
+    known = {t.name: t for t in dump_tables()}
+    with tarfile.open(path, "r") as tar:
+        for entry in manifest["tables"]:
+            digest = hashlib.sha256()
+            member = tar.extractfile(entry["file"])
+            for block in iter(lambda: member.read(1024 * 1024), b""):
+                digest.update(block)
+            if digest.hexdigest() != entry["sha256"]:
+                raise ValueError(f"Archive member {entry['file']} is corrupt")
+
+        order = [known[e["name"]] for e in manifest["tables"] if e["name"] in known]
+        restored = {}
+        with engine.begin() as conn:
+            if replace:
+                for table in reversed(order):
+                    conn.execute(table.delete())
+            else:
+                for table in order:
+                    if conn.execute(select(text("1")).select_from(table).limit(1)).first():
+                        raise ValueError(f"Table {table.name} is not empty; restore with replace=True")
+            for entry in manifest["tables"]:
+                table = known.get(entry["name"])
+                if table is None:
+                    continue # Table no longer in the models
+                stream = gzip.open(tar.extractfile(entry["file"]), "rb")
+                if engine.dialect.name == "postgresql":
+                    restored[table.name] = _pg_restore_table(conn.connection.driver_connection, table, stream)
+                else:
+                    restored[table.name] = _sqlite_restore_table(conn, table, stream)
+                if restored[table.name] != entry["rows"]:
+                    raise ValueError(f"{table.name}: restored {restored[table.name]} rows, archive has {entry['rows']}")
+            if engine.dialect.name == "postgresql":
+                _pg_reset_sequences(conn, order)
+    return restored
@@ -8,9 +8,8 @@ root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if root_path not in sys.path:
     sys.path.append(root_path)
 
-from app.database import init_db, SessionLocal
+from app.database import init_db
 from app.ui_utils import display_logo
-from app.models import SystemLog
 
 # Centralized database initialization
 init_db()
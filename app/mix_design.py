@@ -0,0 +1,137 @@
+import uuid
+import numpy as np
+import pandas as pd
+from sqlalchemy import func
+from app.models import PerformanceTest, QCMeasurement
+from app.summary import refresh_summary
+from app.journal import record, row_ops
+
+# Base number for cube codes when no earlier -H code exists
+CUBE_CODE_BASE = 144
+
+def compute_mix(cem_mass, target_solid_dosage, wc_ratio, solid_content):
+    """
+    Mortar mix maths matching the lab spreadsheet. All arguments broadcast,
+    so a whole dosage series is computed in one call.
+
+    1. Target dry mass [g]      = cement mass * target solid dosage / 100
+    2. NG dosage [g] (liquid)   = dry mass / (NG solid content / 100)
+    3. Water from NG [g]        = dosage * (1 - NG solid content / 100)
+    4. Added water [g]          = w/c * cement mass - water from NG
+    """
+    cem_mass = np.asarray(cem_mass, dtype=float)
+    dosage_pct = np.asarray(target_solid_dosage, dtype=float)
+    wc = np.asarray(wc_ratio, dtype=float)
+    sc = np.asarray(solid_content, dtype=float)
+
+    m_dry_target = cem_mass * (dosage_pct / 100.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        m_ng_liq = np.where(sc > 0, np.round(m_dry_target / (sc / 100.0), 2), 0.0)
+        liq_dosage_pct = np.where(cem_mass > 0, m_ng_liq / cem_mass * 100.0, 0.0)
+    water_from_ng = np.round(m_ng_liq * (1 - sc / 100.0), 2)
+    added_water = np.round(wc * cem_mass - water_from_ng, 2)
+    total_water = np.round(cem_mass * wc, 2)
+
+    return {
+        "dry_target_g": m_dry_target,
+        "dosage_g": m_ng_liq,
+        "dosage_liquid_pct": liq_dosage_pct,
+        "water_from_ng_g": water_from_ng,
+        "water_added_g": added_water,
+        "total_water_g": total_water,
+    }
+
+def mix_matrix(dosages, wc_ratios, cement_types, solid_content, cem_mass=450.0, sand_mass=1350.0, defoamer_g=0.0):
+    """Full factorial series (dosage x w/c x cement) with the mix maths applied column-wise."""
+    grid = pd.MultiIndex.from_product(
+        [list(cement_types), [float(w) for w in wc_ratios], [float(d) for d in dosages]],
+        names=["cement_type", "wc_ratio", "target_solid_dosage_pct"]
+    ).to_frame(index=False)
+    grid["cement_mass_g"] = float(cem_mass)
+    grid["sand_mass_g"] = float(sand_mass)
+    grid["solid_content_pct"] = float(solid_content)
+    grid["defoamer_g"] = float(defoamer_g)
+
+    calc = compute_mix(grid["cement_mass_g"], grid["target_solid_dosage_pct"], grid["wc_ratio"], grid["solid_content_pct"])
+    for col in ("dosage_g", "dosage_liquid_pct", "water_from_ng_g", "water_added_g"):
+        grid[col] = calc[col]
+    return grid
+
+def dosage_range(start, stop, step):
+    """Inclusive dosage range, e.g. 0.1–1.0 % in 0.1 steps."""
+    if step <= 0 or stop < start:
+        return [round(start, 4)]
+    return [round(v, 4) for v in np.arange(start, stop + step / 2.0, step)]
+
+def operator_initials(op_name):
+    return "".join([p[0].upper() for p in op_name.split() if p]) or "OP"
+
+def next_cube_number(db):
+    """Highest -H number among existing cube codes (projection over one indexed column)."""
+    codes = db.query(PerformanceTest.cube_code).filter(PerformanceTest.cube_code.like("%-H%")).all()
+    max_num = CUBE_CODE_BASE
+    for (code,) in codes:
+        # handle cases like "H145 (ref)"
+        num_only = "".join(filter(str.isdigit, code.split("-H")[-1]))
+        if num_only:
+            max_num = max(max_num, int(num_only))
+    return max_num + 1
+
+def allocate_cube_codes(db, op_name, count):
+    """Reserve `count` consecutive cube codes for one operator."""
+    initials = operator_initials(op_name)
+    start = next_cube_number(db)
+    return [f"{initials}-H{n}" for n in range(start, start + count)]
+
+def default_solid_content(db, batch):
+    """NG solid content for a batch: 24h QC reading, else latest reading, else recipe target."""
+    if batch is None:
+        return 0.0
+    qc_24h = db.query(QCMeasurement.solid_content_measured).filter(
+        QCMeasurement.batch_id == batch.id,
+        QCMeasurement.solid_content_measured.isnot(None),
+        QCMeasurement.ageing_time >= 20.0,
+        QCMeasurement.ageing_time <= 28.0
+    ).order_by(func.abs(QCMeasurement.ageing_time - 24.0)).first()
+    if not qc_24h:
+        qc_24h = db.query(QCMeasurement.solid_content_measured).filter(QCMeasurement.batch_id == batch.id, QCMeasurement.solid_content_measured.isnot(None)).order_by(QCMeasurement.measured_at.desc()).first()
+    if qc_24h:
+        return qc_24h[0]
+    return (batch.recipe.total_solid_content or 0.0) if batch.recipe else 0.0
+
+def insert_mix_series(db, plan, batch_id, operator, cast_date, casting_time, humidity, num_cubes, sand_type="Standard Sand"):
+    """
+    Insert one PerformanceTest per planned mix in a single transaction.
+    `plan` is a mix_matrix frame with a `cube_code` column.
+    """
+    rows = []
+    for mix in plan.to_dict("records"):
+        mix_data = {
+            "cement_type": mix["cement_type"], "cement_mass_g": mix["cement_mass_g"],
+            "sand_type": sand_type, "sand_mass_g": mix["sand_mass_g"],
+            "target_solid_dosage_pct": mix["target_solid_dosage_pct"], "solid_content_pct": mix["solid_content_pct"],
+            "dosage_g": mix["dosage_g"], "dosage_liquid_pct": mix["dosage_liquid_pct"],
+            "water_from_ng_g": mix["water_from_ng_g"], "wc_ratio": mix["wc_ratio"],
+            "water_added_g": mix["water_added_g"], "num_cubes": num_cubes,
+            "casting_time": casting_time, "relative_humidity": humidity,
+            "defoamer_g": mix["defoamer_g"]
+        }
+        rows.append({
+            "id": uuid.uuid4(),
+            "batch_id": batch_id,
+            "test_type": "Mortar",
+            "cube_code": mix["cube_code"],
+            "cast_date": cast_date,
+            "mix_design": mix_data,
+            "raw_data": {"operator": operator, "cube_code": mix["cube_code"], "rh": humidity, "series": True},
+        })
+    try:
+        db.bulk_insert_mappings(PerformanceTest, rows)
+        # Bulk inserts skip the flush hooks that maintain experiment_summary and the change journal
+        record(db.connection(), {"performance_tests": row_ops("performance_tests", "I", rows)})
+        refresh_summary(db.connection(), [r["id"] for r in rows])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(rows)
@@ -2,33 +2,28 @@ import pandas as pd
 import pickle
 import os
 import numpy as np
-from sqlalchemy import create_engine
-from xgboost import XGBRegressor
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error
-from app.database import DATABASE_URL, SessionLocal
-from app.models import Recipe, SynthesisBatch, PerformanceTest
+from app.database import SessionLocal
+from app.models import ExperimentSummary
 
 # Define feature columns explicitly to ensure consistency between Training and Inference
 FEATURES = ['ca_si_ratio', 'molarity_ca_no3', 'total_solid_content', 'pce_content_wt']
 TARGETS = ['compressive_strength_1d', 'compressive_strength_28d']
 MODEL_DIR = "models"
-if not os.path.exists(MODEL_DIR):
-    os.makedirs(MODEL_DIR)
+# Unpickled models keyed by path, reloaded when the file changes
+_models = {}
 
 def load_data():
-    """Fetch data from SQLite and flatten it for ML."""
+    """Fetch training rows from the experiment_summary table (no joins needed)."""
     session = SessionLocal()
     try:
         query = session.query(
-            Recipe.ca_si_ratio,
-            Recipe.molarity_ca_no3,
-            Recipe.total_solid_content,
-            Recipe.pce_content_wt,
-            PerformanceTest.compressive_strength_1d,
-            PerformanceTest.compressive_strength_28d
-        ).join(SynthesisBatch, Recipe.batches) \
-         .join(PerformanceTest, SynthesisBatch.performance_tests)
+            ExperimentSummary.ca_si_ratio,
+            ExperimentSummary.molarity_ca_no3,
+            ExperimentSummary.total_solid_content,
+            ExperimentSummary.pce_content_wt,
+            ExperimentSummary.compressive_strength_1d,
+            ExperimentSummary.compressive_strength_28d
+        ).filter(ExperimentSummary.recipe_id.isnot(None))
          
         results = query.all()
         
@@ -49,12 +44,18 @@ def load_data():
 
 def train_model():
     """Trains XGBoost regressors for each target and saves them."""
+    # Heavy imports are deferred to training so pages that only predict stay light
+    from xgboost import XGBRegressor
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import mean_squared_error
+
     df = load_data()
     
     if len(df) < 5:
         return {"status": "error", "message": f"Not enough data to train. Found {len(df)} records, need at least 5."}
     
     results = {"status": "success", "metrics": {}, "data_count": len(df)}
+    os.makedirs(MODEL_DIR, exist_ok=True)
     
     for target in TARGETS:
         # Filter rows that have this specific target
@@ -82,16 +83,26 @@ def train_model():
         
     return results
 
-def predict_strength(ca_si, molarity, solids, pce, target='28d'):
-    """Loads specific model and predicts strength."""
-    target_col = f"compressive_strength_{target}"
-    model_path = os.path.join(MODEL_DIR, f"model_{target_col}.pkl")
-    
-    if not os.path.exists(model_path):
+def load_model(target='28d'):
+    """Trained model for a target (None if not trained yet), unpickled once per file version."""
+    model_path = os.path.join(MODEL_DIR, f"model_compressive_strength_{target}.pkl")
+    try:
+        mtime = os.path.getmtime(model_path)
+    except OSError:
         return None
-        
+    cached = _models.get(model_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
     with open(model_path, "rb") as f:
         model = pickle.load(f)
+    _models[model_path] = (mtime, model)
+    return model
+
+def predict_strength(ca_si, molarity, solids, pce, target='28d'):
+    """Loads specific model and predicts strength."""
+    model = load_model(target)
+    if model is None:
+        return None
         
     input_df = pd.DataFrame([{
         'ca_si_ratio': ca_si, 
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Float, Integer, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, String, Float, Integer, DateTime, ForeignKey, JSON, Index, Boolean
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from .database import Base
@@ -13,7 +13,7 @@ class RawMaterial(Base):
     material_name = Column(String, index=True) # e.g. Ca(NO3)2·4H2O
     chemical_type = Column(String) # 'Ca', 'Si', 'PCE', 'NaOH'
     brand = Column(String) # e.g. Carl Roth
-    lot_number = Column(String)
+    lot_number = Column(String, index=True)
     received_date = Column(DateTime, default=datetime.utcnow)
     expiry_date = Column(DateTime, nullable=True)
     initial_quantity_kg = Column(Float)
@@ -37,7 +37,7 @@ class StockSolutionBatch(Base):
     preparation_date = Column(DateTime, default=datetime.utcnow)
     created_at = Column(DateTime, default=datetime.utcnow)
     notes = Column(String)
-    raw_material_id = Column(UUID(as_uuid=True), ForeignKey('raw_materials.id'), nullable=True)
+    raw_material_id = Column(UUID(as_uuid=True), ForeignKey('raw_materials.id'), nullable=True, index=True)
 
     # Relationships
     raw_material = relationship("RawMaterial")
@@ -68,8 +68,8 @@ class Recipe(Base):
     material_sources = Column(JSON, default=dict) # e.g. {"ca": "Carl Roth", "si": "Sigma", "pce": "BASF"}
     
     # Stock solution link
-    ca_stock_batch_id = Column(UUID(as_uuid=True), ForeignKey('stock_solution_batches.id'), nullable=True)
-    si_stock_batch_id = Column(UUID(as_uuid=True), ForeignKey('stock_solution_batches.id'), nullable=True)
+    ca_stock_batch_id = Column(UUID(as_uuid=True), ForeignKey('stock_solution_batches.id'), nullable=True, index=True)
+    si_stock_batch_id = Column(UUID(as_uuid=True), ForeignKey('stock_solution_batches.id'), nullable=True, index=True)
 
     # Process Config
     ca_addition_rate = Column(Float) # mL/min
@@ -81,6 +81,7 @@ class Recipe(Base):
     process_config = Column(JSON, default=dict)
     
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     created_by = Column(String) # Simple string for now, could be User FK later
     
     # Relationships
@@ -94,11 +95,12 @@ class SynthesisBatch(Base):
     __table_args__ = {'extend_existing': True}
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    recipe_id = Column(UUID(as_uuid=True), ForeignKey('recipes.id'))
+    recipe_id = Column(UUID(as_uuid=True), ForeignKey('recipes.id'), index=True)
     lab_notebook_ref = Column(String, unique=True, index=True)
-    execution_date = Column(DateTime, default=datetime.utcnow)
+    execution_date = Column(DateTime, default=datetime.utcnow, index=True)
     operator = Column(String)
     status = Column(String, default="In-Progress") # Planned, In-Progress, Completed
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     recipe = relationship("Recipe", back_populates="batches")
     qc_measurements = relationship("QCMeasurement", back_populates="batch")
@@ -106,7 +108,11 @@ class SynthesisBatch(Base):
 
 class QCMeasurement(Base):
     __tablename__ = "qc_measurements"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # Serves (batch_id, ageing_time)-ordered timeline reads
+        Index("ix_qc_measurements_batch_ageing", "batch_id", "ageing_time"),
+        {'extend_existing': True},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     batch_id = Column(UUID(as_uuid=True), ForeignKey('synthesis_batches.id'))
@@ -154,6 +160,7 @@ class QCMeasurement(Base):
 
     notes = Column(String, nullable=True)
     custom_metrics = Column(JSON, default=dict)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     batch = relationship("SynthesisBatch", back_populates="qc_measurements")
 
@@ -162,9 +169,10 @@ class PerformanceTest(Base):
     __table_args__ = {'extend_existing': True}
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    batch_id = Column(UUID(as_uuid=True), ForeignKey('synthesis_batches.id'))
+    batch_id = Column(UUID(as_uuid=True), ForeignKey('synthesis_batches.id'), index=True)
     test_type = Column(String) # "Mortar" or "Cement Paste"
-    cast_date = Column(DateTime, default=datetime.utcnow)
+    cast_date = Column(DateTime, default=datetime.utcnow, index=True)
+    cube_code = Column(String, index=True) # e.g. SA-H145, mirrored from raw_data for search
     
     # Mix Design Metadata (Cement Type, w/c, Sand, etc.)
     mix_design = Column(JSON, default=dict)
@@ -184,17 +192,168 @@ class PerformanceTest(Base):
     compressive_strength_7d = Column(Float, nullable=True)
     compressive_strength_28d = Column(Float, nullable=True)
     
-    # Store full Cube A/B/C details here
+    # Free-form test metadata (cube code, operator, notes, strength statistics)
     raw_data = Column(JSON, default=dict)
 
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
     batch = relationship("SynthesisBatch", back_populates="performance_tests")
+    specimens = relationship("StrengthSpecimen", back_populates="test", cascade="all, delete-orphan")
+
+class StrengthSpecimen(Base):
+    __tablename__ = "strength_specimens"
+    __table_args__ = (
+        Index("ix_strength_specimens_test_age", "test_id", "age"),
+        {'extend_existing': True},
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    test_id = Column(UUID(as_uuid=True), ForeignKey('performance_tests.id'), nullable=False)
+    age = Column(String) # '12h', '16h', '1d', '2d', '3d', '7d', '28d'
+    specimen = Column(String) # Cube A/B/C halves, e.g. 'A1', 'A2'
+    load_kn = Column(Float, nullable=True)
+    area_mm2 = Column(Float, default=1600.0) # 40 x 40 mm platen
+    strength_mpa = Column(Float, nullable=True)
+    excluded = Column(Boolean, default=False) # Rejected as outlier by the EN 196-1 rule
+
+    test = relationship("PerformanceTest", back_populates="specimens")
+
+class ExperimentSummary(Base):
+    """
+    Denormalized read model: one row per PerformanceTest with its recipe, batch,
+    stock-solution lots, QC readings and strengths. Maintained by app/summary.py.
+    """
+    __tablename__ = "experiment_summary"
+    __table_args__ = {'extend_existing': True}
+
+    # No FK constraints: rows are derived and refreshed after the source rows change
+    test_id = Column(UUID(as_uuid=True), primary_key=True)
+    test_type = Column(String)
+    cube_code = Column(String, index=True)
+    cast_date = Column(DateTime, index=True)
+
+    # Batch
+    batch_id = Column(UUID(as_uuid=True), index=True)
+    measurement_id = Column(String, index=True) # SynthesisBatch.lab_notebook_ref
+    execution_date = Column(DateTime, index=True)
+    batch_operator = Column(String)
+
+    # Recipe parameters
+    recipe_id = Column(UUID(as_uuid=True), index=True)
+    recipe_name = Column(String, index=True)
+    recipe_code = Column(String)
+    ca_si_ratio = Column(Float)
+    molarity_ca_no3 = Column(Float)
+    molarity_na2sio3 = Column(Float)
+    total_solid_content = Column(Float)
+    pce_content_wt = Column(Float)
+    target_ph = Column(Float)
+    ca_addition_rate = Column(Float)
+    si_addition_rate = Column(Float)
+
+    # Stock-solution lots
+    ca_stock_batch_id = Column(UUID(as_uuid=True), index=True)
+    ca_stock_code = Column(String)
+    ca_raw_material_id = Column(UUID(as_uuid=True), index=True)
+    ca_material_lot = Column(String)
+    si_stock_batch_id = Column(UUID(as_uuid=True), index=True)
+    si_stock_code = Column(String)
+    si_raw_material_id = Column(UUID(as_uuid=True), index=True)
+    si_material_lot = Column(String)
+
+    # QC reading closest to 24h ageing
+    qc_ageing_time = Column(Float, nullable=True)
+    qc_ph = Column(Float, nullable=True)
+    qc_solid_content = Column(Float, nullable=True)
+    qc_settling_height = Column(Float, nullable=True)
+    qc_psd_before_v_d10 = Column(Float, nullable=True)
+    qc_psd_before_v_d50 = Column(Float, nullable=True)
+    qc_psd_before_v_d90 = Column(Float, nullable=True)
+    qc_psd_before_v_mean = Column(Float, nullable=True)
+    qc_psd_before_n_d10 = Column(Float, nullable=True)
+    qc_psd_before_n_d50 = Column(Float, nullable=True)
+    qc_psd_before_n_d90 = Column(Float, nullable=True)
+    qc_psd_before_n_mean = Column(Float, nullable=True)
+    qc_psd_after_v_d10 = Column(Float, nullable=True)
+    qc_psd_after_v_d50 = Column(Float, nullable=True)
+    qc_psd_after_v_d90 = Column(Float, nullable=True)
+    qc_psd_after_v_mean = Column(Float, nullable=True)
+    qc_psd_after_n_d10 = Column(Float, nullable=True)
+    qc_psd_after_n_d50 = Column(Float, nullable=True)
+    qc_psd_after_n_d90 = Column(Float, nullable=True)
+    qc_psd_after_n_mean = Column(Float, nullable=True)
+    qc_psd_before_ssa = Column(Float, nullable=True)
+    qc_psd_after_ssa = Column(Float, nullable=True)
+    qc_agglom_vol = Column(Float, nullable=True)
+    qc_agglom_num = Column(Float, nullable=True)
+    qc_agglom_ssa = Column(Float, nullable=True)
+
+    # Latest QC reading
+    latest_qc_measured_at = Column(DateTime, nullable=True)
+    latest_qc_ageing_time = Column(Float, nullable=True)
+    latest_qc_ph = Column(Float, nullable=True)
+    latest_qc_solid_content = Column(Float, nullable=True)
+    latest_qc_psd_before_v_d50 = Column(Float, nullable=True)
+
+    # Fresh and hardened properties
+    fresh_density = Column(Float, nullable=True)
+    flow = Column(Float, nullable=True)
+    air_content = Column(Float, nullable=True)
+    temperature = Column(Float, nullable=True)
+    humidity = Column(Float, nullable=True)
+    compressive_strength_12h = Column(Float, nullable=True)
+    compressive_strength_16h = Column(Float, nullable=True)
+    compressive_strength_1d = Column(Float, nullable=True)
+    compressive_strength_2d = Column(Float, nullable=True)
+    compressive_strength_7d = Column(Float, nullable=True)
+    compressive_strength_28d = Column(Float, nullable=True)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class ImportJob(Base):
+    """Checkpoint of a streaming file import, so re-uploading the same file resumes it."""
+    __tablename__ = "import_jobs"
+    __table_args__ = (
+        Index("ix_import_jobs_file", "file_hash", "import_type", "sheet_name"),
+        {'extend_existing': True}
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    file_hash = Column(String) # SHA-256 of the uploaded file
+    file_name = Column(String)
+    import_type = Column(String) # e.g. "Synthesis Results"
+    sheet_name = Column(String, default="")
+    status = Column(String, default="running") # running, failed, completed
+    rows_committed = Column(Integer, default=0) # Data rows (after the header) already committed
+    rows_skipped = Column(Integer, default=0)
+    error = Column(String, nullable=True)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class SystemLog(Base):
     __tablename__ = "system_logs"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index("ix_system_logs_event_type_timestamp", "event_type", "timestamp"), # Filter by type, newest first
+        {'extend_existing': True}
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
     event_type = Column(String) # e.g. "BACKUP_DOWNLOAD", "DB_RESET"
     details = Column(String) # e.g. "User downloaded nanogence_backup_2024..."
     user = Column(String, nullable=True)
+
+class ChangeJournal(Base):
+    """
+    Row changes captured at flush time, one record per flush and table.
+    `changes` is a list of {"op": "I" | "U" | "D" | "S", "id", "row", "old"}
+    (S = upsert from a bulk import). Ordered by `seq`.
+    """
+    __tablename__ = "change_journal"
+    __table_args__ = {'extend_existing': True}
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    flush_id = Column(UUID(as_uuid=True), index=True) # Changes written together (one flush / bulk write)
+    changed_at = Column(DateTime, default=datetime.utcnow, index=True)
+    table_name = Column(String, index=True)
+    changes = Column(JSON)
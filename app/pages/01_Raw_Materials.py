@@ -5,7 +5,10 @@ import uuid
 from sqlalchemy.orm import Session
 from app.database import get_db, init_db
 from app.models import StockSolutionBatch, RawMaterial
-from app.ui_utils import display_logo
+from app.search import search_raw_materials, search_performance_tests, format_material_option, format_test_option
+from app.traceability import trace_forward, trace_backward, strength_statistics, STRENGTH_COLUMNS
+from app.reference_data import material_options, stock_batch_options
+from app.ui_utils import display_logo, search_select
 
 # Ensure database is synced
 init_db()
@@ -28,7 +31,7 @@ CHEMICALS = {
     "Standard Sand": {"mw": 1.0, "type": "Sand"}
 }
 
-tab_dash, tab1, tab2 = st.tabs(["📊 Dashboard", "🏛️ Raw Material Inventory", "🧪 Stock Solution Management"])
+tab_dash, tab1, tab2, tab_trace = st.tabs(["📊 Dashboard", "🏛️ Raw Material Inventory", "🧪 Stock Solution Management", "🔎 Lot Traceability"])
 
 with tab_dash:
     st.subheader("Inventory Overview")
@@ -165,8 +168,7 @@ with tab2:
     st.subheader("Prepare and Manage Stock Solutions")
     
     # Fetch RM options
-    rm_list = db.query(RawMaterial).all()
-    rm_options = {f"{m.material_name} (Lot: {m.lot_number})": str(m.id) for m in rm_list}
+    rm_options = {label: m_id for m_id, label in material_options()}
     
     if not rm_options:
         st.warning("Please log raw materials first to prepare stock solutions.")
@@ -176,15 +178,17 @@ with tab2:
             with col1:
                 prep_date = st.date_input("Preparation Date", value=datetime.date.today(), key="prep_date")
                 selected_rm_key = st.selectbox("Source Raw Material", options=list(rm_options.keys()))
-                selected_rm_id_str = rm_options[selected_rm_key]
-                selected_rm = db.query(RawMaterial).filter(RawMaterial.id == uuid.UUID(selected_rm_id_str)).first()
+                selected_rm = db.get(RawMaterial, rm_options[selected_rm_key])
                 
                 target_m = st.number_input("Target Molarity (mol/L)", min_value=0.01, step=0.01, value=1.50 if "Ca" in selected_rm.chemical_type else 0.75)
                 target_v = st.number_input("Target Volume (mL)", min_value=1.0, step=10.0, value=1000.0)
                 
-                mw = selected_rm.molecular_weight if selected_rm.molecular_weight else 100.0
-                required_mass = target_m * (target_v / 1000.0) * mw / (selected_rm.purity_percent / 100.0)
+                mw = selected_rm.molecular_weight if selected_rm.molecular_weight else CHEMICALS.get(selected_rm.material_name, {}).get("mw", 100.0)
+                purity = selected_rm.purity_percent if selected_rm.purity_percent else 100.0
+                required_mass = target_m * (target_v / 1000.0) * mw / (purity / 100.0)
                 st.metric("Required Mass (g)", f"{required_mass:.2f} g")
+                if not (selected_rm.molecular_weight and selected_rm.purity_percent):
+                    st.caption("⚠️ MW or purity not recorded for this lot; nominal values used.")
                 
             with col2:
                 chem_type = selected_rm.chemical_type
@@ -271,3 +275,67 @@ with tab2:
                         st.error(f"Deletion failed: {e}")
         else:
             st.info("No active stock solutions found.")
+
+with tab_trace:
+    st.subheader("Lot Traceability")
+    st.caption("Raw material lot → stock solution → recipe → synthesis batch → strength result, answered from the indexed experiment summary.")
+    direction = st.radio("Direction", options=["Forward (lot → results)", "Backward (result → lots)"], horizontal=True)
+
+    if direction.startswith("Forward"):
+        trace_mode = st.radio("Trace from", options=["Raw material lot", "Lot number (all materials)", "Stock solution"], horizontal=True)
+        trace_df = None
+        if trace_mode == "Raw material lot":
+            material_id = search_select(
+                "Raw Material", lambda term, page, size: search_raw_materials(db, term, page, size),
+                format_material_option, key="trace_material"
+            )
+            if material_id:
+                trace_df = trace_forward(db, material_ids=[material_id])
+        elif trace_mode == "Lot number (all materials)":
+            lot_term = st.text_input("Lot Number", placeholder="Exact lot number, e.g. L-2024-001")
+            if lot_term:
+                trace_df = trace_forward(db, lot_number=lot_term.strip())
+        else:
+            stock_opts = dict(stock_batch_options(label="{code} ({chemical_type})"))
+            stock_ids = st.multiselect("Stock Solutions", options=list(stock_opts.keys()), format_func=lambda x: stock_opts[x])
+            if stock_ids:
+                trace_df = trace_forward(db, stock_ids=stock_ids)
+
+        if trace_df is not None:
+            if trace_df.empty:
+                st.info("No results trace back to this selection.")
+            else:
+                m1, m2, m3 = st.columns(3)
+                m1.metric("Affected Results", len(trace_df))
+                m2.metric("Synthesis Batches", trace_df["measurement_id"].nunique())
+                m3.metric("Recipes", trace_df["recipe_id"].nunique())
+                st.markdown("**Strength statistics of affected results**")
+                split_by = st.selectbox("Split by", options=[None, "via", "recipe_name", "measurement_id"], format_func=lambda x: "None" if x is None else x)
+                st.dataframe(strength_statistics(trace_df, by=split_by), use_container_width=True, hide_index=True)
+                st.markdown("**Affected results**")
+                st.dataframe(trace_df.drop(columns=["test_id", "recipe_id"]), use_container_width=True, hide_index=True)
+                st.download_button("📥 Download CSV", data=trace_df.to_csv(index=False), file_name="lot_trace.csv", mime="text/csv")
+    else:
+        test_id = search_select(
+            "Result", lambda term, page, size: search_performance_tests(db, term, page, size),
+            format_test_option, key="trace_test"
+        )
+        if test_id:
+            lineage = trace_backward(db, test_ids=[test_id])
+            if lineage.empty:
+                st.info("No lineage found for this result.")
+            else:
+                row = lineage.iloc[0]
+                c1, c2 = st.columns(2)
+                c1.markdown(f"""
+**Result:** {row.cube_code or 'Unnamed'} ({row.test_type or '-'})  
+**Synthesis Batch:** {row.measurement_id or '-'} ({row.batch_operator or '-'})  
+**Recipe:** {row.recipe_name or '-'} ({row.recipe_code or '-'})
+""")
+                c2.markdown(f"""
+**Ca stock:** {row.ca_stock_code or '-'} ← {row.ca_material_name or '-'}, Lot {row.ca_material_lot or '-'} ({row.ca_material_brand or '-'})  
+**Si stock:** {row.si_stock_code or '-'} ← {row.si_material_name or '-'}, Lot {row.si_material_lot or '-'} ({row.si_material_brand or '-'})
+""")
+                strengths = {age: row[col] for age, col in STRENGTH_COLUMNS.items() if pd.notna(row[col])}
+                if strengths:
+                    st.dataframe(pd.DataFrame([strengths]), hide_index=True)
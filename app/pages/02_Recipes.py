@@ -5,7 +5,9 @@ import pandas as pd
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app.database import get_db, init_db
-from app.models import Recipe, StockSolutionBatch, RawMaterial
+from app.models import Recipe
+from app.journal import recent_deletes, undo_flush
+from app.reference_data import material_options, stock_batch_options, stock_batch_brands
 from app.ui_utils import display_logo
 import uuid
 from app.ml_utils import predict_strength
@@ -124,13 +126,11 @@ with tab_designer:
         pce_basis = st.selectbox("PCE Dosage Basis", ["% of Total Batch Mass", "% of Ca(NO3)2 Reactant Mass"], index=0, key=f"pce_basis_{edit_context_id}")
 
         st.subheader("🧪 Material & Stock Source")
-        ca_batches = db.query(StockSolutionBatch).filter(StockSolutionBatch.chemical_type == "Ca").all()
-        si_batches = db.query(StockSolutionBatch).filter(StockSolutionBatch.chemical_type == "Si").all()
-        pce_materials = db.query(RawMaterial).filter(RawMaterial.chemical_type == "PCE").all()
-        
-        ca_opts = {f"{b.code} ({b.molarity}M)": b.id for b in ca_batches}
-        si_opts = {f"{b.code} ({b.molarity}M)": b.id for b in si_batches}
-        pce_opts = {f"{m.material_name} (Lot: {m.lot_number})": m.brand for m in pce_materials}
+        # Cached (id, label) options: reruns do not query the stock / material tables
+        ca_opts = {label: b_id for b_id, label in stock_batch_options("Ca")}
+        si_opts = {label: b_id for b_id, label in stock_batch_options("Si")}
+        pce_brands = dict(material_options("PCE", label="{brand}"))
+        pce_opts = {label: pce_brands[m_id] for m_id, label in material_options("PCE")}
         
         # Initial selection indexes for edit mode
         def_ca_idx = 0
@@ -152,11 +152,9 @@ with tab_designer:
         pce_selection = st.selectbox("PCE Material Source", options=["None"] + list(pce_opts.keys()), index=def_pce_idx, key=f"pce_src_{edit_context_id}")
 
         # Fetch Brands automatically
-        sel_ca_batch = db.query(StockSolutionBatch).filter(StockSolutionBatch.id == ca_opts.get(ca_batch_selection)).first()
-        sel_si_batch = db.query(StockSolutionBatch).filter(StockSolutionBatch.id == si_opts.get(si_batch_selection)).first()
-        
-        source_ca = sel_ca_batch.raw_material.brand if sel_ca_batch and sel_ca_batch.raw_material else "N/A"
-        source_si = sel_si_batch.raw_material.brand if sel_si_batch and sel_si_batch.raw_material else "N/A"
+        stock_brands = dict(stock_batch_brands())
+        source_ca = stock_brands.get(ca_opts.get(ca_batch_selection)) or "N/A"
+        source_si = stock_brands.get(si_opts.get(si_batch_selection)) or "N/A"
         source_pce = pce_opts.get(pce_selection, "N/A")
 
         st.subheader("🏢 Material Sourcing (Auto)")
@@ -463,10 +461,10 @@ with tab_library:
                 with st.expander(label):
                     # Detailed View
                     d1, d2, d3, d4 = st.columns(4)
-                    d1.metric("Ca/Si Ratio", f"{r.ca_si_ratio:.2f}")
-                    d2.metric("Solids", f"{r.total_solid_content:.1f}%")
-                    d3.metric("Target pH", f"{r.target_ph}")
-                    d4.metric("PCE Dosage", f"{r.pce_content_wt:.1f}%")
+                    d1.metric("Ca/Si Ratio", f"{r.ca_si_ratio:.2f}" if r.ca_si_ratio is not None else "—")
+                    d2.metric("Solids", f"{r.total_solid_content:.1f}%" if r.total_solid_content is not None else "—")
+                    d3.metric("Target pH", f"{r.target_ph}" if r.target_ph is not None else "—")
+                    d4.metric("PCE Dosage", f"{r.pce_content_wt:.1f}%" if r.pce_content_wt is not None else "—")
                     
                     st.markdown("---")
                     s1, s2 = st.columns(2)
@@ -501,3 +499,19 @@ with tab_library:
                             st.error(f"Error: {e}")
     else:
         st.info("No recipes found in the library.")
+
+    deleted = recent_deletes(db.connection(), "recipes", limit=10)
+    if deleted:
+        with st.expander(f"🗑️ Recently Deleted ({len(deleted)})"):
+            for flush_id, deleted_at, row in deleted:
+                d1, d2 = st.columns([4, 1])
+                d1.write(f"**{row.get('name')}** ({row.get('code') or 'no code'}) — deleted {deleted_at:%Y-%m-%d %H:%M} UTC")
+                if d2.button("↩️ Restore", key=f"undel_{flush_id}_{row.get('id')}"):
+                    try:
+                        undo_flush(db.connection(), flush_id)
+                        db.commit()
+                        st.session_state.success_msg = f"Recipe '{row.get('name')}' restored."
+                        st.rerun()
+                    except Exception as e:
+                        db.rollback()
+                        st.error(f"Could not restore: {e}")
@@ -18,7 +18,7 @@ st.markdown("# 🧪 Measurement")
 
 db: Session = next(get_db())
 
-tab_dash, tab1, tab2 = st.tabs(["📊 Dashboard", "📊 Measurement Library", "📝 Record Measurement"])
+tab_dash, tab1, tab2, tab3 = st.tabs(["📊 Dashboard", "📊 Measurement Library", "📝 Record Measurement", "📈 Ageing Timeline"])
 
 # --- Dashboard Tab ---
 with tab_dash:
@@ -279,3 +279,52 @@ with tab2:
                         st.error(f"Error: {e}")
     else:
         st.info("👆 Select a Recipe trial to log measurement timeline.")
+
+# --- Ageing Timeline Tab ---
+with tab3:
+    st.subheader("Ageing Timeline")
+    st.caption("Follow how pH, solids and PSD evolve with ageing time across batches and recipes.")
+
+    from app.timeline import TIMELINE_METRICS, load_timeline, ageing_grid, resample_timeline
+
+    recipe_rows = db.query(Recipe.id, Recipe.name).order_by(Recipe.name.asc()).all()
+    recipe_labels = {r.name: r.id for r in recipe_rows}
+
+    t1, t2 = st.columns([3, 1])
+    sel_recipes = t1.multiselect("Recipes", options=list(recipe_labels.keys()), key="tl_recipes", help="Leave empty to include every batch.")
+    tl_metric = t2.selectbox("Metric", options=list(TIMELINE_METRICS.keys()), format_func=lambda m: TIMELINE_METRICS[m], key="tl_metric")
+
+    t3, t4 = st.columns([1, 3])
+    resample = t3.toggle("Common ageing grid", value=False, key="tl_resample", help="Interpolate every batch onto the same ageing points.")
+    grid_step = t4.number_input("Grid step (h)", min_value=0.0, value=0.0, step=0.5, key="tl_step", help="0 = 50 evenly spaced points.", disabled=not resample)
+
+    # One query for all selected batches
+    df_tl = load_timeline(recipe_ids=[recipe_labels[n] for n in sel_recipes])
+
+    if df_tl.empty:
+        st.info("No ageing measurements found for the selection.")
+    else:
+        if resample:
+            grid = ageing_grid(df_tl, step=grid_step or None)
+            df_plot = resample_timeline(df_tl, grid)
+        else:
+            df_plot = df_tl
+
+        import plotly.express as px
+        fig_tl = px.line(
+            df_plot.dropna(subset=[tl_metric]),
+            x="ageing_time",
+            y=tl_metric,
+            color="measurement_id",
+            line_group="batch_id",
+            markers=not resample,
+            hover_data=["recipe_name"],
+            labels={"ageing_time": "Ageing Time (h)", tl_metric: TIMELINE_METRICS[tl_metric], "measurement_id": "Measurement ID"},
+            title=f"{TIMELINE_METRICS[tl_metric]} over Ageing Time",
+            template="plotly_white"
+        )
+        st.plotly_chart(fig_tl, use_container_width=True)
+        st.caption(f"{df_tl['batch_id'].nunique()} batch(es), {len(df_tl)} measurement(s).")
+
+        with st.expander("📋 Timeline Data"):
+            st.dataframe(df_plot, use_container_width=True, hide_index=True)
@@ -2,10 +2,13 @@ import streamlit as st
 import datetime
 import pandas as pd
 from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from app.database import get_db, init_db
-from app.models import SynthesisBatch, PerformanceTest, QCMeasurement, RawMaterial
-from app.ui_utils import display_logo
+from app.models import SynthesisBatch, PerformanceTest, QCMeasurement
+from app.reference_data import material_options, CEMENT_LABEL
+from app.ui_utils import display_logo, search_select
+from app.search import search_performance_tests, search_synthesis_batches, format_test_option, format_batch_option
+from app.mix_design import compute_mix, mix_matrix, dosage_range, allocate_cube_codes, default_solid_content, insert_mix_series
 
 # Ensure database is synced
 init_db()
@@ -17,7 +20,7 @@ st.markdown("# 📈 Performance Testing (Mortar)")
 
 db: Session = next(get_db())
 
-tab_dash, tab_mix, tab_log, tab_lib = st.tabs(["📊 Dashboard", "⚖️ Mix Design", "📝 Log Results", "📚 Library"])
+tab_dash, tab_mix, tab_series, tab_log, tab_lib = st.tabs(["📊 Dashboard", "⚖️ Mix Design", "🧮 Series Planner", "📝 Log Results", "📚 Library"])
 
 with tab_dash:
     st.subheader("Performance Overview")
@@ -41,19 +44,16 @@ with tab_mix:
     st.subheader("🛠️ Step 1: Design & Cast Mix")
     
     # 1. Select Synthesis Batch (The "NG Product")
-    raw_batches = db.query(SynthesisBatch).order_by(SynthesisBatch.execution_date.desc()).all()
-    batch_options = [None] + raw_batches
-    
-    def format_batch(x):
-        if x is None: return "Reference / Commercial (No Synthesis Batch)"
-        return f"{x.lab_notebook_ref} ({x.recipe.name if x.recipe else 'Unknown'})"
-
-    batch_select = st.selectbox(
-        "Select Synthesis Batch (NG Product)", 
-        options=batch_options, 
-        format_func=format_batch,
-        key="mix_batch_select"
+    batch_select_id = search_select(
+        "Select Synthesis Batch (NG Product)",
+        search_fn=lambda term, page, size: search_synthesis_batches(db, term, page, size),
+        format_func=format_batch_option,
+        key="mix_batch",
+        none_label="Reference / Commercial (No Synthesis Batch)"
     )
+    batch_select = None
+    if batch_select_id:
+        batch_select = db.query(SynthesisBatch).options(joinedload(SynthesisBatch.recipe)).filter(SynthesisBatch.id == batch_select_id).first()
 
     # Manage Solid Content state
     if "sc_input" not in st.session_state:
@@ -63,26 +63,15 @@ with tab_mix:
     current_batch_id = batch_select.id if batch_select else "REF"
     if "last_processed_batch_id" not in st.session_state or st.session_state.last_processed_batch_id != current_batch_id:
         st.session_state.last_processed_batch_id = current_batch_id
-        if batch_select:
-            qc_24h = db.query(QCMeasurement).filter(
-                QCMeasurement.batch_id == batch_select.id,
-                QCMeasurement.ageing_time >= 20.0,
-                QCMeasurement.ageing_time <= 28.0
-            ).order_by(func.abs(QCMeasurement.ageing_time - 24.0)).first()
-            if not qc_24h:
-                qc_24h = db.query(QCMeasurement).filter(QCMeasurement.batch_id == batch_select.id).order_by(QCMeasurement.measured_at.desc()).first()
-            st.session_state.sc_input = qc_24h.solid_content_measured if qc_24h else (batch_select.recipe.total_solid_content if batch_select.recipe else 0.0)
-        else:
-            st.session_state.sc_input = 0.0
+        st.session_state.sc_input = default_solid_content(db, batch_select)
 
     # Sub-header logic...
     st.markdown("---")
     
     c_m1, c_m2, c_m3 = st.columns(3)
     # Fetch available cements from RawMaterial inventory
-    available_cements = db.query(RawMaterial).filter(RawMaterial.chemical_type == "Cement").all()
-    if available_cements:
-        cem_options = [f"{m.material_name} ({m.brand})" for m in available_cements]
+    cem_options = [label for _, label in material_options("Cement", label=CEMENT_LABEL)]
+    if cem_options:
         cem_type = c_m1.selectbox("Cement Type", options=cem_options, key="cem_type_mix")
     else:
         st.warning("⚠️ No Cements found in Inventory. Please add them in the Materials page.")
@@ -90,11 +79,10 @@ with tab_mix:
     
     cem_mass = c_m2.number_input("Cement Mass [g]", min_value=0.0, value=450.0, step=1.0)
 
-    available_sands = db.query(RawMaterial).filter(RawMaterial.chemical_type == "Sand").all()
-    if available_sands:
-        sand_options = [f"{m.material_name} ({m.lot_number})" for m in available_sands]
+    sand_options = [label for _, label in material_options("Sand", label="{material_name} ({lot_number})")]
+    if sand_options:
         sand_type = c_m3.selectbox("Standard Sand Source", options=sand_options, key="sand_type_mix")
-        sand_mass = c_m3.number_input("Standard Sand Mass [g]", min_value=0.0, value=1350.0, step=1)
+        sand_mass = c_m3.number_input("Standard Sand Mass [g]", min_value=0.0, value=1350.0, step=1.0)
     else:
         sand_mass = c_m3.number_input("Standard Sand [g]", min_value=0.0, value=1350.0, step=1.0)
         sand_type = "Standard Sand"
@@ -105,30 +93,13 @@ with tab_mix:
     wc_ratio = c_m6.number_input("w/cement ratio [-]", min_value=0.1, max_value=1.0, value=0.45, step=0.01)
     defoamer_g = c_m7.number_input("Defoamer [g]", min_value=0.0, value=0.0, step=0.01)
 
-    # --- Precise Calculations Matching User spreadsheet logic ---
-    # 1. Target Dry Mass [g]
-    m_dry_target = cem_mass * (target_solid_dosage / 100.0)
-    
-    # 2. Dosage [g] (Liquid Mass of NG product)
-    # Formula: m_liq = cem_mass * (target_solid / 100) / (sc / 100)
-    if sc_info > 0:
-        m_ng_liq = round(m_dry_target / (sc_info / 100.0), 2)
-    else:
-        m_ng_liq = 0.0
-    
-    # 3. Water from NG [g]
-    # Formula: dosage [g] * (1 - NG Solid Content / 100)
-    water_from_ng = round(m_ng_liq * (1 - (sc_info / 100.0)), 2)
-    
-    # 4. Final Added Water (Water [g] in user table)
-    # Formula: total added water = (w/cement ratio * cement mass [g]) - Water from NG
-    added_water = round((wc_ratio * cem_mass) - water_from_ng, 2)
-    
-    # Total water for display
-    total_water_req = round(cem_mass * wc_ratio, 2)
-    
-    # 6. Liquid Dosage % (for reporting/verification)
-    liq_dosage_pct = (m_ng_liq / cem_mass) * 100.0 if cem_mass > 0 else 0.0
+    # --- Precise Calculations Matching User spreadsheet logic (see app/mix_design.py) ---
+    mix_calc = compute_mix(cem_mass, target_solid_dosage, wc_ratio, sc_info)
+    m_ng_liq = float(mix_calc["dosage_g"])
+    water_from_ng = float(mix_calc["water_from_ng_g"])
+    added_water = float(mix_calc["water_added_g"])
+    total_water_req = float(mix_calc["total_water_g"])
+    liq_dosage_pct = float(mix_calc["dosage_liquid_pct"])
 
     st.markdown("#### 📋 Mix Design Summary Table")
     mix_summary_data = [
@@ -144,33 +115,11 @@ with tab_mix:
     st.markdown("---")
     st.caption("Casting Metadata")
     
-    # Logic to get the next sequential H-number and operator initials
-    def get_auto_code(op_name):
-        initials = "".join([p[0].upper() for p in op_name.split() if p]) or "OP"
-        try:
-            # Query all PerformanceTest records and find the maximum -H number in raw_data
-            all_tests = db.query(PerformanceTest).all()
-            max_num = 144 # Starting base for old experiments if none found
-            for t in all_tests:
-                code = t.raw_data.get("cube_code", "")
-                if "-H" in code:
-                    try:
-                        num_part = code.split("-H")[-1].strip()
-                        # handle cases like "H145 (ref)"
-                        num_only = "".join(filter(str.isdigit, num_part))
-                        if num_only:
-                            num = int(num_only)
-                            if num > max_num: max_num = num
-                    except: continue
-            return f"{initials}-H{max_num + 1}"
-        except:
-            return f"{initials}-H145"
-
     meta_row1 = st.columns(3)
     operator = meta_row1[0].text_input("Operator", value="Silmina Adzhani", key="op_mix")
     
     # Auto-generate code based on operator
-    suggested_code = get_auto_code(operator)
+    suggested_code = allocate_cube_codes(db, operator, 1)[0]
     cube_code = meta_row1[1].text_input("Cube Code (Auto-generated)", value=suggested_code, key="cube_code_mix")
     cast_date = meta_row1[2].date_input("Casting Date", value=datetime.date.today(), key="cast_date_mix")
 
@@ -201,6 +150,7 @@ with tab_mix:
                 new_test = PerformanceTest(
                     batch_id=batch_select.id if batch_select else None, 
                     test_type="Mortar", 
+                    cube_code=cube_code,
                     mix_design=mix_data,
                     cast_date=datetime.datetime.combine(cast_date, datetime.time.min),
                     raw_data={"operator": operator, "cube_code": cube_code, "rh": humidity}
@@ -213,19 +163,95 @@ with tab_mix:
             except Exception as e:
                 st.error(f"Error: {e}")
 
+with tab_series:
+    st.subheader("🧮 Dosage Series Planner")
+    st.caption("Plan a full dosage × w/c × cement matrix and initialise every mix in one go.")
+
+    series_batch_id = search_select(
+        "Synthesis Batch (NG Product)",
+        search_fn=lambda term, page, size: search_synthesis_batches(db, term, page, size),
+        format_func=format_batch_option,
+        key="series_batch",
+        none_label="Reference / Commercial (No Synthesis Batch)"
+    )
+    series_batch = None
+    if series_batch_id:
+        series_batch = db.query(SynthesisBatch).options(joinedload(SynthesisBatch.recipe)).filter(SynthesisBatch.id == series_batch_id).first()
+
+    s1, s2, s3, s4 = st.columns(4)
+    dos_start = s1.number_input("Dosage from [% of cem]", min_value=0.0, max_value=5.0, value=0.1, step=0.05)
+    dos_stop = s2.number_input("Dosage to [% of cem]", min_value=0.0, max_value=5.0, value=1.0, step=0.05)
+    dos_step = s3.number_input("Step [%]", min_value=0.01, max_value=5.0, value=0.1, step=0.01)
+    series_sc = s4.number_input("NG Solid Content [%]", value=float(default_solid_content(db, series_batch) or 0.0), format="%.2f", key=f"series_sc_{series_batch_id}")
+
+    s5, s6, s7, s8 = st.columns(4)
+    wc_text = s5.text_input("w/c ratios", value="0.40, 0.45, 0.50", help="Comma separated.")
+    series_cem_mass = s6.number_input("Cement Mass [g]", min_value=0.0, value=450.0, step=1.0, key="series_cem_mass")
+    series_sand_mass = s7.number_input("Sand Mass [g]", min_value=0.0, value=1350.0, step=1.0, key="series_sand_mass")
+    series_defoamer = s8.number_input("Defoamer [g]", min_value=0.0, value=0.0, step=0.01, key="series_defoamer")
+
+    cement_names = [label for _, label in material_options("Cement", label=CEMENT_LABEL)]
+    if cement_names:
+        series_cements = st.multiselect("Cements", options=cement_names, default=cement_names[:2])
+    else:
+        series_cements = [c.strip() for c in st.text_input("Cements (comma separated)", value="CEM I 42.5 N Heidelberg").split(",") if c.strip()]
+
+    s9, s10, s11, s12 = st.columns(4)
+    series_operator = s9.text_input("Operator", value="Silmina Adzhani", key="series_op")
+    series_date = s10.date_input("Casting Date", value=datetime.date.today(), key="series_cast_date")
+    series_rh = s11.number_input("Curing RH [%]", value=90.0, key="series_rh")
+    series_cubes = s12.number_input("N° of Cubes per Mix", value=12, step=1, key="series_cubes")
+
+    try:
+        wc_list = [float(w) for w in wc_text.split(",") if w.strip()]
+    except ValueError:
+        wc_list = []
+        st.error("w/c ratios must be numbers separated by commas.")
+
+    if wc_list and series_cements:
+        plan = mix_matrix(dosage_range(dos_start, dos_stop, dos_step), wc_list, series_cements, series_sc, series_cem_mass, series_sand_mass, series_defoamer)
+        plan["cube_code"] = allocate_cube_codes(db, series_operator, len(plan))
+        st.dataframe(
+            plan[["cube_code", "cement_type", "wc_ratio", "target_solid_dosage_pct", "dosage_g", "water_from_ng_g", "water_added_g"]],
+            use_container_width=True,
+            hide_index=True
+        )
+        if series_sc <= 0:
+            st.warning("NG solid content is 0 %, so no NG product will be dosed.")
+
+        if st.button(f"✅ Initialise {len(plan)} Mixes", type="primary"):
+            try:
+                created = insert_mix_series(
+                    db, plan,
+                    batch_id=series_batch.id if series_batch else None,
+                    operator=series_operator,
+                    cast_date=datetime.datetime.combine(series_date, datetime.time.min),
+                    casting_time=datetime.datetime.now().strftime("%Hh%M"),
+                    humidity=series_rh,
+                    num_cubes=series_cubes
+                )
+                st.success(f"{created} mixes initialised ({plan['cube_code'].iloc[0]} – {plan['cube_code'].iloc[-1]}).")
+            except Exception as e:
+                st.error(f"Error: {e}")
+    else:
+        st.info("Select at least one cement and one w/c ratio.")
+
 with tab_log:
     st.subheader("📝 Step 2: Log Fresh & Hardened Results")
     
-    # Select from existing performance tests
-    perf_tests = db.query(PerformanceTest).order_by(PerformanceTest.cast_date.desc()).limit(50).all()
-    if not perf_tests:
+    # Select from existing performance tests (searchable, paginated)
+    if not db.query(PerformanceTest.id).first():
         st.info("No mixes designed yet. Go to the 'Mix Design' tab first.")
     else:
-        perf_select = st.selectbox(
-            "Select Trial to Update", 
-            options=perf_tests,
-            format_func=lambda x: f"{x.raw_data.get('cube_code', 'Unnamed')} ({x.batch.lab_notebook_ref if x.batch else 'Ref'}) - {x.cast_date.strftime('%Y-%m-%d')}"
+        perf_select_id = search_select(
+            "Select Trial to Update",
+            search_fn=lambda term, page, size: search_performance_tests(db, term, page, size),
+            format_func=format_test_option,
+            key="log_trial"
         )
+        perf_select = None
+        if perf_select_id:
+            perf_select = db.query(PerformanceTest).options(joinedload(PerformanceTest.batch)).filter(PerformanceTest.id == perf_select_id).first()
 
         if perf_select:
             st.markdown(f"#### Updating Results for: **{perf_select.raw_data.get('cube_code', 'N/A')}**")
@@ -275,9 +301,51 @@ with tab_log:
                     except Exception as e:
                         st.error(f"Error: {e}")
 
+            st.markdown("---")
+            st.markdown("#### 🧱 Per-Specimen Strength (EN 196-1)")
+            st.caption("Enter the breaking load of each half-prism. Averages are computed with ±10 % outlier rejection and written to the results above.")
+            from app.strength import AGE_COLUMNS, DEFAULT_SPECIMENS, DEFAULT_AREA_MM2, load_specimens, save_specimens
+
+            spec_age = st.selectbox("Test Age", options=list(AGE_COLUMNS.keys()), index=2, key="spec_age")
+            df_spec_all = load_specimens(db, [perf_select.id])
+            df_spec = df_spec_all[df_spec_all["age"] == spec_age]
+            if df_spec.empty:
+                df_spec = pd.DataFrame({"specimen": DEFAULT_SPECIMENS, "load_kn": [None] * len(DEFAULT_SPECIMENS), "area_mm2": [DEFAULT_AREA_MM2] * len(DEFAULT_SPECIMENS)})
+            edited_spec = st.data_editor(
+                df_spec[["specimen", "load_kn", "area_mm2"]].reset_index(drop=True),
+                num_rows="dynamic",
+                use_container_width=True,
+                column_config={
+                    "specimen": st.column_config.TextColumn("Specimen"),
+                    "load_kn": st.column_config.NumberColumn("Load [kN]", format="%.2f"),
+                    "area_mm2": st.column_config.NumberColumn("Area [mm²]", format="%.0f"),
+                },
+                key=f"spec_editor_{perf_select.id}_{spec_age}"
+            )
+
+            if st.button("🧮 Compute & Save Specimens", key="spec_save"):
+                try:
+                    stats = save_specimens(db, perf_select, spec_age, edited_spec)
+                    row = stats[stats["age"] == spec_age]
+                    if not row.empty and row.iloc[0]["status"] == "rejected":
+                        st.warning(f"{spec_age}: set rejected (a second result deviates more than 10 % from the mean). Please re-test.")
+                    else:
+                        st.success(f"{spec_age} specimens saved.")
+                        st.rerun()
+                except Exception as e:
+                    st.error(f"Error: {e}")
+
+            stats_summary = (perf_select.raw_data or {}).get("strength_stats", {})
+            if stats_summary:
+                st.dataframe(
+                    pd.DataFrame.from_dict(stats_summary, orient="index").rename_axis("Age").reset_index(),
+                    use_container_width=True,
+                    hide_index=True
+                )
+
 with tab_lib:
     st.subheader("📚 Performance Testing Library")
-    results = db.query(PerformanceTest).order_by(PerformanceTest.cast_date.desc()).all()
+    results = db.query(PerformanceTest).options(joinedload(PerformanceTest.batch)).order_by(PerformanceTest.cast_date.desc()).all()
     if results:
         table_data = []
         for r in results:
@@ -1,7 +1,8 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-from app.database import engine, init_db
+from app.database import init_db
+from app.analytics_data import load_analytics_data, analytics_data_version
+from app.correlation import numeric_columns, correlation_matrix, cluster_order, top_pairs
+from app.downsample import MAX_POINTS, downsample_line, density_bin, histogram_bins, box_stats
 from app.ui_utils import display_logo
 
 # Ensure database is synced
@@ -12,28 +13,20 @@ display_logo()
 
 st.markdown("# 🕵️ Data Explorer & Analytics")
 
-tab_dash, tab1 = st.tabs(["📊 Dashboard", "🕵️ Advanced Explorer"])
+tab_dash, tab1, tab_corr = st.tabs(["📊 Dashboard", "🕵️ Advanced Explorer", "🧮 Correlation Matrix"])
 
-# Load Data via SQL
-query = """
-SELECT 
-    r.name as recipe_name,
-    r.ca_si_ratio,
-    r.molarity_ca_no3,
-    r.pce_content_wt,
-    b.lab_notebook_ref as measurement_id,
-    b.execution_date,
-    p.compressive_strength_1d,
-    p.compressive_strength_7d,
-    p.compressive_strength_28d,
-    p.flow
-FROM performance_tests p
-JOIN synthesis_batches b ON p.batch_id = b.id
-JOIN recipes r ON b.recipe_id = r.id
-"""
+# Charts are reduced on the server to at most MAX_POINTS points unless full resolution is requested
+full_res = st.sidebar.toggle("Full-resolution charts", value=False, help=f"Send every data point to the browser (for export). Otherwise charts are capped at {MAX_POINTS} points.")
+max_points = None if full_res else MAX_POINTS
 
 try:
-    df = pd.read_sql(query, engine)
+    # Cached per data version; widget changes below reuse it without touching the database
+    df = load_analytics_data()
+    df_version = analytics_data_version()
+    if not df.empty:
+        # Plotly is only loaded once there is something to chart
+        import plotly.express as px
+        import plotly.graph_objects as go
     
     with tab_dash:
         st.subheader("Global Trends")
@@ -41,10 +34,25 @@ try:
             st.info("No data available for dashboard.")
         else:
             col1, col2 = st.columns(2)
-            fig_trend = px.line(df.sort_values("execution_date"), x="execution_date", y="compressive_strength_28d", title="28d Strength Evolution Over Time")
+            df_trend = df.sort_values("execution_date") if full_res else downsample_line(df, "execution_date", "compressive_strength_28d", max_points)
+            fig_trend = px.line(df_trend, x="execution_date", y="compressive_strength_28d", title="28d Strength Evolution Over Time")
             col1.plotly_chart(fig_trend, use_container_width=True)
             
-            fig_dist = px.box(df, y="compressive_strength_28d", points="all", title="Strength Variability Range")
+            if full_res:
+                fig_dist = px.box(df, y="compressive_strength_28d", points="all", title="Strength Variability Range")
+            else:
+                # Quartiles computed here; only the box and its outliers are sent
+                bs = box_stats(df["compressive_strength_28d"])
+                fig_dist = go.Figure()
+                if bs:
+                    fig_dist.add_trace(go.Box(
+                        name="compressive_strength_28d",
+                        q1=[bs["q1"]], median=[bs["median"]], q3=[bs["q3"]],
+                        lowerfence=[bs["lowerfence"]], upperfence=[bs["upperfence"]], mean=[bs["mean"]]
+                    ))
+                    if len(bs["outliers"]):
+                        fig_dist.add_trace(go.Scatter(x=["compressive_strength_28d"] * len(bs["outliers"]), y=bs["outliers"], mode="markers", name="Outliers"))
+                fig_dist.update_layout(title=f"Strength Variability Range (n={bs['n'] if bs else 0})", showlegend=False)
             col2.plotly_chart(fig_dist, use_container_width=True)
 
     with tab1:
@@ -61,21 +69,75 @@ try:
             y_axis = c2.selectbox("Y Axis", options=["compressive_strength_1d", "compressive_strength_7d", "compressive_strength_28d"])
             color_by = c3.selectbox("Color By", options=["recipe_name", "measurement_id"])
             
+            df_scatter = df if full_res else density_bin(df, x_axis, y_axis, color=color_by, max_points=max_points)
             fig = px.scatter(
-                df, 
+                df_scatter, 
                 x=x_axis, 
                 y=y_axis, 
                 color=color_by, 
                 size="compressive_strength_28d" if "compressive_strength_28d" in df.columns else None, 
-                hover_data=["measurement_id"],
+                hover_data=["measurement_id"] + (["n_points"] if "n_points" in df_scatter.columns else []),
                 title=f"{y_axis} vs {x_axis}"
             )
             st.plotly_chart(fig, use_container_width=True)
+            if len(df_scatter) < len(df):
+                st.caption(f"Showing {len(df_scatter)} representative points for {len(df)} results (density-binned).")
             
             # Simple Stats
             st.subheader("Distribution Analysis")
-            fig2 = px.histogram(df, x=y_axis, nbins=10, title=f"Distribution of {y_axis}")
+            if full_res:
+                fig2 = px.histogram(df, x=y_axis, nbins=10, title=f"Distribution of {y_axis}")
+            else:
+                # Binned with NumPy; only the bar heights are sent
+                hist = histogram_bins(df[y_axis], nbins=10)
+                fig2 = px.bar(hist, x="center", y="count", hover_data=["left", "right"], title=f"Distribution of {y_axis}", labels={"center": y_axis})
+                fig2.update_traces(width=(hist["right"] - hist["left"]).tolist() if not hist.empty else None)
+                fig2.update_layout(bargap=0)
             st.plotly_chart(fig2, use_container_width=True)
 
+    with tab_corr:
+        st.subheader("Correlation & Sensitivity Matrix")
+        st.caption("All numeric recipe, QC (24h reading) and performance variables, computed in one vectorized pass over the cached dataset.")
+        all_vars = numeric_columns(df) if not df.empty else []
+        if len(all_vars) < 2:
+            st.warning("Not enough numeric data for a correlation matrix.")
+        else:
+            m1, m2, m3 = st.columns([1, 1, 1])
+            corr_method = m1.selectbox("Method", options=["pearson", "spearman", "partial"], format_func=str.title)
+            min_pairs = m2.number_input("Min. paired observations", min_value=3, value=5, step=1)
+            do_cluster = m3.toggle("Cluster variables", value=True)
+            corr_vars = st.multiselect("Variables", options=all_vars, default=all_vars)
+
+            @st.cache_data(show_spinner="Computing correlations...")
+            def cached_correlation(version, columns, method, min_n, _df):
+                corr, counts = correlation_matrix(_df, list(columns), method, min_n)
+                order = cluster_order(corr)
+                return corr, counts, order
+
+            if len(corr_vars) >= 2:
+                corr, counts, order = cached_correlation(df_version, tuple(corr_vars), corr_method, int(min_pairs), df)
+                if do_cluster:
+                    corr = corr.loc[order, order]
+                fig_corr = px.imshow(
+                    corr, zmin=-1, zmax=1, color_continuous_scale="RdBu_r", aspect="auto",
+                    title=f"{corr_method.title()} correlation ({len(corr_vars)} variables, {len(df)} rows)"
+                )
+                fig_corr.update_layout(height=max(450, 18 * len(corr_vars)))
+                st.plotly_chart(fig_corr, use_container_width=True)
+
+                st.subheader("🔎 Drill-down")
+                pairs = top_pairs(corr, counts.loc[corr.index, corr.columns])
+                d1, d2 = st.columns([2, 3])
+                d1.dataframe(pairs, use_container_width=True, hide_index=True, height=400)
+                if not pairs.empty:
+                    pair_labels = [f"{p.x} × {p.y} (r={p.r:.2f})" for p in pairs.itertuples()]
+                    sel_pair = d2.selectbox("Inspect pair", options=range(len(pairs)), format_func=lambda i: pair_labels[i])
+                    px_col, py_col = pairs.loc[sel_pair, "x"], pairs.loc[sel_pair, "y"]
+                    df_pair = df if full_res else density_bin(df, px_col, py_col, max_points=max_points)
+                    fig_pair = px.scatter(df_pair, x=px_col, y=py_col, hover_data=["measurement_id", "recipe_name"], title=f"{py_col} vs {px_col}")
+                    d2.plotly_chart(fig_pair, use_container_width=True)
+            else:
+                st.info("Select at least two variables.")
+
 except Exception as e:
     st.error(f"Database Error: {e}")
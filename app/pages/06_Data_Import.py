@@ -1,10 +1,9 @@
 import streamlit as st
 import pandas as pd
-import datetime
-import uuid
 from sqlalchemy.orm import Session
 from app.database import get_db, init_db
-from app.models import Recipe, SynthesisBatch, PerformanceTest, RawMaterial, StockSolutionBatch, QCMeasurement
+from app.importer import IMPORT_TYPES, IMPORT_MODES, NATURAL_KEYS, KEY_CANDIDATES, STREAM_CHUNK_ROWS, IMPORT_ORDER, key_headers, run_import, read_workbook, detect_import_type, workbook_plan, run_workbook_import, run_streaming_import, iter_file_chunks, file_sha256, find_import_job
+from app.validation import validate_frame
 from app.ui_utils import display_logo
 
 # Ensure database is synced
@@ -18,13 +17,13 @@ st.info("Import historical data from CSV, Excel, or Google Sheets.")
 
 db: Session = next(get_db())
 
-# Define import types and their expected columns (headers)
-IMPORT_TYPES = {
-    "Raw Materials": ["material_name", "chemical_type", "brand", "lot_number", "molecular_weight", "purity_percent", "initial_quantity_kg", "received_date"],
-    "Stock Solutions": ["code", "chemical_type", "molarity", "target_volume_ml", "actual_mass_g", "preparation_date", "operator", "source_lot_number"],
-    "Recipes": ["name", "ca_si_ratio", "molarity_ca", "molarity_si", "solids_percent", "pce_dosage", "target_ph"],
-    "Synthesis Results": ["recipe_name", "batch_ref", "execution_date", "operator", "ph", "solids_measured", "strength_1d", "strength_28d", "flow"]
-}
+@st.cache_data(show_spinner="Reading workbook...", max_entries=2)
+def load_workbook_sheets(file_hash, _fileobj):
+    return read_workbook(_fileobj)
+
+@st.cache_data(show_spinner="Validating...")
+def validate_upload(import_type, df, keys):
+    return validate_frame(import_type, df, keys)
 
 import_mode = st.selectbox("Select Import Category", options=list(IMPORT_TYPES.keys()))
 
@@ -33,13 +32,71 @@ with st.expander("📋 Expected Column Formats", expanded=False):
     st.code(", ".join(IMPORT_TYPES[import_mode]))
     st.caption("Note: Dates should be in YYYY-MM-DD format.")
 
-tab1, tab2 = st.tabs(["📂 File Upload", "🌐 Google Sheet Link"])
+m1, m2 = st.columns([1, 2])
+write_mode = m1.radio("Import Mode", options=list(IMPORT_MODES.keys()), format_func=IMPORT_MODES.get, help="Upsert updates rows whose natural key already exists instead of failing or duplicating them. Dry run shows what an upsert would change without writing.")
+natural_keys = None
+if write_mode != "insert":
+    natural_keys = m2.multiselect("Natural Key", options=KEY_CANDIDATES[import_mode], default=NATURAL_KEYS[import_mode], help="Columns that identify an existing row.")
+    if not natural_keys:
+        m2.warning("Select at least one key column.")
+
+tab1, tab2, tab3 = st.tabs(["📂 File Upload", "🌐 Google Sheet Link", "📚 Workbook (all sheets)"])
 
 df = None
 
 with tab1:
     uploaded_file = st.file_uploader(f"Upload {import_mode} File", type=["csv", "xlsx"])
-    if uploaded_file:
+    streaming = st.toggle("Streaming mode (large files, resumable)", value=False, help=f"Reads and commits the file in chunks of {STREAM_CHUNK_ROWS} rows. If an import stops part-way, uploading the same file again resumes after the last committed chunk.")
+    if uploaded_file and streaming:
+        try:
+            selected_sheet = None
+            if not uploaded_file.name.endswith('.csv'):
+                from openpyxl import load_workbook
+                wb = load_workbook(uploaded_file, read_only=True)
+                sheet_names = wb.sheetnames
+                wb.close()
+                uploaded_file.seek(0)
+                selected_sheet = st.selectbox("Select Sheet", options=sheet_names) if len(sheet_names) > 1 else sheet_names[0]
+            preview = next(iter_file_chunks(uploaded_file, uploaded_file.name, 5, selected_sheet), pd.DataFrame())
+            uploaded_file.seek(0)
+            st.subheader("Data Preview")
+            st.dataframe(preview)
+
+            file_hash = file_sha256(uploaded_file)
+            job = find_import_job(db.connection(), file_hash, import_mode, selected_sheet or "")
+            restart = False
+            if job is not None and job.status == "completed":
+                st.info(f"This file was already imported completely ({job.rows_committed} rows on {job.updated_at:%Y-%m-%d %H:%M}).")
+                restart = st.checkbox("Import it again anyway")
+            elif job is not None:
+                st.warning(f"Previous import stopped after {job.rows_committed} rows ({job.status}{': ' + job.error if job.error else ''}). It will resume from there.")
+                restart = st.checkbox("Start over from the first row instead")
+
+            if write_mode == "dry_run":
+                st.warning("Dry run is not available in streaming mode. Choose Insert or Upsert, or turn streaming off to preview the changes.")
+            if st.button("🚀 Start Streaming Import", disabled=write_mode == "dry_run" or (write_mode != "insert" and not natural_keys)):
+                status = st.empty()
+                try:
+                    result = run_streaming_import(
+                        import_mode, uploaded_file, uploaded_file.name, sheet_name=selected_sheet, restart=restart,
+                        mode=write_mode, keys=natural_keys,
+                        progress=lambda done: status.caption(f"{done} rows committed...")
+                    )
+                except Exception as e:
+                    st.error(f"Import stopped: {e}. Committed chunks are kept; upload the same file again to resume.")
+                else:
+                    if result["status"] == "already_imported":
+                        st.info("Nothing to do: this file was already imported.")
+                    else:
+                        resumed = f" (resumed after row {result['resumed_from']})" if result["resumed_from"] else ""
+                        st.success(f"Imported {result['imported']} records{resumed} in {result['seconds']:.2f} s ({result['rows_per_s'] or 0:,.0f} rows/s).")
+                        st.json(result["inserted"])
+                        if result["errors"]:
+                            st.warning(f"{result['skipped']} row(s) skipped because of invalid values.")
+                            st.dataframe(pd.DataFrame(result["errors"]), use_container_width=True, hide_index=True)
+        except Exception as e:
+            st.error(f"Error reading file: {e}")
+    elif uploaded_file:
         try:
             if uploaded_file.name.endswith('.csv'):
                 df = pd.read_csv(uploaded_file)
@@ -68,101 +125,97 @@ with tab2:
         except Exception as e:
             st.error(f"Error reading Google Sheet: {e}")
 
+with tab3:
+    st.markdown("Import every sheet of a workbook at once. Sheets are matched to an import category by their headers and imported in dependency order (materials → stock solutions → recipes → results) in a single transaction. The category and natural key selected above are ignored; each sheet uses its default key.")
+    workbook_file = st.file_uploader("Upload Workbook", type=["xlsx"], key="workbook_upload")
+    if workbook_file:
+        try:
+            sheets = load_workbook_sheets(file_sha256(workbook_file), workbook_file)
+        except Exception as e:
+            st.error(f"Error reading workbook: {e}")
+            sheets = {}
+        skip = "— Skip —"
+        types = {}
+        for name, sheet_df in sheets.items():
+            detected = detect_import_type(sheet_df.columns)
+            c1, c2 = st.columns([1, 2])
+            choice = c1.selectbox(f"Sheet '{name}' ({len(sheet_df)} rows)", options=[skip] + IMPORT_ORDER,
+                                  index=IMPORT_ORDER.index(detected) + 1 if detected else 0, key=f"wb_type_{name}")
+            types[name] = None if choice == skip else choice
+            if types[name]:
+                found, _ = validate_upload(types[name], sheet_df, key_headers(types[name]))
+                c2.caption(f"{len({e['row'] for e in found})} row(s) with validation problems" if found else "Validation passed")
+            else:
+                c2.caption("Not recognised" if not detected else "Skipped")
+        order = workbook_plan(sheets, types)
+        if order:
+            st.caption("Import order: " + " → ".join(f"{name} ({t})" for name, t in order))
+        if st.button("🚀 Import Workbook", disabled=not order):
+            status = st.empty()
+            try:
+                result = run_workbook_import(
+                    sheets, types, mode=write_mode,
+                    progress=lambda table, done, total: status.caption(f"{table}: {done}/{total} rows")
+                )
+            except Exception as e:
+                st.error(f"Workbook import failed, no data was written: {e}")
+            else:
+                verb = "Checked" if write_mode == "dry_run" else "Imported"
+                st.success(f"{verb} {len(result['order'])} sheet(s) in {result['seconds']:.2f} s.")
+                for name, sheet_result in result["sheets"].items():
+                    st.markdown(f"**{name}** ({sheet_result['type']}): {sheet_result['imported']} rows, {sheet_result['skipped']} skipped")
+                    if write_mode == "dry_run":
+                        for table, diff in sheet_result["diff"].items():
+                            st.dataframe(diff, use_container_width=True, hide_index=True)
+                    else:
+                        st.json(sheet_result["inserted"])
+                    if sheet_result["errors"]:
+                        st.dataframe(pd.DataFrame(sheet_result["errors"]), use_container_width=True, hide_index=True)
+
 if df is not None:
     st.subheader("Data Preview")
     st.dataframe(df.head())
-    
-    if st.button(f"🚀 Confirm Import ({len(df)} rows)"):
-        count = 0
-        progress = st.progress(0)
-        
-        for i, row in df.iterrows():
-            try:
-                if import_mode == "Raw Materials":
-                    new_rm = RawMaterial(
-                        material_name=str(row.get("material_name", "")),
-                        chemical_type=str(row.get("chemical_type", "Other")),
-                        brand=str(row.get("brand", "Unknown")),
-                        lot_number=str(row.get("lot_number", "")),
-                        molecular_weight=float(row.get("molecular_weight", 100.0)),
-                        purity_percent=float(row.get("purity_percent", 99.0)),
-                        initial_quantity_kg=float(row.get("initial_quantity_kg", 0.0)),
-                        remaining_quantity_kg=float(row.get("initial_quantity_kg", 0.0)),
-                        received_date=pd.to_datetime(row.get("received_date", datetime.date.today()))
-                    )
-                    db.add(new_rm)
-                    count += 1
-
-                elif import_mode == "Stock Solutions":
-                    lot = str(row.get("source_lot_number", ""))
-                    rm = db.query(RawMaterial).filter(RawMaterial.lot_number == lot).first() if lot else None
-                    new_ss = StockSolutionBatch(
-                        code=str(row.get("code", "")),
-                        chemical_type=str(row.get("chemical_type", "")),
-                        molarity=float(row.get("molarity", 0.0)),
-                        target_volume_ml=float(row.get("target_volume_ml", 0.0)),
-                        actual_mass_g=float(row.get("actual_mass_g", 0.0)),
-                        preparation_date=pd.to_datetime(row.get("preparation_date", datetime.date.today())),
-                        operator=str(row.get("operator", "Import")),
-                        raw_material_id=rm.id if rm else None
-                    )
-                    db.add(new_ss)
-                    count += 1
-
-                elif import_mode == "Recipes":
-                    new_recipe = Recipe(
-                        name=str(row.get("name", "")),
-                        ca_si_ratio=float(row.get("ca_si_ratio", 1.0)),
-                        molarity_ca_no3=float(row.get("molarity_ca", 1.5)),
-                        molarity_na2sio3=float(row.get("molarity_si", 0.75)),
-                        total_solid_content=float(row.get("solids_percent", 5.0)),
-                        pce_content_wt=float(row.get("pce_dosage", 2.0)),
-                        target_ph=float(row.get("target_ph", 11.5)),
-                        created_by="Import"
-                    )
-                    db.add(new_recipe)
-                    count += 1
-
-                elif import_mode == "Synthesis Results":
-                    r_name = str(row.get("recipe_name", ""))
-                    recipe = db.query(Recipe).filter(Recipe.name == r_name).first()
-                    if not recipe:
-                        recipe = Recipe(name=r_name, created_by="Auto-Import")
-                        db.add(recipe)
-                        db.commit()
-
-                    batch = SynthesisBatch(
-                        recipe_id=recipe.id,
-                        lab_notebook_ref=str(row.get("batch_ref", f"IMP-{uuid.uuid4().hex[:6]}")),
-                        execution_date=pd.to_datetime(row.get("execution_date", datetime.date.today())),
-                        operator=str(row.get("operator", "Import")),
-                        status="Completed"
-                    )
-                    db.add(batch)
-                    db.commit()
 
-                    qc = QCMeasurement(
-                        batch_id=batch.id,
-                        ph=float(row.get("ph", 0)),
-                        solid_content_measured=float(row.get("solids_measured", 0))
-                    )
-                    db.add(qc)
-
-                    perf = PerformanceTest(
-                        batch_id=batch.id,
-                        test_type="Mortar",
-                        compressive_strength_1d=float(row.get("strength_1d", 0)),
-                        compressive_strength_28d=float(row.get("strength_28d", 0)),
-                        flow=float(row.get("flow", 0))
-                    )
-                    db.add(perf)
-                    count += 1
-
-            except Exception as row_err:
-                st.error(f"Error at row {i}: {row_err}")
-            
-            progress.progress((i + 1) / len(df))
-        
-        db.commit()
-        st.success(f"Successfully imported {count} records into {import_mode}!")
+    # One vectorized pass over the whole sheet before anything is written
+    errors, matrix = validate_upload(import_mode, df.reset_index(drop=True), key_headers(import_mode, natural_keys))
+    block = False
+    if errors:
+        st.warning(f"Validation: {len(matrix)} of {len(df)} row(s) have {len(errors)} problem(s). They will be skipped.")
+        st.dataframe(matrix.head(200), use_container_width=True, hide_index=True)
+        d1, d2, d3 = st.columns(3)
+        d1.download_button("⬇️ Error Matrix (CSV)", matrix.to_csv(index=False).encode("utf-8"), file_name="validation_matrix.csv", mime="text/csv")
+        d2.download_button("⬇️ Error List (CSV)", pd.DataFrame(errors).to_csv(index=False).encode("utf-8"), file_name="validation_errors.csv", mime="text/csv")
+        block = d3.checkbox("Block import until the file is clean", value=False)
+    else:
+        st.success(f"Validation: all {len(df)} rows passed.")
+
+    button_label = f"🔍 Preview Changes ({len(df)} rows)" if write_mode == "dry_run" else f"🚀 Confirm Import ({len(df)} rows)"
+    if st.button(button_label, disabled=block or (write_mode != "insert" and not natural_keys)):
+        progress = st.progress(0.0)
+        status = st.empty()
+
+        def on_progress(table, done, total):
+            progress.progress(done / total if total else 1.0)
+            status.caption(f"{table}: {done}/{total} rows")
+
+        try:
+            result = run_import(import_mode, df, mode=write_mode, keys=natural_keys, progress=on_progress)
+        except Exception as e:
+            # Single transaction: nothing was written
+            st.error(f"Import failed, no data was written: {e}")
+        else:
+            progress.progress(1.0)
+            if write_mode == "dry_run":
+                st.success(f"Dry run finished in {result['seconds']:.2f} s. Nothing was written.")
+                for table, diff in result["diff"].items():
+                    counts = result["diff_counts"][table]
+                    st.markdown(f"**{table}**: " + ", ".join(f"{counts.get(k, 0)} {k}" for k in ("new", "changed", "unchanged")))
+                    st.dataframe(diff, use_container_width=True, hide_index=True)
+            else:
+                st.success(f"Successfully imported {result['imported']} records into {import_mode} in {result['seconds']:.2f} s ({result['rows_per_s'] or 0:,.0f} rows/s).")
+                st.json(result["inserted"])
+                st.caption(f"Parent lookups: {result['lookup_queries']} query(ies) for {result['rows']} rows.")
+            if result["errors"]:
+                st.warning(f"{result['skipped']} row(s) skipped because of invalid values.")
+                st.dataframe(pd.DataFrame(result["errors"]), use_container_width=True, hide_index=True)
         if st.button("Refresh Page"): st.rerun()
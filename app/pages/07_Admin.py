@@ -2,8 +2,9 @@ import streamlit as st
 import os
 import datetime
 from sqlalchemy.orm import Session
-from app.database import get_db, init_db, SessionLocal
-from app.models import SystemLog
+from app.database import get_db, init_db
+from app.system_log import log_event, count_logs, query_logs, event_types, archive_logs, archive_files, ARCHIVE_DIR, RETENTION_DAYS
+from app.backup import build_backup, backup_file_name, backup_mime, latest_backup
 from app.ui_utils import display_logo
 
 # Ensure database is synced
@@ -14,60 +15,112 @@ display_logo()
 
 st.title("⚙️ Admin & Settings")
 
-tab1, tab2 = st.tabs(["💾 Database Backup", "🛠️ System Logs"])
-
-db_file_path = "nanogence.db"
+tab1, tab_export, tab2 = st.tabs(["💾 Database Backup", "📦 Data Export", "🛠️ System Logs"])
 
 with tab1:
     st.header("Database Maintenance")
     st.info("Download a copy of the database for your daily backup to Google Drive.")
 
     def log_backup():
-        db = SessionLocal()
+        log_event("BACKUP_DOWNLOAD", "Backup downloaded manually.", user="User")
+
+    def backup_bytes():
+        # Runs only on click; reuses the cached artifact while the data is unchanged
+        with open(build_backup(), "rb") as f:
+            return f.read()
+
+    st.download_button(
+        label="📥 Download Database Backup",
+        data=backup_bytes,
+        file_name=backup_file_name(),
+        mime=backup_mime(),
+        on_click=log_backup,
+        help="Consistent compressed snapshot of the full experimental database, taken while the app keeps running.",
+        type="primary"
+    )
+    ready = latest_backup()
+    if ready:
+        st.caption(f"Current snapshot ready: {os.path.basename(ready)} ({os.path.getsize(ready) / 1e6:.1f} MB)")
+
+    st.divider()
+    st.subheader("Experiment Summary")
+    st.caption("Analytics and ML read the denormalized experiment_summary table, which is kept up to date on every save. Rebuild it after editing the database with external tools.")
+    if st.button("🔄 Rebuild Experiment Summary"):
+        from app.summary import rebuild_summary
+        with st.spinner("Rebuilding..."):
+            count = rebuild_summary()
+        st.success(f"experiment_summary rebuilt ({count} rows).")
+
+with tab_export:
+    st.header("Columnar Dataset Export")
+    st.info("Writes the unified Recipe / Stock Solution / Batch / QC / Performance dataset as partitioned Parquet or Arrow files for notebooks. Incremental runs only append new partitions.")
+    from app.export import export_dataset, load_manifest, EXPORT_DIR
+
+    e1, e2, e3 = st.columns(3)
+    export_dir = e1.text_input("Export Directory", value=EXPORT_DIR)
+    export_fmt = e2.selectbox("Format", options=["parquet", "arrow"], help="Arrow IPC files can be memory-mapped directly.")
+    export_full = e3.checkbox("Full rebuild", value=False, help="Incremental exports do not see deletes or edits to stock batches / raw materials; run a full rebuild periodically.")
+
+    if st.button("📦 Run Export"):
         try:
-            log = SystemLog(
-                event_type="BACKUP_DOWNLOAD",
-                details=f"Backup downloaded manually.",
-                user="User"
-            )
-            db.add(log)
-            db.commit()
+            with st.spinner("Exporting..."):
+                result = export_dataset(root=export_dir, fmt=export_fmt, full=export_full)
+            st.success(f"Export {result['id']} finished ({result['mode']}).")
+            st.json(result["rows"])
         except Exception as e:
-            print(f"Log Error: {e}")
-        finally:
-            db.close()
-
-    if os.path.exists(db_file_path):
-        with open(db_file_path, "rb") as f:
-            db_binary = f.read()
-        
-        timestamp = datetime.date.today().strftime("%Y%m%d")
-        st.download_button(
-            label="📥 Download Database Backup",
-            data=db_binary,
-            file_name=f"nanogence_backup_{timestamp}.db",
-            mime="application/x-sqlite3",
-            on_click=log_backup,
-            help="Download the full experimental database as a single file.",
-            type="primary"
+            st.error(f"Export failed: {e}")
+
+    manifest = load_manifest(export_dir)
+    if manifest["datasets"]:
+        st.caption(f"Current export ({manifest.get('format')}):")
+        st.dataframe(
+            [{"Dataset": name, "Rows": d.get("rows", 0), "Files": len(d.get("files", [])), "Watermark": d.get("watermark", "-")} for name, d in manifest["datasets"].items()],
+            use_container_width=True,
+            hide_index=True
         )
-    else:
-        st.error("Database file not found.")
 
 with tab2:
-    st.header("Recent System Activity")
+    st.header("System Activity")
     db: Session = next(get_db())
-    logs = db.query(SystemLog).order_by(SystemLog.timestamp.desc()).limit(50).all()
-    
-    if logs:
-        log_data = []
-        for l in logs:
-            log_data.append({
-                "Timestamp": l.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-                "Event": l.event_type,
-                "Details": l.details,
-                "User": l.user
-            })
-        st.table(log_data)
+    conn = db.connection()
+
+    f1, f2, f3, f4 = st.columns([2, 1, 1, 2])
+    types = f1.multiselect("Event Type", options=event_types(conn))
+    user = f2.text_input("User")
+    days = f3.selectbox("Period", options=[1, 7, 30, 90, 0], index=2, format_func=lambda d: f"Last {d} day(s)" if d else "All")
+    search = f4.text_input("Search Details")
+    filters = {
+        "event_types": types, "user": user or None, "search": search or None,
+        "since": datetime.datetime.utcnow() - datetime.timedelta(days=days) if days else None,
+    }
+
+    p1, p2 = st.columns([1, 4])
+    page_size = p1.selectbox("Rows per page", options=[25, 50, 100, 250], index=1)
+    total = count_logs(conn, **filters)
+    pages = max(1, -(-total // page_size))
+    page = p2.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1)
+    rows = query_logs(conn, page=page, page_size=page_size, **filters)
+
+    if rows:
+        st.caption(f"{total} event(s) match; showing {(page - 1) * page_size + 1}–{(page - 1) * page_size + len(rows)}. Times in UTC.")
+        st.dataframe(
+            [{"Timestamp": r["timestamp"].strftime("%Y-%m-%d %H:%M:%S"), "Event": r["event_type"], "Details": r["details"], "User": r["user"]} for r in rows],
+            use_container_width=True,
+            hide_index=True
+        )
     else:
-        st.info("No system activity logged yet.")
+        st.info("No system activity matches these filters.")
+
+    with st.expander("🗄️ Log Retention"):
+        st.caption(f"Events older than the retention period are moved into monthly compressed files under {ARCHIVE_DIR} and removed from the database.")
+        r1, r2 = st.columns([1, 3])
+        keep_days = r1.number_input("Keep (days)", min_value=1, value=RETENTION_DAYS, step=1)
+        if r2.button("📦 Archive Old Logs"):
+            archived = archive_logs(days=int(keep_days))
+            if archived:
+                st.success(f"Archived {sum(archived.values())} event(s) into {len(archived)} file(s).")
+            else:
+                st.info("Nothing older than the retention period.")
+        files = archive_files()
+        if files:
+            st.caption("Archives: " + ", ".join(os.path.basename(f) for f in files))
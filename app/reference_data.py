@@ -0,0 +1,62 @@
+import time
+import threading
+from sqlalchemy import select
+from app.database import engine
+from app.data_version import data_version
+from app.models import RawMaterial, StockSolutionBatch
+
+# Dropdown options for the forms: ((id, label), ...) tuples shared by every
+# session of the process. An entry is reloaded when one of its tables changes
+# in this process (data_version) or, for writes made by other processes, once
+# it is older than REFRESH_S.
+REFRESH_S = 60
+
+_cache = {}
+_lock = threading.Lock()
+
+MATERIAL_LABEL = "{material_name} (Lot: {lot_number})"
+STOCK_LABEL = "{code} ({molarity}M)"
+CEMENT_LABEL = "{material_name} ({brand})"
+
+def _cached(key, tables, load):
+    version = data_version(*tables)
+    with _lock:
+        entry = _cache.get(key)
+        if entry and entry[0] == version and time.monotonic() - entry[1] < REFRESH_S:
+            return entry[2]
+    with engine.connect() as conn:
+        value = tuple(load(conn))
+    with _lock:
+        _cache[key] = (version, time.monotonic(), value)
+    return value
+
+def material_options(chemical_type=None, label=MATERIAL_LABEL):
+    """
+    ((id, label), ...) of raw materials, optionally of one chemical type.
+    `label` is a format string over the material_name, lot_number, brand and
+    chemical_type columns.
+    """
+    t = RawMaterial.__table__
+    def load(conn):
+        stmt = select(t.c.id, t.c.material_name, t.c.lot_number, t.c.brand, t.c.chemical_type).order_by(t.c.material_name, t.c.lot_number)
+        if chemical_type:
+            stmt = stmt.where(t.c.chemical_type == chemical_type)
+        return ((r["id"], label.format(**r)) for r in conn.execute(stmt).mappings())
+    return _cached(("materials", chemical_type, label), (t.name,), load)
+
+def stock_batch_options(chemical_type=None, label=STOCK_LABEL):
+    """((id, label), ...) of stock solution batches, newest code first; `label` formats code, molarity and chemical_type."""
+    t = StockSolutionBatch.__table__
+    def load(conn):
+        stmt = select(t.c.id, t.c.code, t.c.molarity, t.c.chemical_type).order_by(t.c.code.desc())
+        if chemical_type:
+            stmt = stmt.where(t.c.chemical_type == chemical_type)
+        return ((r["id"], label.format(**r)) for r in conn.execute(stmt).mappings())
+    return _cached(("stock_batches", chemical_type, label), (t.name,), load)
+
+def stock_batch_brands():
+    """((stock batch id, brand of its raw material), ...); batches without a raw material are left out."""
+    s, m = StockSolutionBatch.__table__, RawMaterial.__table__
+    def load(conn):
+        return conn.execute(select(s.c.id, m.c.brand).join(m, s.c.raw_material_id == m.c.id)).tuples()
+    return _cached(("stock_brands",), (s.name, m.name), load)
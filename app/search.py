@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+from sqlalchemy import or_
+from app.models import Recipe, SynthesisBatch, PerformanceTest, RawMaterial
+
+# Results per page in the search-as-you-type selectors
+PAGE_SIZE = 20
+
+def _date_range(term):
+    """If the search term is a date (YYYY-MM-DD / YYYY-MM), return the matching [start, end) range."""
+    for fmt, span in (("%Y-%m-%d", timedelta(days=1)), ("%Y-%m", None)):
+        try:
+            start = datetime.strptime(term, fmt)
+        except ValueError:
+            continue
+        if span is None:
+            end = datetime(start.year + (start.month == 12), start.month % 12 + 1, 1)
+        else:
+            end = start + span
+        return start, end
+    return None
+
+def _paginate(query, page, page_size):
+    total = query.order_by(None).count()
+    rows = query.limit(page_size).offset(max(page - 1, 0) * page_size).all()
+    return rows, total
+
+def search_performance_tests(db, term="", page=1, page_size=PAGE_SIZE):
+    """
+    Projection query for the trial selector: only id, cube code, batch ref,
+    recipe name and cast date are loaded, with the joins done in SQL.
+    Returns (rows, total_matches).
+    """
+    query = db.query(
+        PerformanceTest.id,
+        PerformanceTest.cube_code,
+        PerformanceTest.cast_date,
+        SynthesisBatch.lab_notebook_ref,
+        Recipe.name.label("recipe_name")
+    ).outerjoin(SynthesisBatch, PerformanceTest.batch_id == SynthesisBatch.id) \
+     .outerjoin(Recipe, SynthesisBatch.recipe_id == Recipe.id)
+
+    term = (term or "").strip()
+    if term:
+        dates = _date_range(term)
+        if dates:
+            query = query.filter(PerformanceTest.cast_date >= dates[0], PerformanceTest.cast_date < dates[1])
+        else:
+            like = f"%{term}%"
+            query = query.filter(or_(
+                PerformanceTest.cube_code.ilike(like),
+                SynthesisBatch.lab_notebook_ref.ilike(like),
+                Recipe.name.ilike(like)
+            ))
+
+    query = query.order_by(PerformanceTest.cast_date.desc(), PerformanceTest.cube_code.desc())
+    return _paginate(query, page, page_size)
+
+def search_synthesis_batches(db, term="", page=1, page_size=PAGE_SIZE):
+    """Projection query for the synthesis batch selector. Returns (rows, total_matches)."""
+    query = db.query(
+        SynthesisBatch.id,
+        SynthesisBatch.lab_notebook_ref,
+        SynthesisBatch.execution_date,
+        Recipe.name.label("recipe_name")
+    ).outerjoin(Recipe, SynthesisBatch.recipe_id == Recipe.id)
+
+    term = (term or "").strip()
+    if term:
+        dates = _date_range(term)
+        if dates:
+            query = query.filter(SynthesisBatch.execution_date >= dates[0], SynthesisBatch.execution_date < dates[1])
+        else:
+            like = f"%{term}%"
+            query = query.filter(or_(
+                SynthesisBatch.lab_notebook_ref.ilike(like),
+                Recipe.name.ilike(like)
+            ))
+
+    query = query.order_by(SynthesisBatch.execution_date.desc())
+    return _paginate(query, page, page_size)
+
+def search_raw_materials(db, term="", page=1, page_size=PAGE_SIZE):
+    """Projection query for the raw material lot selector. Returns (rows, total_matches)."""
+    query = db.query(
+        RawMaterial.id,
+        RawMaterial.material_name,
+        RawMaterial.lot_number,
+        RawMaterial.brand,
+        RawMaterial.received_date
+    )
+
+    term = (term or "").strip()
+    if term:
+        dates = _date_range(term)
+        if dates:
+            query = query.filter(RawMaterial.received_date >= dates[0], RawMaterial.received_date < dates[1])
+        else:
+            like = f"%{term}%"
+            query = query.filter(or_(
+                RawMaterial.lot_number.ilike(like),
+                RawMaterial.material_name.ilike(like),
+                RawMaterial.brand.ilike(like)
+            ))
+
+    query = query.order_by(RawMaterial.received_date.desc())
+    return _paginate(query, page, page_size)
+
+def format_test_option(row):
+    date_str = row.cast_date.strftime('%Y-%m-%d') if row.cast_date else "N/A"
+    return f"{row.cube_code or 'Unnamed'} ({row.lab_notebook_ref or 'Ref'}) - {date_str}"
+
+def format_batch_option(row):
+    return f"{row.lab_notebook_ref} ({row.recipe_name or 'Unknown'})"
+
+def format_material_option(row):
+    return f"{row.material_name} - Lot {row.lot_number or 'N/A'} ({row.brand or 'Unknown'})"
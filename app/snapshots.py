@@ -0,0 +1,196 @@
+import os
+import gzip
+import json
+import time
+import sqlite3
+import hashlib
+import datetime
+import tempfile
+from app.database import engine
+from app.backup import sqlite_snapshot
+
+# Incremental snapshot store:
+#   <target>/chunks/<ab>/<sha256>.<codec>  page-aligned chunks, stored once
+#   <target>/snapshots/<id>.json           ordered chunk list per snapshot
+STORE_DIR = os.getenv("BACKUP_TARGET", os.path.join("backups", "store"))
+# SQLite pages per chunk: one changed row rewrites one chunk, not the file
+PAGES_PER_CHUNK = 16
+CODECS = {"gz": (lambda b: gzip.compress(b, compresslevel=6), gzip.decompress)}
+try:
+    import zstandard
+    CODECS["zst"] = (zstandard.ZstdCompressor(level=10).compress, zstandard.ZstdDecompressor().decompress)
+except ImportError:
+    pass
+DEFAULT_CODEC = "zst" if "zst" in CODECS else "gz"
+
+def _chunk_path(root, digest, codec):
+    return os.path.join(root, "chunks", digest[:2], f"{digest}.{codec}")
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".part", "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".part", path)
+
+def _find_chunk(root, digest):
+    for codec in CODECS:
+        path = _chunk_path(root, digest, codec)
+        if os.path.exists(path):
+            return path, codec
+    return None, None
+
+def take_snapshot(root=STORE_DIR, codec=DEFAULT_CODEC):
+    """
+    Consistent snapshot of the live SQLite database (online backup API), split
+    into page-aligned chunks. Chunks are addressed by SHA-256 and only written
+    if the store does not have them yet, so unchanged pages cost nothing.
+    Returns the snapshot manifest plus new / reused chunk counts.
+    """
+    if engine.dialect.name != "sqlite":
+        raise ValueError("Incremental snapshots read SQLite pages; back up Postgres with a logical dump instead.")
+    started = time.perf_counter()
+    os.makedirs(root, exist_ok=True)
+    # Local temp dir: the store may be a synced folder, which should only ever see new chunks
+    fd, tmp = tempfile.mkstemp(suffix=".db", dir=tempfile.gettempdir())
+    os.close(fd)
+    try:
+        sqlite_snapshot(tmp)
+        conn = sqlite3.connect(tmp)
+        try:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            # Journal position contained in the snapshot: replay starts after it
+            journal_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM change_journal").fetchone()[0]
+        except sqlite3.OperationalError:
+            journal_seq = None
+        finally:
+            conn.close()
+        chunk_size = page_size * PAGES_PER_CHUNK
+        chunks, new, new_bytes, whole = [], 0, 0, hashlib.sha256()
+        with open(tmp, "rb") as f:
+            for block in iter(lambda: f.read(chunk_size), b""):
+                whole.update(block)
+                digest = hashlib.sha256(block).hexdigest()
+                chunks.append(digest)
+                if _find_chunk(root, digest)[0] is None:
+                    data = CODECS[codec][0](block)
+                    _write_atomic(_chunk_path(root, digest, codec), data)
+                    new += 1
+                    new_bytes += len(data)
+        size = os.path.getsize(tmp)
+    finally:
+        os.remove(tmp)
+
+    now = datetime.datetime.now()
+    manifest = {
+        "id": now.strftime("%Y%m%dT%H%M%S%f"),
+        "created_at": now.isoformat(timespec="seconds"),
+        "size": size,
+        "sha256": whole.hexdigest(),
+        "journal_seq": journal_seq,
+        "chunk_size": chunk_size,
+        "chunks": chunks,
+    }
+    # Manifest last: a snapshot exists only once all its chunks are stored
+    _write_atomic(os.path.join(root, "snapshots", f"{manifest['id']}.json"), json.dumps(manifest).encode("utf-8"))
+    return {
+        "id": manifest["id"], "size": size, "chunks": len(chunks), "new_chunks": new,
+        "reused_chunks": len(chunks) - new, "stored_bytes": new_bytes, "journal_seq": journal_seq,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+def list_snapshots(root=STORE_DIR):
+    """Manifests in the store, oldest first."""
+    folder = os.path.join(root, "snapshots")
+    if not os.path.isdir(folder):
+        return []
+    out = []
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(".json"):
+            with open(os.path.join(folder, name), encoding="utf-8") as f:
+                out.append(json.load(f))
+    return out
+
+def restore_snapshot(snapshot_id, dest, root=STORE_DIR):
+    """Reassemble a snapshot into `dest` (written atomically); checks every chunk hash and the file hash."""
+    with open(os.path.join(root, "snapshots", f"{snapshot_id}.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    whole = hashlib.sha256()
+    part = dest + ".part"
+    try:
+        with open(part, "wb") as out:
+            for digest in manifest["chunks"]:
+                path, codec = _find_chunk(root, digest)
+                if path is None:
+                    raise ValueError(f"Snapshot {snapshot_id}: chunk {digest} is missing")
+                with open(path, "rb") as f:
+                    block = CODECS[codec][1](f.read())
+                if hashlib.sha256(block).hexdigest() != digest:
+                    raise ValueError(f"Snapshot {snapshot_id}: chunk {digest} is corrupt")
+                whole.update(block)
+                out.write(block)
+        if whole.hexdigest() != manifest["sha256"]:
+            raise ValueError(f"Snapshot {snapshot_id}: restored file does not match its checksum")
+        os.replace(part, dest)
+    finally:
+        if os.path.exists(part):
+            os.remove(part)
+    return dest
+
+def verify_snapshot(snapshot_id, root=STORE_DIR):
+    """Restore into a temporary file and run SQLite's integrity check. Returns "ok" or the problems found."""
+    fd, tmp = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        restore_snapshot(snapshot_id, tmp, root)
+        conn = sqlite3.connect(tmp)
+        try:
+            rows = [r[0] for r in conn.execute("PRAGMA integrity_check")]
+        finally:
+            conn.close()
+        return "ok" if rows == ["ok"] else "; ".join(rows)
+    finally:
+        os.remove(tmp)
+
+def _retained(snapshots, keep_last, keep_daily, keep_weekly):
+    """Ids kept by the policy: the newest `keep_last`, plus the newest of each of the last `keep_daily` days and `keep_weekly` ISO weeks."""
+    newest_first = sorted(snapshots, key=lambda m: m["id"], reverse=True)
+    keep = {m["id"] for m in newest_first[:keep_last]}
+    for count, period in ((keep_daily, lambda d: d.date()), (keep_weekly, lambda d: d.isocalendar()[:2])):
+        seen = []
+        for m in newest_first:
+            p = period(datetime.datetime.fromisoformat(m["created_at"]))
+            if p not in seen:
+                if len(seen) == count:
+                    break
+                seen.append(p)
+                keep.add(m["id"])
+    return keep
+
+def prune_snapshots(root=STORE_DIR, keep_last=7, keep_daily=14, keep_weekly=8):
+    """Apply the retention policy, then delete chunks no remaining snapshot references."""
+    snapshots = list_snapshots(root)
+    keep = _retained(snapshots, keep_last, keep_daily, keep_weekly)
+    removed = [m["id"] for m in snapshots if m["id"] not in keep]
+    for snapshot_id in removed:
+        os.remove(os.path.join(root, "snapshots", f"{snapshot_id}.json"))
+    referenced = {d for m in snapshots if m["id"] in keep for d in m["chunks"]}
+    freed = 0
+    chunk_root = os.path.join(root, "chunks")
+    for folder, _, files in os.walk(chunk_root):
+        for name in files:
+            digest = name.split(".")[0]
+            if digest not in referenced:
+                path = os.path.join(folder, name)
+                freed += os.path.getsize(path)
+                os.remove(path)
+    positions = [m.get("journal_seq") for m in snapshots if m["id"] in keep]
+    oldest_seq = min(positions) if positions and None not in positions else None
+    return {"removed_snapshots": removed, "kept": len(keep), "freed_bytes": freed, "oldest_journal_seq": oldest_seq}
+
+def store_size(root=STORE_DIR):
+    total = 0
+    for folder, _, files in os.walk(root):
+        total += sum(os.path.getsize(os.path.join(folder, n)) for n in files)
+    return total
@@ -0,0 +1,206 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from app.models import PerformanceTest, StrengthSpecimen
+from app.summary import refresh_summary
+from app.journal import record, row_ops
+
+# Test ages and the PerformanceTest column holding their average.
+# 3d has no dedicated column and is kept in raw_data["cs_3d"].
+AGE_COLUMNS = {
+    "12h": "compressive_strength_12h",
+    "16h": "compressive_strength_16h",
+    "1d": "compressive_strength_1d",
+    "2d": "compressive_strength_2d",
+    "3d": None,
+    "7d": "compressive_strength_7d",
+    "28d": "compressive_strength_28d",
+}
+
+# Three prisms broken in two halves (EN 196-1)
+DEFAULT_SPECIMENS = ["A1", "A2", "B1", "B2", "C1", "C2"]
+DEFAULT_AREA_MM2 = 1600.0
+# EN 196-1: a result deviating more than ±10 % from the mean is discarded
+OUTLIER_TOLERANCE = 0.10
+
+def specimen_strength(load_kn, area_mm2):
+    """Compressive strength [MPa] from breaking load [kN] and loaded area [mm²]."""
+    load = np.asarray(load_kn, dtype=float)
+    area = np.asarray(area_mm2, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(area > 0, load * 1000.0 / area, np.nan)
+
+def load_specimens(db, test_ids=None):
+    """All specimen rows (optionally limited to some tests) as a DataFrame."""
+    stmt = select(
+        StrengthSpecimen.id,
+        StrengthSpecimen.test_id,
+        StrengthSpecimen.age,
+        StrengthSpecimen.specimen,
+        StrengthSpecimen.load_kn,
+        StrengthSpecimen.area_mm2,
+        StrengthSpecimen.strength_mpa,
+    )
+    if test_ids is not None:
+        stmt = stmt.where(StrengthSpecimen.test_id.in_(list(test_ids)))
+    rows = db.execute(stmt).mappings().all()
+    return pd.DataFrame(rows, columns=["id", "test_id", "age", "specimen", "load_kn", "area_mm2", "strength_mpa"])
+
+def compute_strength_stats(df, tolerance=OUTLIER_TOLERANCE):
+    """
+    EN 196-1 style statistics for every (test_id, age) group in one pass.
+
+    The mean of all results is taken first. In each group the single result
+    furthest from the mean is discarded if it deviates by more than the
+    tolerance, and the mean of the remaining results is used. If any of the
+    remaining results still deviates by more than the tolerance, the whole set
+    is rejected (mean = NaN, status = "rejected").
+
+    Returns (specimens, stats): the input rows with `strength_mpa` and `excluded`
+    filled in, and one row per group with n, mean, std, cv_pct and status.
+    """
+    stat_cols = ["test_id", "age", "n", "n_used", "mean", "std", "cv_pct", "status"]
+    if df.empty:
+        return df.assign(excluded=pd.Series(dtype=bool)), pd.DataFrame(columns=stat_cols)
+
+    df = df.copy()
+    # Recompute strength wherever a load was recorded
+    has_load = df["load_kn"].notna()
+    area = df["area_mm2"].fillna(DEFAULT_AREA_MM2)
+    df.loc[has_load, "strength_mpa"] = specimen_strength(df.loc[has_load, "load_kn"], area[has_load])
+    df = df[df["strength_mpa"].notna()].reset_index(drop=True)
+
+    keys = ["test_id", "age"]
+    grp = df.groupby(keys, sort=False)["strength_mpa"]
+    n = grp.transform("size")
+    mean_all = grp.transform("mean")
+    dev = (df["strength_mpa"] - mean_all).abs() / mean_all
+
+    # Discard only the single worst result per group, and only with 3+ results
+    worst = dev.eq(dev.groupby([df["test_id"], df["age"]], sort=False).transform("max"))
+    first_worst = worst & worst.astype(int).groupby([df["test_id"], df["age"]], sort=False).cumsum().eq(1)
+    df["excluded"] = first_worst & (dev > tolerance) & (n >= 3)
+
+    kept = df.loc[~df["excluded"]]
+    kept_grp = kept.groupby(keys, sort=False)["strength_mpa"]
+    kept_mean = kept_grp.transform("mean")
+    kept_dev = (kept["strength_mpa"] - kept_mean).abs() / kept_mean
+
+    stats = kept_grp.agg(n_used="size", mean="mean", std="std")
+    stats["n"] = df.groupby(keys, sort=False).size()
+    stats["cv_pct"] = stats["std"] / stats["mean"] * 100.0
+    set_rejected = kept.assign(bad=kept_dev > tolerance).groupby(keys, sort=False)["bad"].any()
+    # Only apply the second check when a result was already discarded
+    had_exclusion = df.groupby(keys, sort=False)["excluded"].any()
+    had_exclusion = had_exclusion.reindex(stats.index)
+    rejected = set_rejected.reindex(stats.index) & had_exclusion
+    stats["status"] = np.where(rejected, "rejected", np.where(had_exclusion, "outlier_removed", "ok"))
+    stats.loc[rejected, "mean"] = np.nan
+
+    stats = stats.reset_index()[stat_cols]
+    return df, stats
+
+def write_back(db, specimens, stats):
+    """
+    Persist specimen strengths/exclusions and copy the group means into the
+    PerformanceTest average columns (3d goes into raw_data). Does not commit.
+    """
+    if not specimens.empty and "id" in specimens.columns:
+        spec_rows = specimens.dropna(subset=["id"])
+        spec_mappings = [
+            {"id": r.id, "strength_mpa": float(r.strength_mpa), "excluded": bool(r.excluded)}
+            for r in spec_rows.itertuples(index=False)
+        ]
+        db.bulk_update_mappings(StrengthSpecimen, spec_mappings)
+        record(db.connection(), {"strength_specimens": row_ops("strength_specimens", "U", spec_mappings)})
+
+    if stats.empty:
+        return 0
+
+    test_ids = list(stats["test_id"].unique())
+    raw_by_id = dict(db.execute(
+        select(PerformanceTest.id, PerformanceTest.raw_data).where(PerformanceTest.id.in_(test_ids))
+    ).all())
+
+    mappings = []
+    for test_id, group in stats.groupby("test_id", sort=False):
+        row = {"id": test_id}
+        raw = dict(raw_by_id.get(test_id) or {})
+        summary = dict(raw.get("strength_stats") or {})
+        for s in group.itertuples(index=False):
+            mean = None if pd.isna(s.mean) else round(float(s.mean), 2)
+            col = AGE_COLUMNS.get(s.age)
+            if col:
+                row[col] = mean
+            elif s.age == "3d":
+                if mean is None:
+                    raw.pop("cs_3d", None)
+                else:
+                    raw["cs_3d"] = mean
+            summary[s.age] = {
+                "n": int(s.n), "n_used": int(s.n_used), "mean": mean,
+                "std": None if pd.isna(s.std) else round(float(s.std), 3),
+                "cv_pct": None if pd.isna(s.cv_pct) else round(float(s.cv_pct), 2),
+                "status": s.status,
+            }
+        raw["strength_stats"] = summary
+        row["raw_data"] = raw
+        mappings.append(row)
+
+    db.bulk_update_mappings(PerformanceTest, mappings)
+    # Bulk updates skip the flush hooks that maintain experiment_summary and the change journal
+    record(db.connection(), {"performance_tests": row_ops("performance_tests", "U", mappings)})
+    refresh_summary(db.connection(), [m["id"] for m in mappings])
+    return len(mappings)
+
+def clear_age(db, test_id, age):
+    """Drop the average and statistics of one test age whose specimens were all removed. Does not commit."""
+    raw = dict(db.execute(select(PerformanceTest.raw_data).where(PerformanceTest.id == test_id)).scalar() or {})
+    summary = dict(raw.get("strength_stats") or {})
+    summary.pop(age, None)
+    raw["strength_stats"] = summary
+    row = {"id": test_id}
+    col = AGE_COLUMNS.get(age)
+    if col:
+        row[col] = None
+    elif age == "3d":
+        raw.pop("cs_3d", None)
+    row["raw_data"] = raw
+    db.bulk_update_mappings(PerformanceTest, [row])
+    record(db.connection(), {"performance_tests": row_ops("performance_tests", "U", [row])})
+    refresh_summary(db.connection(), [test_id])
+
+def refresh_strengths(db, test_ids=None):
+    """Recompute statistics for the given tests (or all tests) and write them back. Does not commit."""
+    specimens, stats = compute_strength_stats(load_specimens(db, test_ids))
+    write_back(db, specimens, stats)
+    return stats
+
+def save_specimens(db, test, age, specimens_df):
+    """
+    Replace the specimens of one test age with the edited rows
+    (columns: specimen, load_kn, area_mm2) and refresh its statistics.
+    Clearing every load of an age also clears its average and statistics.
+    """
+    spec = StrengthSpecimen.__table__
+    replaced = db.execute(select(spec).where(spec.c.test_id == test.id, spec.c.age == age)).mappings().all()
+    db.query(StrengthSpecimen).filter(
+        StrengthSpecimen.test_id == test.id,
+        StrengthSpecimen.age == age
+    ).delete(synchronize_session=False)
+    record(db.connection(), {"strength_specimens": row_ops("strength_specimens", "D", replaced)})
+
+    rows = specimens_df.dropna(subset=["load_kn"])
+    area = rows["area_mm2"].fillna(DEFAULT_AREA_MM2).astype(float)
+    strength = specimen_strength(rows["load_kn"], area)
+    db.add_all([
+        StrengthSpecimen(test_id=test.id, age=age, specimen=str(spec), load_kn=float(load), area_mm2=float(a), strength_mpa=float(fc))
+        for spec, load, a, fc in zip(rows["specimen"], rows["load_kn"], area, strength)
+    ])
+    db.flush()
+    stats = refresh_strengths(db, [test.id])
+    if replaced and not (stats["age"] == age).any():
+        clear_age(db, test.id, age)
+    db.commit()
+    db.expire(test)
+    return stats
@@ -0,0 +1,195 @@
+from datetime import datetime
+from sqlalchemy import event, select, delete, func, literal, or_, DateTime, inspect as sa_inspect
+from sqlalchemy.orm import aliased
+from app.database import engine, SessionLocal
+from app.models import (
+    RawMaterial, StockSolutionBatch, Recipe, SynthesisBatch, QCMeasurement, PerformanceTest, ExperimentSummary
+)
+
+# Ids per DELETE / INSERT ... SELECT statement (stays under SQLite's bound-parameter limit)
+REFRESH_CHUNK = 500
+
+QC_PSD_COLUMNS = [
+    f"psd_{stage}_{basis}_{stat}"
+    for stage in ("before", "after") for basis in ("v", "n") for stat in ("d10", "d50", "d90", "mean")
+] + ["psd_before_ssa", "psd_after_ssa", "agglom_vol", "agglom_num", "agglom_ssa"]
+
+RECIPE_COLUMNS = [
+    "ca_si_ratio", "molarity_ca_no3", "molarity_na2sio3", "total_solid_content", "pce_content_wt",
+    "target_ph", "ca_addition_rate", "si_addition_rate",
+]
+TEST_COLUMNS = [
+    "test_type", "cube_code", "cast_date", "fresh_density", "flow", "air_content", "temperature", "humidity",
+    "compressive_strength_12h", "compressive_strength_16h", "compressive_strength_1d",
+    "compressive_strength_2d", "compressive_strength_7d", "compressive_strength_28d",
+]
+
+def _ranked_qc(order_by, test_ids=None):
+    """QC rows numbered per batch; rn = 1 is the reading picked by `order_by`."""
+    q = QCMeasurement.__table__
+    stmt = select(q, func.row_number().over(partition_by=q.c.batch_id, order_by=order_by).label("rn"))
+    if test_ids is not None:
+        # Only rank the readings of the affected batches
+        p = PerformanceTest.__table__
+        stmt = stmt.where(q.c.batch_id.in_(select(p.c.batch_id).where(p.c.id.in_(test_ids))))
+    return stmt.subquery()
+
+def summary_select(test_ids=None):
+    """SELECT producing experiment_summary rows (all tests, or only `test_ids`)."""
+    p = PerformanceTest.__table__
+    b = SynthesisBatch.__table__
+    r = Recipe.__table__
+    ca_stock = aliased(StockSolutionBatch.__table__)
+    si_stock = aliased(StockSolutionBatch.__table__)
+    ca_mat = aliased(RawMaterial.__table__)
+    si_mat = aliased(RawMaterial.__table__)
+    qc = QCMeasurement.__table__
+    # Reading closest to 24h ageing (as used for mix design), and the most recent one
+    q24 = _ranked_qc((func.abs(func.coalesce(qc.c.ageing_time, 0) - 24.0), qc.c.measured_at.desc()), test_ids)
+    qlast = _ranked_qc((qc.c.measured_at.desc(), qc.c.ageing_time.desc()), test_ids)
+
+    columns = [
+        p.c.id.label("test_id"),
+        *[p.c[c].label(c) for c in TEST_COLUMNS],
+        b.c.id.label("batch_id"),
+        b.c.lab_notebook_ref.label("measurement_id"),
+        b.c.execution_date.label("execution_date"),
+        b.c.operator.label("batch_operator"),
+        r.c.id.label("recipe_id"),
+        r.c.name.label("recipe_name"),
+        r.c.code.label("recipe_code"),
+        *[r.c[c].label(c) for c in RECIPE_COLUMNS],
+        ca_stock.c.id.label("ca_stock_batch_id"),
+        ca_stock.c.code.label("ca_stock_code"),
+        ca_mat.c.id.label("ca_raw_material_id"),
+        ca_mat.c.lot_number.label("ca_material_lot"),
+        si_stock.c.id.label("si_stock_batch_id"),
+        si_stock.c.code.label("si_stock_code"),
+        si_mat.c.id.label("si_raw_material_id"),
+        si_mat.c.lot_number.label("si_material_lot"),
+        q24.c.ageing_time.label("qc_ageing_time"),
+        q24.c.ph.label("qc_ph"),
+        q24.c.solid_content_measured.label("qc_solid_content"),
+        q24.c.settling_height.label("qc_settling_height"),
+        *[q24.c[c].label(f"qc_{c}") for c in QC_PSD_COLUMNS],
+        qlast.c.measured_at.label("latest_qc_measured_at"),
+        qlast.c.ageing_time.label("latest_qc_ageing_time"),
+        qlast.c.ph.label("latest_qc_ph"),
+        qlast.c.solid_content_measured.label("latest_qc_solid_content"),
+        qlast.c.psd_before_v_d50.label("latest_qc_psd_before_v_d50"),
+        literal(datetime.utcnow(), DateTime).label("updated_at"),
+    ]
+    stmt = select(*columns) \
+        .select_from(p) \
+        .outerjoin(b, p.c.batch_id == b.c.id) \
+        .outerjoin(r, b.c.recipe_id == r.c.id) \
+        .outerjoin(ca_stock, r.c.ca_stock_batch_id == ca_stock.c.id) \
+        .outerjoin(ca_mat, ca_stock.c.raw_material_id == ca_mat.c.id) \
+        .outerjoin(si_stock, r.c.si_stock_batch_id == si_stock.c.id) \
+        .outerjoin(si_mat, si_stock.c.raw_material_id == si_mat.c.id) \
+        .outerjoin(q24, (q24.c.batch_id == b.c.id) & (q24.c.rn == 1)) \
+        .outerjoin(qlast, (qlast.c.batch_id == b.c.id) & (qlast.c.rn == 1))
+    if test_ids is not None:
+        stmt = stmt.where(p.c.id.in_(test_ids))
+    return stmt
+
+def refresh_summary(conn, test_ids=None):
+    """
+    Recompute experiment_summary rows for `test_ids` (all rows if None) with set-based
+    DELETE + INSERT ... SELECT on `conn`. Tests that no longer exist simply lose their row.
+    Runs inside the caller's transaction.
+    """
+    s = ExperimentSummary.__table__
+    names = [c.name for c in summary_select().selected_columns]
+    if test_ids is None:
+        conn.execute(delete(s))
+        conn.execute(s.insert().from_select(names, summary_select()))
+        return
+    ids = list(dict.fromkeys(test_ids))
+    for i in range(0, len(ids), REFRESH_CHUNK):
+        chunk = ids[i:i + REFRESH_CHUNK]
+        conn.execute(delete(s).where(s.c.test_id.in_(chunk)))
+        conn.execute(s.insert().from_select(names, summary_select(chunk)))
+
+def rebuild_summary():
+    """Full rebuild of experiment_summary in one transaction. Returns the row count."""
+    with engine.begin() as conn:
+        refresh_summary(conn)
+        return conn.execute(select(func.count()).select_from(ExperimentSummary.__table__)).scalar()
+
+def summary_out_of_sync(conn):
+    """Cheap consistency check: one summary row per performance test."""
+    return conn.execute(select(
+        select(func.count()).select_from(PerformanceTest.__table__).scalar_subquery()
+        != select(func.count()).select_from(ExperimentSummary.__table__).scalar_subquery()
+    )).scalar()
+
+# --- Incremental maintenance -------------------------------------------------
+
+def _ids_with_history(obj, attr):
+    """Current and previous (pending in this flush) value of a foreign-key attribute."""
+    values = {getattr(obj, attr, None)}
+    hist = sa_inspect(obj).attrs[attr].history
+    values.update(hist.deleted or ())
+    values.discard(None)
+    return values
+
+def affected_test_ids(session, objects):
+    """Resolve changed ORM objects of any source table to the PerformanceTest ids whose summary row changes."""
+    test_ids, batch_ids, recipe_ids, stock_ids, material_ids = set(), set(), set(), set(), set()
+    for obj in objects:
+        if isinstance(obj, PerformanceTest):
+            if obj.id is not None:
+                test_ids.add(obj.id)
+        elif isinstance(obj, SynthesisBatch):
+            batch_ids.add(obj.id)
+        elif isinstance(obj, QCMeasurement):
+            batch_ids.update(_ids_with_history(obj, "batch_id"))
+        elif isinstance(obj, Recipe):
+            recipe_ids.add(obj.id)
+        elif isinstance(obj, StockSolutionBatch):
+            stock_ids.add(obj.id)
+        elif isinstance(obj, RawMaterial):
+            material_ids.add(obj.id)
+
+    return tests_for(session.connection(), material_ids, stock_ids, recipe_ids, batch_ids, test_ids)
+
+def _select_in(conn, column, where_cols, ids):
+    """Values of `column` for rows whose `where_cols` match any of `ids`, chunked to REFRESH_CHUNK ids per query."""
+    ids = list(ids)
+    found = set()
+    for i in range(0, len(ids), REFRESH_CHUNK):
+        chunk = ids[i:i + REFRESH_CHUNK]
+        found.update(conn.execute(select(column).where(or_(*[c.in_(chunk) for c in where_cols]))).scalars())
+    return found
+
+def tests_for(conn, material_ids=None, stock_ids=None, recipe_ids=None, batch_ids=None, test_ids=None):
+    """PerformanceTest ids downstream of the given raw materials, stock solutions, recipes and batches."""
+    test_ids, batch_ids, recipe_ids, stock_ids = set(test_ids or ()), set(batch_ids or ()), set(recipe_ids or ()), set(stock_ids or ())
+    if material_ids:
+        stock_ids |= _select_in(conn, StockSolutionBatch.id, [StockSolutionBatch.raw_material_id], material_ids)
+    if stock_ids:
+        recipe_ids |= _select_in(conn, Recipe.id, [Recipe.ca_stock_batch_id, Recipe.si_stock_batch_id], stock_ids)
+    if recipe_ids:
+        batch_ids |= _select_in(conn, SynthesisBatch.id, [SynthesisBatch.recipe_id], recipe_ids)
+    if batch_ids:
+        test_ids |= _select_in(conn, PerformanceTest.id, [PerformanceTest.batch_id], batch_ids)
+    return test_ids
+
+@event.listens_for(QCMeasurement.batch_id, "set", active_history=True)
+def _load_previous_qc_batch(target, value, oldvalue, initiator):
+    # Loads the old batch_id on assignment so a moved QC reading refreshes both batches
+    pass
+
+SOURCE_MODELS = (RawMaterial, StockSolutionBatch, Recipe, SynthesisBatch, QCMeasurement, PerformanceTest)
+
+@event.listens_for(SessionLocal, "after_flush")
+def _maintain_summary(session, flush_context):
+    changed = [o for o in (*session.new, *session.dirty, *session.deleted) if isinstance(o, SOURCE_MODELS)]
+    # Dirty objects without net column changes (e.g. relationship appends) need no refresh
+    changed = [o for o in changed if o in session.new or o in session.deleted or session.is_modified(o, include_collections=False)]
+    if not changed:
+        return
+    test_ids = affected_test_ids(session, changed)
+    if test_ids:
+        refresh_summary(session.connection(), test_ids)
@@ -0,0 +1,152 @@
+import os
+import gzip
+import json
+import uuid
+import atexit
+import threading
+import datetime
+from sqlalchemy import select, func, or_
+from app.database import engine
+from app.models import SystemLog
+
+# Events are buffered and written by a background thread in batches
+FLUSH_INTERVAL = 2.0 # seconds
+BATCH_SIZE = 200
+MAX_BUFFER = 10000 # Oldest events are dropped beyond this if the database is unreachable
+ARCHIVE_DIR = os.path.join("backups", "logs")
+RETENTION_DAYS = 90
+
+class LogWriter:
+    """
+    In-memory buffer of SystemLog rows flushed with one executemany per batch,
+    from a daemon thread (every FLUSH_INTERVAL seconds or as soon as
+    BATCH_SIZE events are waiting) and once more at interpreter exit.
+    """
+
+    def __init__(self, interval=FLUSH_INTERVAL, batch_size=BATCH_SIZE):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = None
+        self.written = 0
+        self.dropped = 0
+
+    def log(self, event_type, details="", user=None):
+        with self.lock:
+            self.buffer.append({
+                "id": uuid.uuid4(), "timestamp": datetime.datetime.utcnow(),
+                "event_type": event_type, "details": details, "user": user,
+            })
+            if len(self.buffer) > MAX_BUFFER:
+                self.dropped += len(self.buffer) - MAX_BUFFER
+                del self.buffer[:len(self.buffer) - MAX_BUFFER]
+            full = len(self.buffer) >= self.batch_size
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name="system-log-writer", daemon=True)
+                self.thread.start()
+        if full:
+            self.wake.set()
+
+    def flush(self):
+        """Write everything buffered now. Events stay buffered if the write fails."""
+        with self.lock:
+            batch, self.buffer = self.buffer, []
+        if not batch:
+            return 0
+        try:
+            with engine.begin() as conn:
+                for start in range(0, len(batch), self.batch_size):
+                    conn.execute(SystemLog.__table__.insert(), batch[start:start + self.batch_size])
+        except Exception as e:
+            print(f"Log Error: {e}")
+            with self.lock:
+                self.buffer[:0] = batch
+            return 0
+        self.written += len(batch)
+        return len(batch)
+
+    def _run(self):
+        while True:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            self.flush()
+
+writer = LogWriter()
+atexit.register(writer.flush)
+
+def log_event(event_type, details="", user=None):
+    """Record a SystemLog event without touching the database on the caller's thread."""
+    writer.log(event_type, details, user)
+
+# --- Viewer ------------------------------------------------------------------
+
+def _filters(event_types=None, user=None, since=None, until=None, search=None):
+    t = SystemLog.__table__
+    conds = []
+    if event_types:
+        conds.append(t.c.event_type.in_(list(event_types)))
+    if user:
+        conds.append(t.c.user.ilike(f"%{user}%"))
+    if since:
+        conds.append(t.c.timestamp >= since)
+    if until:
+        conds.append(t.c.timestamp < until)
+    if search:
+        conds.append(or_(t.c.details.ilike(f"%{search}%"), t.c.event_type.ilike(f"%{search}%")))
+    return conds
+
+def count_logs(conn, **filters):
+    t = SystemLog.__table__
+    return conn.execute(select(func.count()).select_from(t).where(*_filters(**filters))).scalar()
+
+def query_logs(conn, page=1, page_size=50, **filters):
+    """One page of log rows, newest first (served by the timestamp / event_type indexes)."""
+    t = SystemLog.__table__
+    return conn.execute(
+        select(t.c.timestamp, t.c.event_type, t.c.details, t.c.user)
+        .where(*_filters(**filters)).order_by(t.c.timestamp.desc())
+        .limit(page_size).offset((page - 1) * page_size)
+    ).mappings().all()
+
+def event_types(conn):
+    t = SystemLog.__table__
+    return list(conn.execute(select(t.c.event_type).distinct().order_by(t.c.event_type)).scalars())
+
+# --- Retention ---------------------------------------------------------------
+
+def archive_logs(days=RETENTION_DAYS, archive_dir=ARCHIVE_DIR):
+    """
+    Move log rows older than `days` into gzip-compressed JSON-lines files,
+    one per month (system_logs_YYYY-MM.jsonl.gz, appended as extra gzip
+    members), then delete them. Rows are only deleted after the file is written.
+    Returns {file: rows archived}.
+    """
+    writer.flush()
+    t = SystemLog.__table__
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=days)
+    os.makedirs(archive_dir, exist_ok=True)
+    archived = {}
+    with engine.begin() as conn:
+        rows = conn.execute(select(t).where(t.c.timestamp < cutoff).order_by(t.c.timestamp)).mappings().all()
+        by_month = {}
+        for r in rows:
+            by_month.setdefault(f"{r['timestamp']:%Y-%m}", []).append(r)
+        for month, items in by_month.items():
+            path = os.path.join(archive_dir, f"system_logs_{month}.jsonl.gz")
+            with gzip.open(path, "at", encoding="utf-8") as f:
+                for r in items:
+                    f.write(json.dumps({
+                        "id": str(r["id"]), "timestamp": r["timestamp"].isoformat(),
+                        "event_type": r["event_type"], "details": r["details"], "user": r["user"],
+                    }) + "\n")
+            archived[path] = len(items)
+        if rows:
+            conn.execute(t.delete().where(t.c.timestamp < cutoff))
+    return archived
+
+def archive_files(archive_dir=ARCHIVE_DIR):
+    if not os.path.isdir(archive_dir):
+        return []
+    return sorted(os.path.join(archive_dir, n) for n in os.listdir(archive_dir) if n.endswith(".jsonl.gz"))
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from app.database import engine
+from app.models import Recipe, SynthesisBatch, QCMeasurement
+
+# Metrics that can be followed over ageing time (column -> display label)
+TIMELINE_METRICS = {
+    "ph": "pH",
+    "solid_content_measured": "Solids (%)",
+    "settling_height": "Settling (mm)",
+    "psd_before_v_d50": "V-d50 (µm, Bef)",
+    "psd_after_v_d50": "V-d50 (µm, Aft)",
+    "psd_before_n_d50": "N-d50 (µm, Bef)",
+    "psd_after_n_d50": "N-d50 (µm, Aft)",
+}
+
+def load_timeline(batch_ids=None, recipe_ids=None, metrics=None):
+    """
+    Fetch the QC ageing series of many batches in a single query.
+    Rows come back ordered by (batch_id, ageing_time), which is served by
+    the ix_qc_measurements_batch_ageing index.
+    """
+    metrics = list(metrics or TIMELINE_METRICS.keys())
+    stmt = select(
+        QCMeasurement.batch_id,
+        SynthesisBatch.lab_notebook_ref.label("measurement_id"),
+        Recipe.name.label("recipe_name"),
+        QCMeasurement.ageing_time,
+        QCMeasurement.measured_at,
+        *[getattr(QCMeasurement, m) for m in metrics]
+    ).join(SynthesisBatch, QCMeasurement.batch_id == SynthesisBatch.id) \
+     .outerjoin(Recipe, SynthesisBatch.recipe_id == Recipe.id) \
+     .order_by(QCMeasurement.batch_id, QCMeasurement.ageing_time)
+
+    if batch_ids:
+        stmt = stmt.where(QCMeasurement.batch_id.in_(list(batch_ids)))
+    if recipe_ids:
+        stmt = stmt.where(SynthesisBatch.recipe_id.in_(list(recipe_ids)))
+
+    with engine.connect() as conn:
+        df = pd.DataFrame(conn.execute(stmt).mappings().all())
+
+    if df.empty:
+        return pd.DataFrame(columns=["batch_id", "measurement_id", "recipe_name", "ageing_time", "measured_at"] + metrics)
+
+    df["batch_id"] = df["batch_id"].astype(str)
+    df["ageing_time"] = df["ageing_time"].fillna(0.0).astype(float)
+    df[metrics] = df[metrics].astype(float)
+    return df
+
+def ageing_grid(df, step=None, points=50):
+    """Common ageing grid (hours) spanning all loaded series."""
+    if df.empty:
+        return np.array([])
+    lo, hi = float(df["ageing_time"].min()), float(df["ageing_time"].max())
+    if hi <= lo:
+        return np.array([lo])
+    if step:
+        return np.arange(lo, hi + step / 2.0, step)
+    return np.linspace(lo, hi, points)
+
+def resample_timeline(df, grid, metrics=None):
+    """
+    Interpolate every batch onto the same ageing grid.
+    Each metric is pivoted into an (ageing_time x batch) frame and interpolated
+    column-wise in one pass, so the cost does not grow with per-batch Python loops.
+    Values are only interpolated inside each batch's measured range (no extrapolation).
+    Returns a long frame: batch_id, measurement_id, recipe_name, ageing_time, <metrics>.
+    """
+    metrics = [m for m in (metrics or TIMELINE_METRICS.keys()) if m in df.columns]
+    if df.empty or len(grid) == 0:
+        return pd.DataFrame(columns=["batch_id", "measurement_id", "recipe_name", "ageing_time"] + metrics)
+
+    grid_index = pd.Index(np.asarray(grid, dtype=float), name="ageing_time")
+    resampled = []
+    for m in metrics:
+        # Repeated ageing points for one batch are averaged
+        wide = df.pivot_table(index="ageing_time", columns="batch_id", values=m, aggfunc="mean", dropna=False)
+        wide = wide.reindex(wide.index.union(grid_index))
+        wide = wide.interpolate(method="index", limit_area="inside")
+        long = wide.reindex(grid_index).reset_index().melt(id_vars="ageing_time", var_name="batch_id", value_name=m)
+        resampled.append(long.set_index(["ageing_time", "batch_id"])[m])
+
+    out = pd.concat(resampled, axis=1).reset_index()
+    labels = df.drop_duplicates("batch_id").set_index("batch_id")[["measurement_id", "recipe_name"]]
+    out = out.join(labels, on="batch_id")
+    out = out.dropna(subset=metrics, how="all")
+    return out[["batch_id", "measurement_id", "recipe_name", "ageing_time"] + metrics].reset_index(drop=True)
@@ -0,0 +1,97 @@
+import pandas as pd
+from sqlalchemy import select, or_, and_, case, literal, false
+from sqlalchemy.orm import aliased
+from app.models import RawMaterial, ExperimentSummary
+
+# Strength ages reported in traceability results
+STRENGTH_COLUMNS = {
+    "12h": "compressive_strength_12h",
+    "16h": "compressive_strength_16h",
+    "1d": "compressive_strength_1d",
+    "2d": "compressive_strength_2d",
+    "7d": "compressive_strength_7d",
+    "28d": "compressive_strength_28d",
+}
+
+S = ExperimentSummary
+TRACE_COLUMNS = [
+    S.test_id, S.cube_code, S.test_type, S.cast_date,
+    S.measurement_id, S.execution_date, S.recipe_id, S.recipe_name, S.recipe_code,
+    S.ca_stock_code, S.ca_material_lot, S.si_stock_code, S.si_material_lot,
+    *[getattr(S, c) for c in STRENGTH_COLUMNS.values()],
+]
+
+def _side_condition(side, material_ids, lot_number, stock_ids):
+    """Match on one precursor side (ca / si) of the summary row."""
+    material_col = getattr(S, f"{side}_raw_material_id")
+    stock_col = getattr(S, f"{side}_stock_batch_id")
+    conds = []
+    if material_ids:
+        conds.append(material_col.in_(list(material_ids)))
+    if lot_number:
+        conds.append(material_col.in_(select(RawMaterial.id).where(RawMaterial.lot_number == lot_number)))
+    if stock_ids:
+        conds.append(stock_col.in_(list(stock_ids)))
+    return or_(*conds) if conds else false()
+
+def trace_forward(db, material_ids=(), lot_number=None, stock_ids=(), recipe_ids=()):
+    """
+    Recall query: every test downstream of the given raw materials, lot number,
+    stock solutions or recipes. One indexed query against experiment_summary.
+    `via` tells whether the match came through the Ca side, the Si side, both or the recipe.
+    """
+    ca = _side_condition("ca", material_ids, lot_number, stock_ids)
+    si = _side_condition("si", material_ids, lot_number, stock_ids)
+    by_recipe = S.recipe_id.in_(list(recipe_ids)) if recipe_ids else false()
+    via = case(
+        (and_(ca, si), literal("Ca+Si")),
+        (ca, literal("Ca")),
+        (si, literal("Si")),
+        else_=literal("Recipe"),
+    ).label("via")
+    stmt = select(*TRACE_COLUMNS, via).where(or_(ca, si, by_recipe)).order_by(S.cast_date.desc())
+    return pd.DataFrame(db.execute(stmt).mappings().all(), columns=[c.key for c in TRACE_COLUMNS] + ["via"])
+
+def trace_backward(db, test_ids=(), cube_codes=()):
+    """
+    Lineage of the given tests: batch, recipe, both stock solutions and the raw
+    material lots behind them (name, brand, received date). One query.
+    """
+    ca_mat = aliased(RawMaterial)
+    si_mat = aliased(RawMaterial)
+    conds = []
+    if test_ids:
+        conds.append(S.test_id.in_(list(test_ids)))
+    if cube_codes:
+        conds.append(S.cube_code.in_(list(cube_codes)))
+    if not conds:
+        return pd.DataFrame()
+    stmt = select(
+        *TRACE_COLUMNS,
+        S.batch_operator,
+        ca_mat.material_name.label("ca_material_name"),
+        ca_mat.brand.label("ca_material_brand"),
+        ca_mat.received_date.label("ca_material_received"),
+        si_mat.material_name.label("si_material_name"),
+        si_mat.brand.label("si_material_brand"),
+        si_mat.received_date.label("si_material_received"),
+    ).outerjoin(ca_mat, S.ca_raw_material_id == ca_mat.id) \
+     .outerjoin(si_mat, S.si_raw_material_id == si_mat.id) \
+     .where(or_(*conds))
+    return pd.DataFrame(db.execute(stmt).mappings().all())
+
+def strength_statistics(df, by=None):
+    """
+    n / mean / std / min / max per strength age for a traced result set,
+    optionally split by a column such as `via` or `recipe_name`.
+    """
+    cols = [c for c in STRENGTH_COLUMNS.values() if c in df.columns]
+    if df.empty or not cols:
+        return pd.DataFrame(columns=([by] if by else []) + ["age", "n", "mean", "std", "min", "max"])
+    ages = {v: k for k, v in STRENGTH_COLUMNS.items()}
+    long = df.melt(id_vars=[by] if by else [], value_vars=cols, var_name="age", value_name="strength")
+    long = long.dropna(subset=["strength"])
+    long["age"] = pd.Categorical(long["age"].map(ages), categories=list(STRENGTH_COLUMNS), ordered=True)
+    keys = ([by] if by else []) + ["age"]
+    stats = long.groupby(keys, observed=True)["strength"].agg(["count", "mean", "std", "min", "max"])
+    return stats.rename(columns={"count": "n"}).round(2).reset_index()
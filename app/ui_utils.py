@@ -1,5 +1,6 @@
 import streamlit as st
 import os
+import math
 
 def display_logo():
     # Display Official Logo
@@ -46,3 +47,44 @@ def display_logo():
         """,
         unsafe_allow_html=True
     )
+
+def search_select(label, search_fn, format_func, key, none_label=None, page_size=20):
+    """
+    Search-as-you-type selector backed by a paginated query.
+    `search_fn(term, page, page_size)` must return (rows, total) where each row has an `id`.
+    Returns the selected id (or None).
+    """
+    term_key, page_key, last_key = f"{key}_term", f"{key}_page", f"{key}_last_term"
+
+    c_search, c_page = st.columns([4, 1])
+    term = c_search.text_input(f"🔍 Search {label}", key=term_key, placeholder="Code, reference, recipe or YYYY-MM-DD")
+
+    # A new search always starts on the first page
+    if st.session_state.get(last_key) != term:
+        st.session_state[last_key] = term
+        st.session_state[page_key] = 1
+    page = st.session_state.get(page_key, 1)
+
+    rows, total = search_fn(term, page, page_size)
+    n_pages = max(1, math.ceil(total / page_size))
+    if page > n_pages:
+        page = st.session_state[page_key] = n_pages
+        rows, total = search_fn(term, page, page_size)
+    c_page.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, step=1, key=page_key)
+
+    labels = {r.id: format_func(r) for r in rows}
+    options = ([None] if none_label else []) + list(labels.keys())
+    if not options:
+        st.caption("No matches.")
+        return None
+
+    selected = st.selectbox(
+        label,
+        options=options,
+        format_func=lambda x: none_label if x is None else labels[x],
+        key=f"{key}_select"
+    )
+    if rows:
+        first = (page - 1) * page_size + 1
+        st.caption(f"Showing {first}–{first + len(rows) - 1} of {total} match(es).")
+    return selected
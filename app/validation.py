@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+# Column rules per import type (file headers). Bounds follow the entry forms.
+# type: "text" | "number" | "date"; min / max are inclusive.
+RULES = {
+    "Raw Materials": {
+        "material_name": {"type": "text", "required": True},
+        "chemical_type": {"type": "text"},
+        "brand": {"type": "text"},
+        "lot_number": {"type": "text"},
+        "molecular_weight": {"type": "number", "min": 0.1},
+        "purity_percent": {"type": "number", "min": 0.1, "max": 100.0},
+        "initial_quantity_kg": {"type": "number", "min": 0.0},
+        "received_date": {"type": "date"},
+    },
+    "Stock Solutions": {
+        "code": {"type": "text", "required": True},
+        "chemical_type": {"type": "text"},
+        "molarity": {"type": "number", "min": 0.01, "max": 10.0},
+        "target_volume_ml": {"type": "number", "min": 0.0},
+        "actual_mass_g": {"type": "number", "min": 0.0},
+        "preparation_date": {"type": "date"},
+        "operator": {"type": "text"},
+        "source_lot_number": {"type": "text"},
+    },
+    "Recipes": {
+        "name": {"type": "text", "required": True},
+        "ca_si_ratio": {"type": "number", "min": 0.0, "max": 2.5},
+        "molarity_ca": {"type": "number", "min": 0.01, "max": 10.0},
+        "molarity_si": {"type": "number", "min": 0.01, "max": 10.0},
+        "solids_percent": {"type": "number", "min": 0.1, "max": 50.0},
+        "pce_dosage": {"type": "number", "min": 0.0, "max": 100.0},
+        "target_ph": {"type": "number", "min": 0.0, "max": 14.0},
+    },
+    "Synthesis Results": {
+        "recipe_name": {"type": "text", "required": True},
+        "batch_ref": {"type": "text"},
+        "execution_date": {"type": "date"},
+        "operator": {"type": "text"},
+        "ph": {"type": "number", "min": 0.0, "max": 14.0},
+        "solids_measured": {"type": "number", "min": 0.0, "max": 100.0},
+        "strength_1d": {"type": "number", "min": 0.0},
+        "strength_28d": {"type": "number", "min": 0.0},
+        "flow": {"type": "number", "min": 0.0},
+    },
+}
+
+def _blank(s):
+    """Missing cells, including empty / whitespace-only strings."""
+    if pd.api.types.is_numeric_dtype(s) or pd.api.types.is_datetime64_any_dtype(s):
+        return s.isna()
+    return s.isna() | s.astype(str).str.strip().eq("")
+
+def validate_frame(import_type, df, key_columns=None):
+    """
+    Check a whole sheet column by column with vectorized pandas: required
+    columns and values, numeric / date coercion, range checks and duplicate
+    natural keys (`key_columns`, file headers) within the sheet.
+
+    Returns (errors, matrix): `errors` is a list of {"row", "column", "value",
+    "error"} dicts; `matrix` holds the failing rows only, one column per file
+    column with the error message in each failing cell ("" elsewhere).
+    """
+    rules = RULES[import_type]
+    messages = pd.DataFrame("", index=df.index, columns=list(dict.fromkeys([*df.columns, *rules])), dtype=object)
+
+    def flag(col, mask, message):
+        if not mask.any():
+            return
+        current = messages.loc[mask, col]
+        messages.loc[mask, col] = np.where(current == "", message, current + "; " + message)
+
+    for col, rule in rules.items():
+        if col not in df.columns:
+            if rule.get("required"):
+                flag(col, pd.Series(True, index=df.index), "missing column")
+            continue
+        raw = df[col]
+        blank = _blank(raw)
+        if rule.get("required"):
+            flag(col, blank, "required")
+        if rule["type"] == "number":
+            num = pd.to_numeric(raw.where(~blank), errors="coerce")
+            flag(col, num.isna() & ~blank, "not a number")
+            if "min" in rule:
+                flag(col, num < rule["min"], f"below {rule['min']:g}")
+            if "max" in rule:
+                flag(col, num > rule["max"], f"above {rule['max']:g}")
+        elif rule["type"] == "date":
+            parsed = pd.to_datetime(raw.where(~blank), errors="coerce")
+            flag(col, parsed.isna() & ~blank, "not a date")
+
+    keys = [k for k in (key_columns or []) if k in df.columns]
+    if keys:
+        key_frame = df[keys].astype(str).apply(lambda s: s.str.strip())
+        complete = ~df[keys].apply(_blank).any(axis=1)
+        dup = key_frame.duplicated(keep=False) & complete
+        for k in keys:
+            flag(k, dup, "duplicate key")
+
+    failing = messages.ne("").any(axis=1)
+    matrix = messages.loc[failing]
+    long = matrix.where(matrix.ne("")).stack().dropna()
+    rows = long.index.get_level_values(0)
+    cols = long.index.get_level_values(1)
+    values = [None] * len(long)
+    for col in cols.unique():
+        # Offending values, looked up column-wise
+        at = np.flatnonzero(cols == col)
+        if col in df.columns:
+            picked = df[col].loc[rows[at]].to_numpy(dtype=object)
+            for i, v in zip(at, picked):
+                values[i] = v
+    errors = [
+        {"row": r, "column": c, "value": v, "error": m}
+        for r, c, v, m in zip(rows, cols, values, long.to_numpy())
+    ]
+    return errors, matrix.reset_index(names="row")
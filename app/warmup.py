@@ -0,0 +1,138 @@
+import sys
+import time
+import asyncio
+import importlib
+import threading
+
+# Modules the pages load on demand; importing them ahead of the first click
+# keeps the first visit to Analytics / Data Import from paying for them.
+WARM_MODULES = ["pandas", "plotly.express", "plotly.graph_objects", "openpyxl", "pyarrow"]
+
+_started = False
+_lock = threading.Lock()
+timings = {}
+
+def _analytics_data():
+    from app.analytics_data import load_analytics_data
+    load_analytics_data()
+
+def _ml_models():
+    from app.ml_utils import load_model
+    for target in ("1d", "28d"):
+        load_model(target)
+
+def _reference_data():
+    from app.reference_data import material_options, stock_batch_options, stock_batch_brands
+    material_options()
+    for kind in ("Ca", "Si"):
+        stock_batch_options(kind)
+    stock_batch_brands()
+
+# Cache-filling steps; they only help inside the server process
+WARM_STEPS = (("analytics_data", _analytics_data), ("reference_data", _reference_data), ("ml_models", _ml_models))
+# Seconds to wait for the server to come up before pinging it
+PING_TIMEOUT_S = 120
+
+def warm_up(modules=WARM_MODULES, steps=WARM_STEPS):
+    """Import heavy modules and fill the shared caches. Returns {step: seconds}."""
+    for name in modules:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue # Optional dependency not installed
+        timings[name] = round(time.perf_counter() - started, 3)
+
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            print(f"Warm-up step {name} failed: {e}")
+            continue
+        timings[name] = round(time.perf_counter() - started, 3)
+    return timings
+
+def start_warmup():
+    """Run warm_up() once per process on a daemon thread."""
+    global _started
+    with _lock:
+        if _started:
+            return
+        _started = True
+    threading.Thread(target=_warm_up_logged, name="warmup", daemon=True).start()
+
+def _warm_up_logged():
+    started = time.perf_counter()
+    warm_up()
+    print(f"Warm-up finished in {time.perf_counter() - started:.1f} s: {timings}", flush=True)
+
+def _script_finished(data):
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+    msg = ForwardMsg()
+    msg.ParseFromString(data)
+    return msg.WhichOneof("type") == "script_finished"
+
+async def _run_session_tornado(url, payload, deadline):
+    from tornado.websocket import websocket_connect
+    ws = await websocket_connect(url)
+    try:
+        await ws.write_message(payload, binary=True)
+        while time.monotonic() < deadline:
+            data = await asyncio.wait_for(ws.read_message(), max(deadline - time.monotonic(), 0.1))
+            if data is None or _script_finished(data):
+                break
+    finally:
+        ws.close()
+
+def _run_session(url, payload, deadline):
+    """Send one rerun request over the app websocket and wait for the run to finish."""
+    try:
+        from websockets.sync.client import connect
+    except ImportError: # Older Streamlit releases run on tornado and do not depend on websockets
+        return asyncio.run(_run_session_tornado(url, payload, deadline))
+    with connect(url, open_timeout=max(deadline - time.monotonic(), 0.1)) as ws:
+        ws.send(payload)
+        while time.monotonic() < deadline:
+            data = ws.recv(timeout=max(deadline - time.monotonic(), 0.1))
+            if isinstance(data, bytes) and _script_finished(data):
+                break
+
+def ping_server(port=8501, timeout=PING_TIMEOUT_S):
+    """
+    Wait for the Streamlit server on `port` and run the main page once as a
+    headless session. The run's init_db() starts the warm-up in the server
+    process, so the caches are filled at start instead of on the first user
+    request.
+    """
+    from urllib.request import urlopen
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            urlopen(f"http://localhost:{port}/_stcore/health", timeout=5).close()
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Streamlit did not come up on port {port} within {timeout} s")
+            time.sleep(1)
+    msg = BackMsg()
+    msg.rerun_script.query_string = ""
+    msg.rerun_script.page_script_hash = ""
+    _run_session(f"ws://localhost:{port}/_stcore/stream", msg.SerializeToString(), deadline)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Warm the app at container start.")
+    parser.add_argument("--ping", type=int, metavar="PORT", help="After `streamlit run`: wait for the server on PORT and warm its caches")
+    args = parser.parse_args()
+    if args.ping:
+        ping_server(args.ping)
+        sys.exit(0)
+    # Before `streamlit run`: migrations, and compile / page in the heavy modules.
+    # The caches live in the server process, so they are not filled here.
+    from app.database import init_db
+    init_db()
+    for step, seconds in warm_up(steps=()).items():
+        print(f"  {step:<22} {seconds:6.3f} s")
@@ -1,38 +1,70 @@
-import shutil
-import os
+import time
+import argparse
 import datetime
+from app.database import engine, init_db
+from app.journal import prune_journal
+from app.system_log import archive_logs, RETENTION_DAYS
+from app.snapshots import STORE_DIR, take_snapshot, prune_snapshots, verify_snapshot, restore_snapshot, list_snapshots, store_size
 
-# --- CONFIGURATION ---
-# 1. Path to your Nanogence database
-SOURCE_DB = "nanogence.db"
+# Incremental backups of the Nanogence database into a snapshot store.
+# Point --target (or BACKUP_TARGET) at any folder, e.g. a synced Google Drive
+# directory: unchanged database pages are stored only once, so each run only
+# adds the pages written since the previous snapshot.
 
-# 2. Path to your Google Drive folder (Change this to your actual Google Drive path)
-# Example: "C:/Users/YourName/Google Drive/Backups/Nanogence"
-GDRIVE_PATH = "C:/Path/To/Your/Company/GoogleDrive/Nanogence_Backups"
-
-def perform_backup():
-    if not os.path.exists(SOURCE_DB):
-        print(f"Error: {SOURCE_DB} not found in current directory.")
-        return
-
-    # Create destination folder if it doesn't exist
-    if not os.path.exists(GDRIVE_PATH):
-        try:
-            os.makedirs(GDRIVE_PATH)
-        except Exception as e:
-            print(f"Error creating backup directory: {e}")
-            return
-
-    # Generate filename with timestamp
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    dest_filename = f"nanogence_backup_{timestamp}.db"
-    dest_path = os.path.join(GDRIVE_PATH, dest_filename)
-
-    try:
-        shutil.copy2(SOURCE_DB, dest_path)
-        print(f"✅ Success! Database backed up to: {dest_path}")
-    except Exception as e:
-        print(f"❌ Backup failed: {e}")
+def run_once(args):
+    result = take_snapshot(args.target)
+    print(f"✅ Snapshot {result['id']}: {result['chunks']} chunks, {result['new_chunks']} new "
+          f"({result['stored_bytes'] / 1e6:.2f} MB stored) in {result['seconds']} s")
+    if args.verify:
+        status = verify_snapshot(result["id"], args.target)
+        print(f"   Restore check: {status}")
+        if status != "ok":
+            raise RuntimeError(f"Snapshot {result['id']} failed verification: {status}")
+    pruned = prune_snapshots(args.target, args.keep_last, args.keep_daily, args.keep_weekly)
+    if pruned["removed_snapshots"]:
+        print(f"   Retention: removed {len(pruned['removed_snapshots'])} snapshot(s), freed {pruned['freed_bytes'] / 1e6:.2f} MB")
+    if args.prune_journal and pruned["oldest_journal_seq"]:
+        # Changes older than every retained snapshot can no longer be replayed onto one
+        with engine.begin() as conn:
+            dropped = prune_journal(conn, pruned["oldest_journal_seq"])
+        if dropped:
+            print(f"   Journal: dropped {dropped} record(s) up to #{pruned['oldest_journal_seq']}")
+    if args.log_days:
+        # System log retention: older rows move to the monthly archive files
+        archived = archive_logs(days=args.log_days)
+        if archived:
+            print(f"   Logs: archived {sum(archived.values())} row(s) older than {args.log_days} days")
+    print(f"   Store: {pruned['kept']} snapshot(s), {store_size(args.target) / 1e6:.2f} MB")
 
 if __name__ == "__main__":
-    perform_backup()
+    parser = argparse.ArgumentParser(description="Incremental, deduplicated backups of the database.")
+    parser.add_argument("--target", default=STORE_DIR, help="Snapshot store directory (default: %(default)s)")
+    parser.add_argument("--every", type=float, default=0, help="Repeat every N minutes (default: run once)")
+    parser.add_argument("--keep-last", type=int, default=7)
+    parser.add_argument("--keep-daily", type=int, default=14)
+    parser.add_argument("--keep-weekly", type=int, default=8)
+    parser.add_argument("--no-verify", dest="verify", action="store_false", help="Skip the restore check after each snapshot")
+    parser.add_argument("--keep-journal", dest="prune_journal", action="store_false", help="Keep change-journal records older than the oldest retained snapshot")
+    parser.add_argument("--log-days", type=int, default=RETENTION_DAYS, help="Archive system log rows older than this many days on each run, 0 to keep them (default: %(default)s)")
+    parser.add_argument("--list", action="store_true", help="List the snapshots in the store and exit")
+    parser.add_argument("--restore", metavar="SNAPSHOT_ID", help="Restore a snapshot to --out and exit")
+    parser.add_argument("--out", default="nanogence_restored.db", help="Restore destination (default: %(default)s)")
+    args = parser.parse_args()
+
+    init_db()
+    if args.list:
+        for m in list_snapshots(args.target):
+            print(f"{m['id']}  {m['created_at']}  {m['size'] / 1e6:.2f} MB  {len(m['chunks'])} chunks")
+    elif args.restore:
+        print(f"Restored to {restore_snapshot(args.restore, args.out, args.target)}")
+    elif args.every:
+        print(f"Backing up to {args.target} every {args.every:g} min (Ctrl+C to stop)")
+        while True:
+            started = time.monotonic()
+            try:
+                run_once(args)
+            except Exception as e:
+                print(f"❌ {datetime.datetime.now():%Y-%m-%d %H:%M:%S} Backup failed: {e}")
+            time.sleep(max(0.0, args.every * 60 - (time.monotonic() - started)))
+    else:
+        run_once(args)
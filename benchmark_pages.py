@@ -0,0 +1,252 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import datetime
+import platform
+import tempfile
+import statistics
+import subprocess
+import tracemalloc
+
+# Headless page benchmarks: every script in app/pages/ is driven through
+# streamlit.testing.v1.AppTest against seeded databases of increasing size.
+# Each size runs in its own interpreter (the engine is bound at import), with
+# a working directory whose .streamlit/secrets.toml points at that database.
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PAGES_DIR = os.path.join(ROOT, "app", "pages")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks")
+DEFAULT_SIZES = [100, 1000, 10000] # Recipes; seed_data.generate scales the other tables with them
+REGRESSION_THRESHOLD = 0.2 # 20 % slower (or more queries) is flagged by --compare
+MIN_DELTA_MS = 10 # ...but timing differences below this are noise
+
+# --- Interactions -------------------------------------------------------------
+# A step returns the AppTest after its run, or None when the widget is not on the page.
+# Tabs are rendered on every run in Streamlit (switching is client-side), so a
+# tab switch costs one rerun of the script.
+
+def _button(at, label):
+    return next((b for b in at.button if b.label == label), None)
+
+def _by_key(elements, key):
+    return next((e for e in elements if e.key == key), None)
+
+def rerun(at):
+    return at.run()
+
+def search(key, term):
+    def step(at):
+        box = _by_key(at.text_input, key)
+        return box.input(term).run() if box else None
+    return step
+
+def click(label):
+    def step(at):
+        button = _button(at, label)
+        return button.click().run() if button else None
+    return step
+
+def save_recipe(at):
+    name = next((t for t in at.text_input if t.label == "Recipe Name"), None)
+    if name is None:
+        return None
+    name.input(f"Benchmark {datetime.datetime.now():%H%M%S%f}")
+    # The designer starts with empty parameters and no stock batches selected
+    for box in at.number_input:
+        if box.value is None:
+            box.set_value(min(max(box.min if box.min is not None else 1.0, 1.0), box.max if box.max is not None else 1.0))
+    for select in at.selectbox:
+        if select.label in ("Ca Stock Batch", "Si Stock Batch", "PCE Material Source") and select.value == "None" and len(select.options) > 1:
+            select.select(select.options[1])
+    button = _button(at, "💾 Save New Recipe")
+    return button.click().run() if button else None
+
+def full_resolution(at):
+    toggle = next((t for t in at.toggle if t.label == "Full-resolution charts"), None)
+    return toggle.set_value(True).run() if toggle else None
+
+# Page-specific steps after "load" and "tab_switch"
+INTERACTIONS = {
+    "01_Raw_Materials.py": [("search", search("trace_material_term", "Ca")), ("save", click("Save Stock Batch"))],
+    "02_Recipes.py": [("search", search("lib_search", "Bench")), ("save", save_recipe)],
+    "03_Measurement.py": [("search", search("recipe_search_qc", "Recipe")), ("save", click("✅ Save Measurement"))],
+    "04_Mortar_and_Paste_Test.py": [("search", search("log_trial_term", "AC")), ("save", click("✅ Initialise Mix & Casting"))],
+    "05_Analytics.py": [("full_resolution", full_resolution)],
+    "07_Admin.py": [("rebuild_summary", click("🔄 Rebuild Experiment Summary"))],
+}
+
+def page_scripts():
+    return sorted(n for n in os.listdir(PAGES_DIR) if n.endswith(".py") and not n.startswith("__"))
+
+# --- Seeding ------------------------------------------------------------------
+
+def populate(size, seed=0):
+    """Synthetic data (seed_data.generate) for `size` recipes, other tables in the default proportions."""
+    from seed_data import SYNTHETIC_SIZES, generate
+    factor = size / SYNTHETIC_SIZES["recipes"]
+    return generate(seed=seed, **{name: max(1, int(n * factor)) for name, n in SYNTHETIC_SIZES.items()})
+
+# --- Worker (one database size) -------------------------------------------------
+
+def run_steps(script, steps, counter):
+    """One pass over a page: [(step, seconds, queries, exceptions)]."""
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(PAGES_DIR, script), default_timeout=300)
+    out = []
+    for name, step in steps:
+        queries = counter[0]
+        started = time.perf_counter()
+        result = step(at)
+        seconds = time.perf_counter() - started
+        if result is None:
+            out.append((name, None, None, None))
+            continue
+        at = result
+        out.append((name, seconds, counter[0] - queries, [e.value for e in at.exception]))
+    return out
+
+def run_steps_traced(script, steps):
+    """Peak traced memory (KiB) per step; a separate pass since tracing slows everything down."""
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(PAGES_DIR, script), default_timeout=300)
+    peaks = {}
+    tracemalloc.start()
+    try:
+        for name, step in steps:
+            tracemalloc.reset_peak()
+            result = step(at)
+            if result is not None:
+                at = result
+                peaks[name] = round(tracemalloc.get_traced_memory()[1] / 1024)
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+def worker(size, repeat, pages, out_path):
+    sys.path.insert(0, ROOT)
+    from sqlalchemy import event
+    from app.database import engine, init_db
+
+    init_db()
+    populate(size)
+    counter = [0]
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        counter[0] += 1
+
+    results = []
+    for script in pages:
+        steps = [("load", lambda at: at.run()), ("tab_switch", rerun)] + INTERACTIONS.get(script, [])
+        passes = [run_steps(script, steps, counter) for _ in range(repeat)]
+        peaks = run_steps_traced(script, steps)
+        for i, (name, _) in enumerate(steps):
+            runs = [p[i] for p in passes if p[i][1] is not None]
+            if not runs:
+                continue # Widget not on the page at this size
+            seconds = [r[1] for r in runs]
+            results.append({
+                "size": size, "page": script, "step": name,
+                "cold_ms": round(seconds[0] * 1000, 1),
+                "wall_ms": round(statistics.median(seconds[1:] or seconds) * 1000, 1),
+                "queries": runs[-1][2],
+                "peak_kb": peaks.get(name),
+                "exceptions": runs[-1][3],
+            })
+            print(f"  {size:>7} {script:<32} {name:<16} {results[-1]['wall_ms']:9.1f} ms {results[-1]['queries']:6} queries", flush=True)
+    with open(out_path, "w") as f:
+        json.dump(results, f)
+
+# --- Driver ---------------------------------------------------------------------
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmark(sizes, repeat=3, pages=None):
+    """Benchmark every page at every size. Returns the report dict (see --out)."""
+    import streamlit
+    pages = pages or page_scripts()
+    report = {
+        "commit": _git_commit(),
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "streamlit": streamlit.__version__,
+        "repeat": repeat,
+        "sizes": sizes,
+        "results": [],
+    }
+    for size in sizes:
+        workdir = tempfile.mkdtemp(prefix=f"bench_{size}_")
+        os.makedirs(os.path.join(workdir, ".streamlit"))
+        db_path = os.path.join(workdir, "bench.db")
+        with open(os.path.join(workdir, ".streamlit", "secrets.toml"), "w") as f:
+            f.write(f'DATABASE_URL = "sqlite:///{db_path}"\n')
+        assets = os.path.join(ROOT, "assets")
+        if os.path.isdir(assets):
+            os.symlink(assets, os.path.join(workdir, "assets"))
+        part = os.path.join(workdir, "results.json")
+        log_path = os.path.join(workdir, "worker.log")
+        print(f"Size {size} ({workdir})", flush=True)
+        cmd = [sys.executable, os.path.abspath(__file__), "--worker", "--sizes", str(size), "--repeat", str(repeat), "--part", part, *pages]
+        # Page tracebacks and Streamlit warnings go to the log; results carry the exception messages
+        with open(log_path, "w") as log:
+            proc = subprocess.run(cmd, cwd=workdir, stderr=log, env=dict(os.environ, PYTHONPATH=ROOT))
+        if proc.returncode != 0:
+            raise RuntimeError(f"Benchmark worker for size {size} failed, see {log_path}")
+        with open(part) as f:
+            report["results"].extend(json.load(f))
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+def compare(old, new, threshold=REGRESSION_THRESHOLD):
+    """[(size, page, step, metric, old, new)] where `new` is worse than `old` by more than `threshold`."""
+    before = {(r["size"], r["page"], r["step"]): r for r in old["results"]}
+    worse = []
+    for r in new["results"]:
+        o = before.get((r["size"], r["page"], r["step"]))
+        if not o:
+            continue
+        for metric in ("wall_ms", "queries", "peak_kb"):
+            if not o.get(metric) or r.get(metric) is None:
+                continue
+            if metric == "wall_ms" and r[metric] - o[metric] < MIN_DELTA_MS:
+                continue
+            if r[metric] > o[metric] * (1 + threshold):
+                worse.append((r["size"], r["page"], r["step"], metric, o[metric], r[metric]))
+    return worse
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Streamlit pages headlessly (AppTest) against seeded databases.")
+    parser.add_argument("pages", nargs="*", help="Page scripts in app/pages (default: all)")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Comma-separated numbers of seeded recipes (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes per page; the first is reported as cold_ms")
+    parser.add_argument("--out", default=None, help="Result file (default: benchmarks/<timestamp>_<commit>.json)")
+    parser.add_argument("--compare", metavar="BASELINE", help="Flag steps slower than a previous result file")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--part", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+
+    if args.worker:
+        worker(sizes[0], args.repeat, args.pages or page_scripts(), args.part)
+        sys.exit(0)
+
+    report = run_benchmark(sizes, args.repeat, args.pages or None)
+    out = args.out or os.path.join(RESULTS_DIR, f"{datetime.datetime.now():%Y%m%d_%H%M%S}_{report['commit'] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ {len(report['results'])} measurements written to {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report)
+        for size, page, step, metric, before, after in regressions:
+            print(f"⚠️ {size:>7} {page:<32} {step:<16} {metric}: {before} -> {after}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions.")
@@ -0,0 +1,13 @@
+import argparse
+from app.export import export_dataset, EXPORT_DIR, FORMATS
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the unified experiment dataset to Parquet / Arrow IPC.")
+    parser.add_argument("--out", default=EXPORT_DIR, help="Export directory (default: %(default)s)")
+    parser.add_argument("--format", default="parquet", choices=list(FORMATS.keys()))
+    parser.add_argument("--full", action="store_true", help="Rewrite everything instead of appending new partitions")
+    args = parser.parse_args()
+
+    print(f"Exporting to {args.out} ({args.format}, {'full' if args.full else 'incremental'})...")
+    result = export_dataset(root=args.out, fmt=args.format, full=args.full)
+    print(result)
@@ -0,0 +1,24 @@
+import argparse
+from app.database import init_db
+from app.importer import IMPORT_TYPES, STREAM_CHUNK_ROWS, run_streaming_import
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream a CSV/XLSX file into the database in committed chunks (resumable).")
+    parser.add_argument("path", help="CSV or XLSX file")
+    parser.add_argument("--type", required=True, choices=list(IMPORT_TYPES.keys()), help="Import category")
+    parser.add_argument("--sheet", default=None, help="Worksheet name (XLSX only, default: first sheet)")
+    parser.add_argument("--chunk-rows", type=int, default=STREAM_CHUNK_ROWS)
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and import from the first row")
+    args = parser.parse_args()
+
+    init_db()
+    print(f"Importing {args.path} as {args.type}...")
+    with open(args.path, "rb") as f:
+        result = run_streaming_import(
+            args.type, f, args.path, sheet_name=args.sheet, chunk_rows=args.chunk_rows, restart=args.restart,
+            progress=lambda done: print(f"  {done} rows committed")
+        )
+    errors = result.pop("errors")
+    print(result)
+    for e in errors[:20]:
+        print(f"  row {e['row']}: {e['column']}={e['value']!r} ({e['error']})")
@@ -0,0 +1,73 @@
+import os
+import re
+import ast
+import sys
+import json
+import argparse
+import subprocess
+
+# Import cost of each Streamlit page: the page's top-level imports are run in a
+# fresh interpreter under `python -X importtime`, so every page starts cold,
+# the way the first request after a container wake does.
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PAGES = [os.path.join("app", "main.py")] + sorted(
+    os.path.join("app", "pages", n) for n in os.listdir(os.path.join(ROOT, "app", "pages"))
+    if n.endswith(".py") and not n.startswith("__")
+)
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def page_imports(path):
+    """Source of the module-level import statements of a page (deferred imports are not counted)."""
+    with open(os.path.join(ROOT, path), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+def measure(code, baseline="import streamlit"):
+    """
+    Run `code` after `baseline` under -X importtime. Returns the modules the
+    page adds on top of the baseline as [(module, self_us, cumulative_us, depth)].
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    marker = "__page_imports__"
+    program = f"{baseline}\nimport sys\nprint('{marker}', file=sys.stderr, flush=True)\n{code}\n"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", program], capture_output=True, text=True, env=env)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in proc.stderr.split(marker, 1)[1].splitlines():
+        m = LINE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2))
+    return rows
+
+def report(path, top=8):
+    rows = measure(page_imports(path))
+    direct = [r for r in rows if r[3] == 0]
+    return {
+        "page": path,
+        "modules": len(rows),
+        "total_ms": round(sum(r[2] for r in direct) / 1000, 1),
+        "heaviest": [{"module": r[0], "ms": round(r[2] / 1000, 1)} for r in sorted(direct, key=lambda r: -r[2])[:top]],
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold import time of each Streamlit page (python -X importtime).")
+    parser.add_argument("pages", nargs="*", help="Page scripts (default: app/main.py and app/pages/*.py)")
+    parser.add_argument("--top", type=int, default=8, help="Heaviest top-level imports to list per page")
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    results = []
+    for path in args.pages or PAGES:
+        try:
+            result = report(path, args.top)
+        except RuntimeError as e:
+            print(f"❌ {path}: {e}")
+            continue
+        results.append(result)
+        print(f"{path:<40} {result['total_ms']:8.1f} ms  ({result['modules']} modules beyond streamlit)")
+        for item in result["heaviest"]:
+            print(f"    {item['module']:<36} {item['ms']:8.1f} ms")
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,31 @@
+import argparse
+import datetime
+from app.database import init_db
+from app.logical_backup import DUMP_WORKERS, dump_database, restore_database, read_manifest
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Table-by-table logical dump / restore (COPY on Postgres, same archive format on SQLite).")
+    sub = parser.add_subparsers(dest="command", required=True)
+    dump = sub.add_parser("dump", help="Write every table to a compressed archive")
+    dump.add_argument("--out", default=None, help="Archive path (default: nanogence_dump_<timestamp>.tar)")
+    dump.add_argument("--workers", type=int, default=DUMP_WORKERS, help="Tables dumped in parallel")
+    restore = sub.add_parser("restore", help="Load an archive into the configured database")
+    restore.add_argument("path", help="Archive written by 'dump'")
+    restore.add_argument("--replace", action="store_true", help="Delete existing rows first")
+    show = sub.add_parser("manifest", help="Print the manifest of an archive")
+    show.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "dump":
+        out = args.out or f"nanogence_dump_{datetime.datetime.now():%Y%m%d_%H%M%S}.tar"
+        manifest = dump_database(out, workers=args.workers)
+        print(f"✅ {out}: {sum(t['rows'] for t in manifest['tables'])} rows in {len(manifest['tables'])} tables ({manifest['seconds']} s)")
+    elif args.command == "restore":
+        init_db()
+        restored = restore_database(args.path, replace=args.replace)
+        for table, rows in restored.items():
+            print(f"  {table}: {rows}")
+        print(f"✅ Restored {sum(restored.values())} rows")
+    else:
+        for t in read_manifest(args.path)["tables"]:
+            print(f"{t['name']:<28} {t['rows']:>8} rows  {t['bytes'] / 1e6:8.2f} MB")
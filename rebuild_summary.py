@@ -0,0 +1,8 @@
+from app.database import init_db
+from app.summary import rebuild_summary
+
+if __name__ == "__main__":
+    init_db()
+    print("Rebuilding experiment_summary...")
+    count = rebuild_summary()
+    print(f"experiment_summary rebuilt: {count} rows")